@@ -0,0 +1,288 @@
+#-*- coding: utf-8 -*-
+"""
+nacos-mcp-router 基准测试，完全基于本地的fake Nacos和fake MCP server，不需要真实环境。
+
+测量项：
+    refresh:  McpUpdater全量刷新耗时（首次全部变更、之后无变更）
+    search:   search_mcp_server延迟
+    install:  add_mcp_server安装耗时（stdio / sse / streamable HTTP）
+    use_tool: use_tool吞吐和延迟（stdio / sse / streamable HTTP）
+    proxy:    代理模式下经streamable HTTP调用stdio server工具的吞吐和延迟（session / passthrough引擎）
+    startup:  路由进程从启动到能响应list_tools的耗时
+
+结果以JSON行追加到 --output 文件，便于对比不同版本。
+
+    python benchmarks/bench_router.py --servers 500 --nacos-latency 0.005
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from nacos_mcp_router import router
+from nacos_mcp_router.constants import MODE_ROUTER
+from nacos_mcp_router.fake_backends import FakeMcpHttpServer, FakeNacosServer, stdio_command
+from nacos_mcp_router.mcp_manager import McpUpdater
+from nacos_mcp_router.nacos_http_client import NacosHttpClient
+from nacos_mcp_router.tool_registrar import ToolRegistrar
+from nacos_mcp_router.tool_result import to_text
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def nacos_params(address: str) -> dict[str, str]:
+    return {"nacosAddr": address, "userName": "nacos", "password": "nacos", "namespaceId": "", "ak": "", "sk": ""}
+
+
+def setup_router(address: str) -> McpUpdater:
+    client = NacosHttpClient(nacos_params(address))
+    updater = McpUpdater(client, None, update_interval=3600, enable_vector_db=False, mode=MODE_ROUTER,
+                         enable_auto_refresh=True)
+    router.mode = MODE_ROUTER
+    router.nacos_http_client = client
+    router.mcp_updater = updater
+    router.tool_registrar = ToolRegistrar(client)
+    return updater
+
+
+async def bench_refresh(updater: McpUpdater, rounds: int) -> dict:
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await updater.refresh()
+        durations.append(time.perf_counter() - start)
+    cached = len(await updater._cache_values())
+    return {"cold_s": round(durations[0], 4),
+            "warm": percentiles(durations[1:]),
+            "cached_servers": cached}
+
+
+async def bench_search(iterations: int) -> dict:
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await router.search_mcp_server(f"benchmark task {i}", f"topic-{i % 10},Fake")
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+async def bench_use_tool(name: str, concurrency: int, duration: float) -> dict:
+    start = time.perf_counter()
+    installed = await router.add_mcp_server(name)
+    install_s = time.perf_counter() - start
+    if name not in router.mcp_servers_dict:
+        return {"error": installed}
+
+    samples: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        nonlocal errors
+        i = 0
+        while time.perf_counter() < deadline:
+            call_start = time.perf_counter()
+            result = await router.use_tool(name, "echo", {"text": f"{worker_id}-{i}"})
+            samples.append(time.perf_counter() - call_start)
+            if "failed to use tool" in to_text(result):
+                errors += 1
+            i += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    wall = time.perf_counter() - wall_start
+    await router.mcp_servers_dict[name].request_for_shutdown()
+    return {"install_s": round(install_s, 4), "throughput_rps": round(len(samples) / wall, 1),
+            "errors": errors, "latency": percentiles(samples)}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_router(url: str, timeout: float) -> None:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with streamablehttp_client(url=url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    await session.list_tools()
+                    return
+        except Exception:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def bench_startup(address: str, timeout: float) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, NACOS_ADDR=address, NACOS_PASSWORD="nacos",
+                   TRANSPORT_TYPE="streamable_http", PORT=str(port))
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-m", "nacos_mcp_router"], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(_wait_for_router(f"http://127.0.0.1:{port}/mcp", timeout))
+            return {"ready_s": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+async def _proxy_load(url: str, concurrency: int, duration: float) -> dict:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    samples: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        nonlocal errors
+        async with streamablehttp_client(url=url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                i = 0
+                while time.perf_counter() < deadline:
+                    call_start = time.perf_counter()
+                    result = await session.call_tool("echo", {"text": f"{worker_id}-{i}"})
+                    samples.append(time.perf_counter() - call_start)
+                    if result.isError:
+                        errors += 1
+                    i += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    wall = time.perf_counter() - wall_start
+    return {"throughput_rps": round(len(samples) / wall, 1), "errors": errors, "latency": percentiles(samples)}
+
+
+def bench_proxy(address: str, engine: str, command: str, command_args: list[str], concurrency: int,
+                duration: float) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    config = {"mcpServers": {"bench-proxied": {"command": command, "args": command_args}}}
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, NACOS_ADDR=address, NACOS_PASSWORD="nacos", MODE="proxy",
+                   PROXY_ENGINE=engine, PROXIED_MCP_NAME="bench-proxied",
+                   PROXIED_MCP_SERVER_CONFIG=json.dumps(config), AUTO_REGISTER_TOOLS="false",
+                   TRANSPORT_TYPE="streamable_http", PORT=str(port))
+        process = subprocess.Popen([sys.executable, "-m", "nacos_mcp_router"], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(_wait_for_router(url, timeout=60))
+            return asyncio.run(_proxy_load(url, concurrency, duration))
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return ""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="nacos-mcp-router benchmarks against fake backends")
+    parser.add_argument("--servers", type=int, default=200, help="number of MCP servers registered in fake Nacos")
+    parser.add_argument("--tools", type=int, default=5, help="tools per MCP server")
+    parser.add_argument("--nacos-latency", type=float, default=0.0, help="fake Nacos latency per request (s)")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="fake MCP server latency per call (s)")
+    parser.add_argument("--refresh-rounds", type=int, default=3)
+    parser.add_argument("--search-iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of use_tool load per transport")
+    parser.add_argument("--transports", default="stdio,sse,streamable_http")
+    parser.add_argument("--proxy-engines", default="session,passthrough",
+                        help="proxy mode engines to compare, empty to skip")
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl"))
+    args = parser.parse_args()
+
+    nacos = FakeNacosServer(latency=args.nacos_latency)
+    nacos.populate(args.servers, tool_count=args.tools, latency=args.tool_latency)
+    command, command_args = stdio_command(args.tool_latency, args.tools)
+    nacos.add_stdio_server("bench-stdio", "benchmark stdio server", command, command_args, args.tools)
+    http_servers = []
+    transports = [t.strip() for t in args.transports.split(",") if t.strip()]
+    for transport in ("sse", "streamable_http"):
+        if transport in transports:
+            server = FakeMcpHttpServer(transport, latency=args.tool_latency, tool_count=args.tools).start()
+            nacos.add_remote_server(f"bench-{transport}", f"benchmark {transport} server", server.protocol,
+                                    server.host, server.port, server.export_path, args.tools)
+            http_servers.append(server)
+    nacos.start()
+
+    results: dict = {}
+    try:
+        updater = setup_router(nacos.address)
+
+        async def run_async() -> None:
+            results["refresh"] = await bench_refresh(updater, args.refresh_rounds)
+            results["search"] = await bench_search(args.search_iterations)
+            results["use_tool"] = {}
+            for transport in transports:
+                results["use_tool"][transport] = await bench_use_tool(f"bench-{transport}", args.concurrency,
+                                                                      args.duration)
+            await router.tool_registrar.flush(timeout=5)
+
+        asyncio.run(run_async())
+        engines = [e.strip() for e in args.proxy_engines.split(",") if e.strip()]
+        if engines:
+            results["proxy"] = {engine: bench_proxy(nacos.address, engine, command, command_args, args.concurrency,
+                                                    args.duration) for engine in engines}
+        if not args.skip_startup:
+            results["startup"] = bench_startup(nacos.address, timeout=60)
+    finally:
+        nacos.stop()
+        for server in http_servers:
+            server.stop()
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
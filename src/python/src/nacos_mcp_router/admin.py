@@ -0,0 +1,102 @@
+#-*- coding: utf-8 -*-
+"""
+sse/streamable_http模式下的管理接口，ADMIN_TOKEN非空时启用，请求需携带 Authorization: Bearer <ADMIN_TOKEN>：
+    GET    /admin/registry        缓存的注册表条目及其md5
+    POST   /admin/registry/refresh 立即刷新注册表
+    GET    /admin/index           向量索引大小和最近一次构建耗时
+    GET    /admin/servers         已安装的MCP server：协议、连接状态、空闲时间、进行中的调用数
+    DELETE /admin/servers/{name}  关闭并移除一个已安装的MCP server，下次调用时重新安装
+    GET    /debug/profile         ENABLE_PROFILING=true时提供，对事件循环做cProfile采样
+"""
+import hmac
+import time
+from typing import Awaitable, Callable
+
+from .loop_monitor import profile_endpoint
+from .mcp_manager import McpUpdater
+from .router_types import CustomServer
+
+
+class AdminApi:
+  def __init__(self,
+               token: str,
+               servers: dict[str, CustomServer],
+               updater: McpUpdater | None,
+               evict: Callable[[str], Awaitable[bool]],
+               enable_profiling: bool = False) -> None:
+    self.token = token
+    self.servers = servers
+    self.updater = updater
+    self.evict = evict
+    self.enable_profiling = enable_profiling
+
+  def _authorized(self, request) -> bool:
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), self.token.encode())
+
+  def _endpoint(self, handler):
+    from starlette.responses import JSONResponse
+
+    async def endpoint(request):
+      if not self._authorized(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+      return await handler(request)
+    return endpoint
+
+  def routes(self) -> list:
+    from starlette.routing import Route
+
+    routes = [
+      Route("/admin/registry", endpoint=self._endpoint(self.registry), methods=["GET"]),
+      Route("/admin/registry/refresh", endpoint=self._endpoint(self.refresh), methods=["POST"]),
+      Route("/admin/index", endpoint=self._endpoint(self.index), methods=["GET"]),
+      Route("/admin/servers", endpoint=self._endpoint(self.installed_servers), methods=["GET"]),
+      Route("/admin/servers/{name}", endpoint=self._endpoint(self.evict_server), methods=["DELETE"]),
+    ]
+    if self.enable_profiling:
+      routes.append(Route("/debug/profile", endpoint=self._endpoint(profile_endpoint), methods=["GET"]))
+    return routes
+
+  def _registry_body(self) -> dict:
+    servers = self.updater.registry_entries()
+    return {"size": len(servers), "last_refresh_time": self.updater.last_refresh_time,
+            "last_refresh_seconds": self.updater.last_refresh_seconds, "servers": servers}
+
+  async def registry(self, request):
+    from starlette.responses import JSONResponse
+
+    if self.updater is None:
+      return JSONResponse({"error": "registry is not initialized"}, status_code=503)
+    return JSONResponse(self._registry_body())
+
+  async def refresh(self, request):
+    from starlette.responses import JSONResponse
+
+    if self.updater is None:
+      return JSONResponse({"error": "registry is not initialized"}, status_code=503)
+    if not await self.updater.refresh_now():
+      return JSONResponse({"error": "registry is read-only in this process"}, status_code=409)
+    return JSONResponse(self._registry_body())
+
+  async def index(self, request):
+    from starlette.concurrency import run_in_threadpool
+    from starlette.responses import JSONResponse
+
+    if self.updater is None:
+      return JSONResponse({"error": "registry is not initialized"}, status_code=503)
+    # 统计条数需要查询Chroma，放到线程中执行
+    return JSONResponse(await run_in_threadpool(self.updater.index_stats))
+
+  async def installed_servers(self, request):
+    from starlette.responses import JSONResponse
+
+    servers = [server.to_dict() for server in list(self.servers.values()) if server is not None]
+    return JSONResponse({"time": time.time(), "size": len(servers), "servers": servers})
+
+  async def evict_server(self, request):
+    from starlette.responses import JSONResponse
+
+    name = request.path_params["name"]
+    if not await self.evict(name):
+      return JSONResponse({"error": f"mcp server {name} is not installed"}, status_code=404)
+    return JSONResponse({"evicted": name})
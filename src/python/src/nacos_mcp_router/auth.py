@@ -1,3 +1,10 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Awaitable, Callable
+
+
 class Credentials(object):
     def __init__(self, access_key_id, access_key_secret, security_token=None):
         self.access_key_id = access_key_id
@@ -23,4 +30,95 @@ class StaticCredentialsProvider(CredentialsProvider):
         self.credentials = Credentials(access_key_id, access_key_secret, security_token)
 
     def get_credentials(self) -> Credentials:
-        return self.credentials
\ No newline at end of file
+        return self.credentials
+
+class AccessToken(object):
+    def __init__(self, token: str, ttl: float, obtained_at: float | None = None):
+        self.token = token
+        self.ttl = ttl
+        self.obtained_at = time.monotonic() if obtained_at is None else obtained_at
+
+    @property
+    def expires_at(self) -> float:
+        return self.obtained_at + self.ttl
+
+    def refresh_at(self, ratio: float) -> float:
+        return self.obtained_at + self.ttl * (1 - ratio)
+
+
+class TokenCredentialsProvider(StaticCredentialsProvider):
+    """
+    Nacos用户名密码登录一次后缓存accessToken，请求时只携带token。
+
+    token剩余有效期不足refresh_ratio时，第一个发现的请求在后台刷新，其他请求继续使用旧token；
+    token过期或被服务端拒绝时，并发的请求共享同一次登录（single-flight）。
+    NacosHttpClient在刷新线程和MCP服务线程的不同事件循环中使用，因此用concurrent.futures.Future共享登录结果。
+    登录失败（例如Nacos未开启鉴权或版本不支持）时在retry_interval内不再尝试，退回到原有的请求头方式。
+    """
+
+    def __init__(self, login: Callable[[], Awaitable[AccessToken | None]], access_key_id="", access_key_secret="",
+                 refresh_ratio: float = 0.2, retry_interval: float = 60, clock: Callable[[], float] = time.monotonic):
+        super().__init__(access_key_id, access_key_secret)
+        self._login = login
+        self._clock = clock
+        self.refresh_ratio = refresh_ratio
+        self.retry_interval = retry_interval
+        self._token: AccessToken | None = None
+        self._inflight: concurrent.futures.Future | None = None
+        self._lock = threading.Lock()
+        self._retry_after = 0.0
+        self._background: set[asyncio.Task] = set()
+
+    def get_credentials(self) -> Credentials:
+        token = self._token
+        credentials = super().get_credentials()
+        if token is None or token.expires_at <= self._clock():
+            return credentials
+        return Credentials(credentials.access_key_id, credentials.access_key_secret, token.token)
+
+    async def get_token(self) -> str | None:
+        now = self._clock()
+        token = self._token
+        if token is not None and now < token.expires_at:
+            if now >= token.refresh_at(self.refresh_ratio) and now >= self._retry_after and self._inflight is None:
+                # 提前刷新，当前请求继续使用未过期的token
+                task = asyncio.create_task(self._refresh())
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return token.token
+        if now < self._retry_after:
+            return None
+        token = await self._refresh()
+        return token.token if token is not None else None
+
+    def invalidate(self, token: str | None) -> None:
+        """服务端拒绝了token，下次请求重新登录"""
+        with self._lock:
+            if self._token is not None and self._token.token == token:
+                self._token = None
+
+    async def _refresh(self) -> AccessToken | None:
+        with self._lock:
+            future = self._inflight
+            leader = future is None
+            if leader:
+                future = self._inflight = concurrent.futures.Future()
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        token = None
+        completed = False
+        try:
+            token = await self._login()
+            completed = True
+        except Exception:
+            completed = True
+        finally:
+            with self._lock:
+                if token is not None:
+                    self._token = token
+                elif completed:
+                    self._retry_after = self._clock() + self.retry_interval
+                self._inflight = None
+            future.set_result(token)
+        return token
@@ -0,0 +1,169 @@
+#-*- coding: utf-8 -*-
+"""
+大体积二进制工具结果（截图、文件等）的磁盘存储。
+
+超过BLOB_SPILL_BYTES的图片、音频和blob资源在返回前写入磁盘，结果中只保留一条资源说明，
+客户端通过 resources/read 按需读取，路由的事件存储、缓存等不再持有多MB的base64字符串。
+文件名为以BLOB_STORE_KEY为密钥的内容HMAC，无法由其他会话猜到，多个worker配置相同的密钥时可以共享同一目录并去重；
+resources/list 只列出当前会话写入的文件。总大小超过BLOB_STORE_MAX_BYTES时删除最久未访问的文件。
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import secrets
+import time
+import weakref
+from typing import Any, Sequence
+
+from mcp import types
+
+from .logger import NacosMcpRouteLogger
+from .router_exceptions import NacosMcpRouterException
+from .tool_result import Content
+
+logger = NacosMcpRouteLogger.get_logger()
+
+URI_PREFIX = "nacos-mcp-router://blobs/"
+_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")
+
+
+class BlobNotFound(NacosMcpRouterException):
+  pass
+
+
+class BlobStore:
+  def __init__(self, directory: str, spill_bytes: int, max_bytes: int = 1 << 30, key: bytes | None = None) -> None:
+    self.directory = directory
+    self.spill_bytes = spill_bytes
+    self.max_bytes = max_bytes
+    # 未配置密钥时每个进程随机生成，同一进程内仍然去重
+    self._key = key or secrets.token_bytes(32)
+    self._lock = asyncio.Lock()
+    self._owners: weakref.WeakKeyDictionary[Any, set[str]] = weakref.WeakKeyDictionary()
+
+  @classmethod
+  def from_env(cls) -> "BlobStore | None":
+    spill_bytes = int(os.getenv("BLOB_SPILL_BYTES", "0"))
+    if spill_bytes <= 0:
+      return None
+    directory = os.getenv("BLOB_STORE_DIR", os.path.expanduser("~") + "/.nacos_mcp_router/blobs")
+    key = os.getenv("BLOB_STORE_KEY", "")
+    return cls(directory, spill_bytes, int(os.getenv("BLOB_STORE_MAX_BYTES", str(1 << 30))), key.encode() or None)
+
+  def _should_spill(self, data: str) -> bool:
+    # base64长度换算为解码后的大小，不需要先解码
+    return len(data) * 3 // 4 > self.spill_bytes
+
+  async def spill(self, content: Sequence[Content], owner: Any = None) -> list[Content]:
+    """
+    把超过阈值的二进制content写入磁盘，替换为资源说明；其他content原样返回。
+    owner为写入结果的MCP会话，uris_for(owner)只返回该会话写入的文件。
+    """
+    result: list[Content] = []
+    for item in content:
+      data, mime_type = None, None
+      if isinstance(item, (types.ImageContent, types.AudioContent)):
+        data, mime_type = item.data, item.mimeType
+      elif isinstance(item, types.EmbeddedResource) and isinstance(item.resource, types.BlobResourceContents):
+        data, mime_type = item.resource.blob, item.resource.mimeType
+      if data is None or not self._should_spill(data):
+        result.append(item)
+        continue
+      try:
+        uri, size = await self._write(data, mime_type)
+      except (binascii.Error, OSError) as e:
+        logger.warning(f"failed to spill {item.type} content to {self.directory}", exc_info=e)
+        result.append(item)
+        continue
+      if owner is not None:
+        self._owners.setdefault(owner, set()).add(uri)
+      result.append(types.TextContent(
+        type="text",
+        text=f"[{item.type} content of {size} bytes ({mime_type or 'application/octet-stream'}) "
+             f"stored as resource {uri}, read it with resources/read]"))
+    return result
+
+  async def _write(self, data: str, mime_type: str | None) -> tuple[str, int]:
+    raw = base64.b64decode(data, validate=True)
+    name = hmac.new(self._key, raw, hashlib.sha256).hexdigest() + (mimetypes.guess_extension(mime_type or "") or "")
+    path = os.path.join(self.directory, name)
+
+    def write() -> None:
+      os.makedirs(self.directory, exist_ok=True)
+      if os.path.exists(path):
+        os.utime(path)
+        return
+      tmp_path = f"{path}.{os.getpid()}.tmp"
+      with open(tmp_path, "wb") as f:
+        f.write(raw)
+      os.replace(tmp_path, path)
+
+    async with self._lock:
+      await asyncio.to_thread(write)
+      await asyncio.to_thread(self._evict)
+    return URI_PREFIX + name, len(raw)
+
+  def _evict(self) -> None:
+    entries = []
+    total = 0
+    for entry in os.scandir(self.directory):
+      if entry.is_file() and _NAME_PATTERN.match(entry.name):
+        st = entry.stat()
+        entries.append((max(st.st_atime_ns, st.st_mtime_ns), st.st_size, entry.path))
+        total += st.st_size
+    if total <= self.max_bytes:
+      return
+    for _, size, path in sorted(entries):
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total -= size
+      if total <= self.max_bytes:
+        break
+
+  def _path(self, uri: str) -> str:
+    if not uri.startswith(URI_PREFIX):
+      raise BlobNotFound(uri)
+    name = uri[len(URI_PREFIX):]
+    if not _NAME_PATTERN.match(name):
+      raise BlobNotFound(uri)
+    return os.path.join(self.directory, name)
+
+  async def read(self, uri: str) -> tuple[bytes, str]:
+    path = self._path(uri)
+
+    def read_file() -> bytes:
+      with open(path, "rb") as f:
+        data = f.read()
+      now = time.time()
+      os.utime(path, (now, os.stat(path).st_mtime))
+      return data
+
+    try:
+      data = await asyncio.to_thread(read_file)
+    except FileNotFoundError:
+      raise BlobNotFound(uri) from None
+    return data, mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+  def uris_for(self, owner: Any) -> list[str]:
+    """owner写入且尚未被淘汰的文件"""
+    uris = self._owners.get(owner) if owner is not None else None
+    if not uris:
+      return []
+    for uri in list(uris):
+      if not os.path.exists(self._path(uri)):
+        uris.discard(uri)
+    return sorted(uris)
+
+  def list_uris(self) -> list[str]:
+    try:
+      return sorted(URI_PREFIX + entry.name for entry in os.scandir(self.directory)
+                    if entry.is_file() and _NAME_PATTERN.match(entry.name))
+    except FileNotFoundError:
+      return []
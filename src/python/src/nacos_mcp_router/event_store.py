@@ -0,0 +1,55 @@
+#-*- coding: utf-8 -*-
+"""
+streamable_http有状态模式下的事件存储。
+
+客户端的SSE流断开后可以携带Last-Event-ID重新连接，服务端从这里重放之后的事件，
+长时间运行的use_tool结果不会因为网络抖动丢失。
+"""
+import itertools
+from collections import OrderedDict, deque
+
+from mcp.server.streamable_http import EventCallback, EventId, EventMessage, EventStore, StreamId
+from mcp.types import JSONRPCMessage
+
+
+class InMemoryEventStore(EventStore):
+  """每个流最多保留max_events_per_stream条事件，流的数量超过max_streams时淘汰最久未写入的流"""
+
+  def __init__(self, max_events_per_stream: int = 100, max_streams: int = 1000) -> None:
+    self.max_events_per_stream = max_events_per_stream
+    self.max_streams = max_streams
+    self._streams: OrderedDict[StreamId, deque[tuple[int, JSONRPCMessage]]] = OrderedDict()
+    self._event_streams: dict[int, StreamId] = {}
+    self._counter = itertools.count(1)
+
+  async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+    event_id = next(self._counter)
+    events = self._streams.get(stream_id)
+    if events is None:
+      events = self._streams[stream_id] = deque()
+      while len(self._streams) > self.max_streams:
+        _, evicted = self._streams.popitem(last=False)
+        for evicted_id, _ in evicted:
+          self._event_streams.pop(evicted_id, None)
+    else:
+      self._streams.move_to_end(stream_id)
+
+    if len(events) >= self.max_events_per_stream:
+      oldest_id, _ = events.popleft()
+      self._event_streams.pop(oldest_id, None)
+    events.append((event_id, message))
+    self._event_streams[event_id] = stream_id
+    return str(event_id)
+
+  async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> StreamId | None:
+    try:
+      last_id = int(last_event_id)
+    except ValueError:
+      return None
+    stream_id = self._event_streams.get(last_id)
+    if stream_id is None:
+      return None
+    for event_id, message in list(self._streams.get(stream_id, ())):
+      if event_id > last_id:
+        await send_callback(EventMessage(message, str(event_id)))
+    return stream_id
@@ -0,0 +1,357 @@
+#-*- coding: utf-8 -*-
+"""
+本地的Nacos及MCP server模拟实现，用于基准测试和离线压测，不依赖真实的Nacos。
+
+FakeNacosServer:     实现Nacos v3 admin MCP接口（列表、详情、更新），可配置数量和延迟
+FakeMcpHttpServer:   SSE或streamable HTTP协议的MCP server
+fake stdio server:   python fake_backends.py stdio
+
+除列出的工具外，fake MCP server还接受两个不出现在工具列表中的调用，供测试使用：
+crash（退出进程，模拟下游异常退出）和traceparent（返回请求_meta中的traceparent）。
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+import anyio
+import uvicorn
+from mcp import types
+from mcp.server import Server
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+
+def _bind_socket(host: str) -> socket.socket:
+  sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+  sock.bind((host, 0))
+  return sock
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+  """
+  所有fake HTTP server共用一个后台事件循环。
+  sse_starlette的退出事件是进程级的，多个事件循环同时使用会报错。
+  """
+  global _loop
+  with _loop_lock:
+    if _loop is None:
+      _loop = asyncio.new_event_loop()
+      threading.Thread(target=_loop.run_forever, name="fake-backends", daemon=True).start()
+    return _loop
+
+
+class _ThreadedUvicorn:
+  """在后台事件循环中运行的uvicorn，绑定随机端口"""
+
+  def __init__(self, app, host: str = "127.0.0.1") -> None:
+    self.host = host
+    self._socket = _bind_socket(host)
+    self.port: int = self._socket.getsockname()[1]
+    self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=self.port, log_level="warning", lifespan="on",
+                                                 timeout_graceful_shutdown=2))
+    self._future = None
+
+  def start(self, timeout: float = 10) -> "_ThreadedUvicorn":
+    self._future = asyncio.run_coroutine_threadsafe(self._server.serve(sockets=[self._socket]), _background_loop())
+    deadline = time.monotonic() + timeout
+    while not self._server.started:
+      if time.monotonic() > deadline or self._future.done():
+        raise RuntimeError("fake server failed to start")
+      time.sleep(0.01)
+    return self
+
+  def stop(self) -> None:
+    self._server.should_exit = True
+    if self._future is not None:
+      with contextlib.suppress(Exception):
+        self._future.result(timeout=10)
+
+  @property
+  def address(self) -> str:
+    return f"{self.host}:{self.port}"
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc):
+    self.stop()
+
+
+def fake_tools(tool_count: int) -> list[dict[str, Any]]:
+  tools = [
+    {"name": "echo", "description": "Echo the given text back.",
+     "inputSchema": {"type": "object", "properties": {"text": {"type": "string", "description": "text to echo"}}}},
+    {"name": "sleep", "description": "Sleep for the given number of seconds, reporting progress.",
+     "inputSchema": {"type": "object", "properties": {"seconds": {"type": "number", "description": "seconds"}}}},
+  ]
+  for i in range(max(tool_count - len(tools), 0)):
+    tools.append({"name": f"tool_{i}", "description": f"Filler tool number {i} that returns its arguments.",
+                  "inputSchema": {"type": "object", "properties": {"value": {"type": "string", "description": "value"}}}})
+  return tools[:max(tool_count, 1)]
+
+
+def stdio_command(latency: float = 0.0, tool_count: int = 2) -> tuple[str, list[str]]:
+  # 按文件路径运行，避免子进程导入整个nacos_mcp_router包（chromadb等）
+  return sys.executable, [os.path.abspath(__file__), "stdio", "--latency", str(latency), "--tools", str(tool_count)]
+
+
+class FakeNacosServer(_ThreadedUvicorn):
+  """
+  模拟Nacos v3 admin接口：
+      POST /nacos/v3/auth/user/login
+      GET /nacos/v3/admin/ai/mcp/list
+      GET /nacos/v3/admin/ai/mcp
+      PUT /nacos/v3/admin/ai/mcp
+  require_token为True时admin接口只接受登录得到的accessToken，token有效期为token_ttl秒。
+  """
+
+  def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", require_token: bool = False,
+               token_ttl: float = 18000) -> None:
+    self.latency = latency
+    self.servers: dict[str, dict[str, Any]] = {}
+    self.request_count = 0
+    self.update_count = 0
+    self.login_count = 0
+    self.require_token = require_token
+    self.token_ttl = token_ttl
+    self.tokens: dict[str, float] = {}
+    self.last_headers: dict[str, str] = {}
+    app = Starlette(routes=[
+      Route("/nacos/v3/auth/user/login", endpoint=self._login, methods=["POST"]),
+      Route("/nacos/v3/admin/ai/mcp/list", endpoint=self._list, methods=["GET"]),
+      Route("/nacos/v3/admin/ai/mcp", endpoint=self._detail, methods=["GET"]),
+      Route("/nacos/v3/admin/ai/mcp", endpoint=self._update, methods=["PUT"]),
+    ])
+    super().__init__(app, host)
+
+  def add_stdio_server(self, name: str, description: str, command: str, args: list[str],
+                       tool_count: int = 2) -> None:
+    self.servers[name] = self._spec(name, description, "stdio", tool_count,
+                                    localServerConfig={"mcpServers": {name: {"command": command, "args": args}}})
+
+  def add_remote_server(self, name: str, description: str, protocol: str, host: str, port: int,
+                        export_path: str, tool_count: int = 2) -> None:
+    self.servers[name] = self._spec(
+      name, description, protocol, tool_count,
+      remoteServerConfig={"serviceRef": {"namespaceId": "public", "groupName": "DEFAULT_GROUP", "serviceName": name},
+                          "exportPath": export_path},
+      backendEndpoints=[{"address": host, "port": port}])
+
+  def populate(self, count: int, tool_count: int = 5, latency: float = 0.0, prefix: str = "fake-server") -> list[str]:
+    """生成count个stdio协议的fake MCP server，返回名称列表"""
+    command, args = stdio_command(latency, tool_count)
+    names = []
+    for i in range(count):
+      name = f"{prefix}-{i}"
+      self.add_stdio_server(name, f"Fake MCP server {i} for benchmark, topic-{i % 10}", command, args, tool_count)
+      names.append(name)
+    return names
+
+  def _spec(self, name: str, description: str, protocol: str, tool_count: int, **extra) -> dict[str, Any]:
+    spec = {
+      "id": f"id-{name}",
+      "name": name,
+      "protocol": protocol,
+      "frontProtocol": protocol,
+      "description": description,
+      "version": "1.0.0",
+      "enabled": True,
+      "remoteServerConfig": {},
+      "localServerConfig": {},
+      "backendEndpoints": [],
+      "toolSpec": {"tools": fake_tools(tool_count), "toolsMeta": {}},
+      "versionDetail": {"version": "1.0.0"},
+    }
+    spec.update(extra)
+    return spec
+
+  @staticmethod
+  def _ok(data: Any) -> JSONResponse:
+    return JSONResponse({"code": 0, "message": "success", "data": data})
+
+  async def _delay(self, request: Request) -> JSONResponse | None:
+    """返回非None时表示请求被拒绝"""
+    self.request_count += 1
+    self.last_headers = dict(request.headers)
+    if self.latency > 0:
+      await asyncio.sleep(self.latency)
+    if self.require_token and self.tokens.get(request.headers.get("accessToken", ""), 0) <= time.monotonic():
+      return JSONResponse({"code": 403, "message": "token invalid", "data": None}, status_code=403)
+    return None
+
+  async def _login(self, request: Request) -> JSONResponse:
+    form = await request.form()
+    if not form.get("username") or not form.get("password"):
+      return JSONResponse({"code": 403, "message": "unknown user"}, status_code=403)
+    self.login_count += 1
+    token = f"token-{self.login_count}"
+    self.tokens[token] = time.monotonic() + self.token_ttl
+    return JSONResponse({"accessToken": token, "tokenTtl": self.token_ttl, "globalAdmin": True,
+                         "username": form["username"]})
+
+  async def _list(self, request: Request) -> JSONResponse:
+    if (denied := await self._delay(request)) is not None:
+      return denied
+    page_no = int(request.query_params.get("pageNo", 1))
+    page_size = int(request.query_params.get("pageSize", 100))
+    items = list(self.servers.values())
+    page = items[(page_no - 1) * page_size: page_no * page_size]
+    return self._ok({
+      "totalCount": len(items),
+      "pageNumber": page_no,
+      "pagesAvailable": (len(items) + page_size - 1) // page_size,
+      "pageItems": [{k: s[k] for k in ("id", "name", "protocol", "description", "enabled")} for s in page],
+    })
+
+  async def _detail(self, request: Request) -> JSONResponse:
+    if (denied := await self._delay(request)) is not None:
+      return denied
+    name = request.query_params.get("mcpName")
+    mcp_id = request.query_params.get("mcpId")
+    if mcp_id and mcp_id.startswith("id-"):
+      name = mcp_id[len("id-"):]
+    spec = self.servers.get(name)
+    if spec is not None:
+      return self._ok(json.loads(json.dumps(spec)))
+    return JSONResponse({"code": 404, "message": "mcp server not found", "data": None}, status_code=404)
+
+  async def _update(self, request: Request) -> JSONResponse:
+    if (denied := await self._delay(request)) is not None:
+      return denied
+    form = await request.form()
+    self.update_count += 1
+    name = form.get("mcpName")
+    if name in self.servers and form.get("toolSpecification"):
+      self.servers[name]["toolSpec"] = json.loads(form["toolSpecification"])
+    return self._ok("ok")
+
+
+def create_fake_mcp_app(name: str = "fake-mcp-server", latency: float = 0.0, tool_count: int = 2) -> Server:
+  app = Server(name)
+  tools = [types.Tool(**tool) for tool in fake_tools(tool_count)]
+
+  @app.list_tools()
+  async def list_tools() -> list[types.Tool]:
+    return tools
+
+  @app.call_tool()
+  async def call_tool(tool_name: str, arguments: dict) -> list[types.TextContent]:
+    if latency > 0:
+      await asyncio.sleep(latency)
+    if tool_name == "crash":
+      os._exit(1)
+    if tool_name == "traceparent":
+      meta = app.request_context.meta
+      return [types.TextContent(type="text", text=str(getattr(meta, "traceparent", "")))]
+    if tool_name == "sleep":
+      # 调用方携带progressToken时分步汇报进度
+      seconds = float(arguments.get("seconds", 0))
+      meta = app.request_context.meta
+      progress_token = meta.progressToken if meta is not None else None
+      steps = 4 if progress_token is not None else 1
+      for step in range(steps):
+        await asyncio.sleep(seconds / steps)
+        if progress_token is not None:
+          await app.request_context.session.send_progress_notification(
+            progress_token, step + 1, steps, related_request_id=str(app.request_context.request_id))
+      return [types.TextContent(type="text", text="done")]
+    if tool_name == "echo":
+      return [types.TextContent(type="text", text=str(arguments.get("text", "")))]
+    return [types.TextContent(type="text", text=json.dumps(arguments))]
+
+  return app
+
+
+class FakeMcpHttpServer(_ThreadedUvicorn):
+  """SSE（/sse）或streamable HTTP（/mcp）协议的fake MCP server"""
+
+  def __init__(self, transport: str = "streamable_http", latency: float = 0.0, tool_count: int = 2,
+               host: str = "127.0.0.1") -> None:
+    self.transport = transport
+    mcp_app = create_fake_mcp_app(latency=latency, tool_count=tool_count)
+    if transport == "sse":
+      from mcp.server.sse import SseServerTransport
+      sse_transport = SseServerTransport("/messages/")
+
+      async def handle_sse(request):
+        async with sse_transport.connect_sse(request.scope, request.receive, request._send) as streams:
+          await mcp_app.run(streams[0], streams[1], mcp_app.create_initialization_options())
+        return Response()
+
+      app = Starlette(routes=[
+        Route("/sse", endpoint=handle_sse, methods=["GET"]),
+        Mount("/messages/", app=sse_transport.handle_post_message),
+      ])
+      self.export_path = "/sse"
+    else:
+      from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+      session_manager = StreamableHTTPSessionManager(app=mcp_app, event_store=None, json_response=False, stateless=True)
+
+      async def handle_streamable_http(scope, receive, send):
+        await session_manager.handle_request(scope, receive, send)
+
+      @contextlib.asynccontextmanager
+      async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with session_manager.run():
+          yield
+
+      app = Starlette(routes=[Mount("/mcp", app=handle_streamable_http)], lifespan=lifespan)
+      self.export_path = "/mcp"
+    super().__init__(app, host)
+
+  @property
+  def protocol(self) -> str:
+    return "mcp-sse" if self.transport == "sse" else "mcp-streamable"
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(description="fake MCP server / Nacos for benchmarks")
+  sub = parser.add_subparsers(dest="command", required=True)
+  stdio = sub.add_parser("stdio", help="run a fake stdio MCP server")
+  stdio.add_argument("--latency", type=float, default=0.0)
+  stdio.add_argument("--tools", type=int, default=2)
+  nacos = sub.add_parser("nacos", help="run a fake Nacos server in the foreground")
+  nacos.add_argument("--servers", type=int, default=100)
+  nacos.add_argument("--latency", type=float, default=0.0)
+  args = parser.parse_args()
+
+  if args.command == "stdio":
+    from mcp.server.stdio import stdio_server
+    app = create_fake_mcp_app(latency=args.latency, tool_count=args.tools)
+
+    async def arun():
+      async with stdio_server() as streams:
+        await app.run(streams[0], streams[1], app.create_initialization_options())
+
+    anyio.run(arun)
+    return 0
+
+  server = FakeNacosServer(latency=args.latency)
+  server.populate(args.servers)
+  server.start()
+  print(f"fake nacos listening on {server.address}", flush=True)
+  try:
+    while True:
+      time.sleep(3600)
+  except KeyboardInterrupt:
+    server.stop()
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
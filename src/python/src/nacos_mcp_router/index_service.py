@@ -0,0 +1,109 @@
+#-*- coding: utf-8 -*-
+"""
+多进程模式下的向量检索服务。
+
+Chroma的持久化客户端在进程内缓存索引，多个进程打开同一个目录时读不到其他进程之后写入的数据，
+而且每个进程都要加载一份embedding模型。多进程模式下只有主进程持有Chroma：
+主进程刷新注册表时更新向量索引，并在Unix domain socket上提供检索；
+worker把向量检索转发给主进程，返回的server名称再从worker读取的注册表快照中取出。
+
+每个连接一个请求：客户端写入一行JSON，服务端返回一行JSON。
+"""
+import asyncio
+import json
+import os
+import socket
+import socketserver
+import threading
+from typing import Any
+
+from .logger import NacosMcpRouteLogger
+from .tool_index import ToolMatch
+
+logger = NacosMcpRouteLogger.get_logger()
+
+_REQUEST_TIMEOUT = 10.0
+
+
+class _Handler(socketserver.StreamRequestHandler):
+  def handle(self) -> None:
+    try:
+      response = {"result": self.server.index_server.handle(json.loads(self.rfile.readline()))}
+    except Exception as e:
+      logger.warning("failed to handle index request", exc_info=e)
+      response = {"error": repr(e)}
+    self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class IndexServer:
+  """主进程的向量检索服务，updater为持有Chroma的McpUpdater"""
+
+  def __init__(self, path: str, updater: Any) -> None:
+    self.path = path
+    self.updater = updater
+    self._server: socketserver.ThreadingUnixStreamServer | None = None
+
+  def start(self) -> "IndexServer":
+    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+    if os.path.exists(self.path):
+      os.unlink(self.path)
+    self._server = socketserver.ThreadingUnixStreamServer(self.path, _Handler)
+    self._server.daemon_threads = True
+    self._server.index_server = self
+    os.chmod(self.path, 0o600)
+    threading.Thread(target=self._server.serve_forever, name="nacos-mcp-router-index", daemon=True).start()
+    logger.info(f"serving vector search for workers on {self.path}")
+    return self
+
+  def close(self) -> None:
+    if self._server is None:
+      return
+    self._server.shutdown()
+    self._server.server_close()
+    self._server = None
+    try:
+      os.unlink(self.path)
+    except FileNotFoundError:
+      pass
+
+  def handle(self, request: dict[str, Any]) -> Any:
+    op = request.get("op")
+    if op == "servers":
+      return self.updater.query_server_ids(request["query"], int(request["count"]))
+    if op == "tools":
+      return [list(match) for match in self.updater.query_tools(request["query"], int(request["count"]))]
+    if op == "stats":
+      return self.updater.index_stats()
+    raise ValueError(f"unknown index request: {op}")
+
+
+class IndexClient:
+  """worker中转发向量检索的客户端，请求在线程中执行，不阻塞事件循环"""
+
+  def __init__(self, path: str, timeout: float = _REQUEST_TIMEOUT) -> None:
+    self.path = path
+    self.timeout = timeout
+
+  def request(self, op: str, **params: Any) -> Any:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+      sock.settimeout(self.timeout)
+      sock.connect(self.path)
+      sock.sendall(json.dumps(dict(params, op=op)).encode("utf-8") + b"\n")
+      with sock.makefile("rb") as f:
+        line = f.readline()
+    if not line:
+      raise ConnectionError(f"index server {self.path} closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+      raise RuntimeError(f"index request {op} failed: {response['error']}")
+    return response["result"]
+
+  async def query_server_ids(self, query: str, count: int) -> list[str]:
+    return await asyncio.to_thread(self.request, "servers", query=query, count=count)
+
+  async def query_tools(self, query: str, count: int) -> list[ToolMatch]:
+    matches = await asyncio.to_thread(self.request, "tools", query=query, count=count)
+    return [ToolMatch(*match) for match in matches]
+
+  def index_stats(self) -> dict:
+    return self.request("stats")
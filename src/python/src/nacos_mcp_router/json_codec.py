@@ -0,0 +1,62 @@
+#-*- coding: utf-8 -*-
+"""
+路由热路径上的JSON编解码。
+
+安装了orjson（pip install nacos-mcp-router[fast]）时使用orjson，否则使用标准库json；
+两种实现的输出一致：紧凑格式、不转义非ASCII字符。loads可以直接解析bytes，不需要先解码为str。
+"""
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+  if orjson is not None:
+    return orjson.loads(data)
+  return json.loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False, default: Callable[[Any], Any] | None = None) -> str:
+  if orjson is not None:
+    try:
+      return orjson.dumps(obj, default=default, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode("utf-8")
+    except TypeError:
+      # orjson不支持的类型（非str键、超过64位的整数等）交给标准库处理
+      pass
+  return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys, default=default)
+
+
+class FragmentCache:
+  """
+  缓存不变对象的序列化结果，例如搜索结果中每个server的名称和描述，
+  只有对应的key（包含描述本身）变化时才重新序列化。
+  """
+
+  def __init__(self, max_size: int = 4096) -> None:
+    self.max_size = max_size
+    self._fragments: OrderedDict[Hashable, str] = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._fragments)
+
+  def dumps(self, key: Hashable, obj: Any) -> str:
+    fragment = self._fragments.get(key)
+    if fragment is not None:
+      self._fragments.move_to_end(key)
+      return fragment
+    fragment = self._fragments[key] = dumps(obj)
+    if len(self._fragments) > self.max_size:
+      self._fragments.popitem(last=False)
+    return fragment
+
+
+def join_object(fragments: dict[str, str]) -> str:
+  """用已序列化的值拼接JSON对象"""
+  return "{" + ",".join(dumps(key) + ":" + value for key, value in fragments.items()) + "}"
@@ -0,0 +1,290 @@
+#-*- coding: utf-8 -*-
+"""
+nacos-mcp-router 压测工具。
+
+打开N个并发的MCP客户端会话连接到路由的 /sse 或 /mcp，按比例调用
+search_mcp_server、add_mcp_server、use_tool，输出吞吐、延迟分位数和错误率。
+
+    # 压测已有的路由
+    nacos-mcp-router-load --url http://127.0.0.1:8000 --transport streamable_http --server-name amap
+
+    # 完全离线：启动fake Nacos、fake MCP server和一个路由子进程
+    nacos-mcp-router-load --self-host --transport sse --sessions 50 --duration 30
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from .constants import TRANSPORT_TYPE_SSE, TRANSPORT_TYPE_STREAMABLE_HTTP
+
+OPERATIONS = ("search", "add", "use")
+_ERROR_PREFIXES = ("Error:", "failed to", "mcp server not found", "服务初始化中", "session quota exceeded",
+                   "session rate limit exceeded")
+_ERROR_MARKERS = (" is not found, use search_mcp_server",)
+
+
+@dataclass
+class OperationStats:
+  latencies: list[float] = field(default_factory=list)
+  errors: int = 0
+  error_samples: list[str] = field(default_factory=list)
+
+  def record(self, latency: float, error: str | None) -> None:
+    self.latencies.append(latency)
+    if error is not None:
+      self.errors += 1
+      if len(self.error_samples) < 5:
+        self.error_samples.append(error[:200])
+
+  def summary(self, wall: float) -> dict[str, Any]:
+    ordered = sorted(self.latencies)
+    count = len(ordered)
+    result: dict[str, Any] = {
+      "count": count,
+      "errors": self.errors,
+      "error_rate": round(self.errors / count, 4) if count else 0.0,
+      "throughput_rps": round(count / wall, 2) if wall > 0 else 0.0,
+    }
+    for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+      result[name] = round(ordered[min(int(q * count), count - 1)] * 1000, 3) if count else None
+    if self.error_samples:
+      result["error_samples"] = self.error_samples
+    return result
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+  """解析 "search=5,add=1,use=4" 形式的调用比例"""
+  weights: dict[str, float] = {}
+  for item in mix.split(","):
+    if not item.strip():
+      continue
+    name, _, weight = item.partition("=")
+    name = name.strip()
+    if name not in OPERATIONS:
+      raise ValueError(f"unknown operation in mix: {name}, expected one of {OPERATIONS}")
+    weights[name] = float(weight) if weight else 1.0
+  if not weights or sum(weights.values()) <= 0:
+    raise ValueError(f"invalid mix: {mix}")
+  return weights
+
+
+@contextlib.asynccontextmanager
+async def open_session(url: str, transport: str) -> AsyncIterator[ClientSession]:
+  if transport == TRANSPORT_TYPE_SSE:
+    context = sse_client(url=url.rstrip("/") + "/sse")
+  else:
+    context = streamablehttp_client(url=url.rstrip("/") + "/mcp")
+  async with context as streams:
+    async with ClientSession(streams[0], streams[1]) as session:
+      await session.initialize()
+      yield session
+
+
+class LoadTest:
+  def __init__(self, url: str, transport: str, sessions: int, duration: float, mix: dict[str, float],
+               server_name: str, tool_name: str, tool_args: dict[str, Any], ramp_up: float = 0.0) -> None:
+    self.url = url
+    self.transport = transport
+    self.sessions = sessions
+    self.duration = duration
+    self.mix = mix
+    self.server_name = server_name
+    self.tool_name = tool_name
+    self.tool_args = tool_args
+    self.ramp_up = ramp_up
+    self.stats = {name: OperationStats() for name in OPERATIONS}
+    self.connect = OperationStats()
+
+  def _arguments(self, operation: str, i: int) -> tuple[str, dict[str, Any]]:
+    if operation == "search":
+      return "search_mcp_server", {"task_description": f"load test task {i}", "key_words": self.server_name}
+    if operation == "add":
+      return "add_mcp_server", {"mcp_server_name": self.server_name}
+    return "use_tool", {"mcp_server_name": self.server_name, "mcp_tool_name": self.tool_name,
+                        "params": self.tool_args}
+
+  @staticmethod
+  def _error_of(result) -> str | None:
+    text = " ".join(getattr(c, "text", "") for c in result.content)
+    if result.isError:
+      return text or "isError"
+    # 路由把错误作为文本返回
+    if text.startswith(_ERROR_PREFIXES) or any(marker in text for marker in _ERROR_MARKERS):
+      return text
+    return None
+
+  async def _session_worker(self, index: int, deadline: float) -> None:
+    if self.ramp_up > 0:
+      await asyncio.sleep(self.ramp_up * index / self.sessions)
+    rng = random.Random(index)
+    names, weights = list(self.mix), list(self.mix.values())
+    start = time.perf_counter()
+    try:
+      async with open_session(self.url, self.transport) as session:
+        self.connect.record(time.perf_counter() - start, None)
+        i = 0
+        while time.perf_counter() < deadline:
+          operation = rng.choices(names, weights)[0]
+          tool, arguments = self._arguments(operation, i)
+          call_start = time.perf_counter()
+          try:
+            error = self._error_of(await session.call_tool(tool, arguments))
+          except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+          self.stats[operation].record(time.perf_counter() - call_start, error)
+          i += 1
+    except Exception as e:
+      self.connect.record(time.perf_counter() - start, f"{type(e).__name__}: {e}")
+
+  async def run(self) -> dict[str, Any]:
+    # 先安装一次，避免所有会话同时触发首次安装
+    if "use" in self.mix:
+      async with open_session(self.url, self.transport) as session:
+        await session.call_tool("add_mcp_server", {"mcp_server_name": self.server_name})
+
+    start = time.perf_counter()
+    deadline = start + self.ramp_up + self.duration
+    await asyncio.gather(*[self._session_worker(i, deadline) for i in range(self.sessions)])
+    wall = time.perf_counter() - start
+
+    total = OperationStats()
+    for name in OPERATIONS:
+      total.latencies.extend(self.stats[name].latencies)
+      total.errors += self.stats[name].errors
+    return {
+      "url": self.url,
+      "transport": self.transport,
+      "sessions": self.sessions,
+      "duration_s": round(wall, 3),
+      "connect": self.connect.summary(wall),
+      "total": total.summary(wall),
+      "operations": {name: self.stats[name].summary(wall) for name in OPERATIONS if name in self.mix},
+    }
+
+
+def _free_port() -> int:
+  with socket.socket() as sock:
+    sock.bind(("127.0.0.1", 0))
+    return sock.getsockname()[1]
+
+
+async def _wait_ready(url: str, transport: str, process: subprocess.Popen, server_name: str, timeout: float) -> None:
+  """等待路由可以连接，并且已经从Nacos加载到server_name"""
+  deadline = time.monotonic() + timeout
+  while True:
+    if process.poll() is not None:
+      raise RuntimeError(f"router exited with code {process.returncode}")
+    try:
+      async with open_session(url, transport) as session:
+        result = await session.call_tool("search_mcp_server", {"task_description": "ready", "key_words": server_name})
+        if f'"{server_name}"' in " ".join(getattr(c, "text", "") for c in result.content):
+          return
+        raise RuntimeError(f"{server_name} is not loaded yet")
+    except Exception:
+      if time.monotonic() > deadline:
+        raise
+      await asyncio.sleep(0.1)
+
+
+@contextlib.contextmanager
+def self_hosted_router(transport: str, fake_servers: int, tool_latency: float, nacos_latency: float,
+                       server_name: str):
+  """启动fake Nacos、fake MCP server和路由子进程，返回路由地址"""
+  from .fake_backends import FakeMcpHttpServer, FakeNacosServer, stdio_command
+
+  nacos = FakeNacosServer(latency=nacos_latency)
+  nacos.populate(fake_servers, latency=tool_latency)
+  command, args = stdio_command(tool_latency)
+  nacos.add_stdio_server("load-test-stdio", "load-test-stdio: fake stdio MCP server", command, args)
+  http_servers = [FakeMcpHttpServer(t, latency=tool_latency)
+                  for t in (TRANSPORT_TYPE_SSE, TRANSPORT_TYPE_STREAMABLE_HTTP)]
+  port = _free_port()
+  url = f"http://127.0.0.1:{port}"
+  with contextlib.ExitStack() as stack:
+    stack.enter_context(nacos)
+    for server in http_servers:
+      stack.enter_context(server)
+      nacos.add_remote_server(f"load-test-{server.transport}", f"load-test-{server.transport}: fake {server.transport} MCP server",
+                              server.protocol, server.host, server.port, server.export_path)
+    home = stack.enter_context(tempfile.TemporaryDirectory())
+    env = dict(os.environ, HOME=home, NACOS_ADDR=nacos.address, NACOS_PASSWORD="nacos", TRANSPORT_TYPE=transport,
+               PORT=str(port), ENABLE_VECTOR_DB="false", PYTHONUNBUFFERED="1")
+    process = subprocess.Popen([sys.executable, "-m", "nacos_mcp_router"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      asyncio.run(_wait_ready(url, transport, process, server_name, timeout=60))
+      yield url
+    finally:
+      process.terminate()
+      try:
+        process.wait(timeout=10)
+      except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(prog="nacos-mcp-router-load",
+                                   description="Load test a nacos-mcp-router over SSE or streamable HTTP")
+  parser.add_argument("--url", default="http://127.0.0.1:8000", help="router base url, without /sse or /mcp")
+  parser.add_argument("--transport", default=TRANSPORT_TYPE_STREAMABLE_HTTP,
+                      choices=[TRANSPORT_TYPE_SSE, TRANSPORT_TYPE_STREAMABLE_HTTP])
+  parser.add_argument("--sessions", type=int, default=10, help="concurrent MCP client sessions")
+  parser.add_argument("--duration", type=float, default=30.0, help="seconds of load after ramp up")
+  parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds to spread session start over")
+  parser.add_argument("--mix", default="search=2,add=1,use=7", help="weights of search/add/use calls")
+  parser.add_argument("--server-name", default="", help="MCP server used by add_mcp_server and use_tool")
+  parser.add_argument("--tool-name", default="echo", help="tool called through use_tool")
+  parser.add_argument("--tool-args", default='{"text": "hello"}', help="JSON arguments of the tool")
+  parser.add_argument("--self-host", action="store_true",
+                      help="start fake Nacos, fake MCP servers and a router subprocess, fully offline")
+  parser.add_argument("--fake-servers", type=int, default=100, help="MCP servers registered in the fake Nacos")
+  parser.add_argument("--downstream", default="stdio", choices=["stdio", "sse", "streamable_http"],
+                      help="protocol of the fake MCP server used by use_tool with --self-host")
+  parser.add_argument("--tool-latency", type=float, default=0.0, help="fake MCP server latency (s)")
+  parser.add_argument("--nacos-latency", type=float, default=0.0, help="fake Nacos latency (s)")
+  parser.add_argument("--output", default="", help="also write the JSON report to this file")
+  args = parser.parse_args()
+
+  mix = parse_mix(args.mix)
+  tool_args = json.loads(args.tool_args)
+
+  def run(url: str, server_name: str) -> dict[str, Any]:
+    load_test = LoadTest(url, args.transport, args.sessions, args.duration, mix, server_name, args.tool_name,
+                         tool_args, args.ramp_up)
+    return asyncio.run(load_test.run())
+
+  if args.self_host:
+    server_name = args.server_name or f"load-test-{args.downstream}"
+    with self_hosted_router(args.transport, args.fake_servers, args.tool_latency, args.nacos_latency,
+                            server_name) as url:
+      report = run(url, server_name)
+  else:
+    if not args.server_name and ("add" in mix or "use" in mix):
+      parser.error("--server-name is required for add/use calls unless --self-host is set")
+    report = run(args.url, args.server_name)
+
+  text = json.dumps(report, indent=2, ensure_ascii=False)
+  print(text)
+  if args.output:
+    with open(args.output, "w", encoding="utf-8") as f:
+      f.write(text + "\n")
+  return 1 if report["connect"]["errors"] == report["sessions"] else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,25 +1,57 @@
 #-*- coding: utf-8 -*-
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 热点路径日志的extra标记，开启采样时这类低于WARNING级别的日志按比例丢弃
+HOT_PATH = {"hot_path": True}
+
+
+class _AsyncQueueHandler(QueueHandler):
+    """
+    事件循环中只合并消息参数后入队，时间戳、异常堆栈的格式化和文件写入由后台线程完成。
+    参数可能是之后会被修改的dict等对象，必须在入队前转换成字符串。
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _HotPathSampler(logging.Filter):
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno >= logging.WARNING or not getattr(record, "hot_path", False):
+            return True
+        return random.random() < self.rate
 
 
 class NacosMcpRouteLogger:
     logger: logging.Logger | None = None
+    listener: QueueListener | None = None
     @classmethod
     def setup_logger(cls):
         NacosMcpRouteLogger.logger = logging.getLogger("nacos_mcp_router")
-        NacosMcpRouteLogger.logger.setLevel(logging.INFO)
-        
+        NacosMcpRouteLogger.logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
         # 防止重复添加处理器
         if NacosMcpRouteLogger.logger.handlers:
             return
-            
-        log_file = os.path.expanduser("~") + "/logs/nacos_mcp_router/router.log"
+
+        # 多进程模式下每个worker写自己的日志文件，避免多进程同时滚动同一个文件
+        worker_id = os.getenv("ROUTER_WORKER_ID", "")
+        log_name = f"router-worker-{worker_id}.log" if worker_id else "router.log"
+        log_file = os.path.expanduser("~") + "/logs/nacos_mcp_router/" + log_name
         log_dir = os.path.dirname(log_file)
         os.makedirs(log_dir, exist_ok=True)
-        
+
         formatter = logging.Formatter(
             "%(asctime)s | %(name)-15s | %(levelname)-8s | %(message)s",
             datefmt="%Y-%m-%d %H:%M:%S"
@@ -32,11 +64,18 @@ class NacosMcpRouteLogger:
             backupCount=5,  # 保留5个备份文件
             encoding="utf-8"
         )
-        file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
 
-        NacosMcpRouteLogger.logger.addHandler(file_handler)
-        
+        # 事件循环中只入队，由后台线程写文件
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = _AsyncQueueHandler(log_queue)
+        queue_handler.addFilter(_HotPathSampler(float(os.getenv("LOG_SAMPLE_RATE", "1.0"))))
+        NacosMcpRouteLogger.listener = QueueListener(log_queue, file_handler)
+        NacosMcpRouteLogger.listener.start()
+        atexit.register(NacosMcpRouteLogger.listener.stop)
+
+        NacosMcpRouteLogger.logger.addHandler(queue_handler)
+
         # 关键修复：防止日志向父logger传播
         NacosMcpRouteLogger.logger.propagate = False
     @classmethod
@@ -0,0 +1,131 @@
+#-*- coding: utf-8 -*-
+"""
+事件循环的延迟监控和CPU profile，默认关闭。
+
+LOOP_LAG_THRESHOLD > 0 时启用延迟监控：
+    * 循环内的采样任务每LOOP_LAG_INTERVAL秒醒来一次，实际醒来时间与预期的差值记为循环延迟
+    * 后台线程检查采样任务的心跳，超过阈值未更新时说明某个回调阻塞了循环，
+      此时抓取事件循环线程的调用栈写入日志，便于定位Chroma查询、同步日志、锁等待等同步操作
+ENABLE_PROFILING=true 且配置了ADMIN_TOKEN时提供 GET /debug/profile?seconds=10（与管理接口使用相同的认证），
+在指定时间内对事件循环线程做cProfile采样。
+"""
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any
+
+from . import metrics
+from .logger import NacosMcpRouteLogger
+
+logger = NacosMcpRouteLogger.get_logger()
+
+_MAX_STALLS = 20
+_MAX_PROFILE_SECONDS = 60
+
+
+class LoopMonitor:
+  def __init__(self, threshold: float, interval: float = 0.5) -> None:
+    self.threshold = threshold
+    self.interval = interval
+    self.stalls: deque[dict[str, Any]] = deque(maxlen=_MAX_STALLS)
+    self._beat = time.monotonic()
+    self._loop_thread_id: int | None = None
+    self._stopped = threading.Event()
+
+  @classmethod
+  def from_env(cls) -> "LoopMonitor | None":
+    threshold = float(os.getenv("LOOP_LAG_THRESHOLD", "0"))
+    if threshold <= 0:
+      return None
+    return cls(threshold, float(os.getenv("LOOP_LAG_INTERVAL", "0.5")))
+
+  async def run(self) -> None:
+    self._loop_thread_id = threading.get_ident()
+    self._beat = time.monotonic()
+    threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+    try:
+      while True:
+        expected = time.monotonic() + self.interval
+        await asyncio.sleep(self.interval)
+        now = time.monotonic()
+        self._beat = now
+        metrics.LOOP_LAG_SECONDS.observe(max(now - expected, 0.0))
+    finally:
+      self._stopped.set()
+
+  def _watch(self) -> None:
+    reported_beat = None
+    while not self._stopped.wait(min(self.threshold / 2, self.interval)):
+      beat = self._beat
+      blocked = time.monotonic() - beat - self.interval
+      if blocked < self.threshold or beat == reported_beat:
+        continue
+      # 每次阻塞只记录一次调用栈，阻塞结束、心跳更新后才会再次记录
+      reported_beat = beat
+      frame = sys._current_frames().get(self._loop_thread_id)
+      stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+      del frame
+      metrics.LOOP_STALLS.inc()
+      self.stalls.append({"time": time.time(), "blocked_seconds": round(blocked, 3), "stack": stack})
+      logger.warning(f"event loop blocked for more than {blocked:.3f}s, stack:\n{stack}")
+
+
+class Profiler:
+  """同一时间只允许一个profile，避免互相干扰"""
+
+  def __init__(self) -> None:
+    self._lock = asyncio.Lock()
+
+  @property
+  def busy(self) -> bool:
+    return self._lock.locked()
+
+  async def profile(self, seconds: float) -> pstats.Stats:
+    async with self._lock:
+      profiler = cProfile.Profile()
+      profiler.enable()
+      try:
+        await asyncio.sleep(min(max(seconds, 0.1), _MAX_PROFILE_SECONDS))
+      finally:
+        profiler.disable()
+      return pstats.Stats(profiler)
+
+
+_profiler = Profiler()
+
+
+async def profile_endpoint(request):
+  """GET /debug/profile?seconds=10&sort=cumulative&limit=50，format=pstats时返回可用pstats/snakeviz打开的二进制文件"""
+  from starlette.responses import PlainTextResponse, Response
+
+  if _profiler.busy:
+    return PlainTextResponse("another profile is running\n", status_code=409)
+  try:
+    seconds = float(request.query_params.get("seconds", "10"))
+    limit = int(request.query_params.get("limit", "50"))
+  except ValueError:
+    return PlainTextResponse("invalid seconds or limit\n", status_code=400)
+  sort = request.query_params.get("sort", "cumulative")
+  stats = await _profiler.profile(seconds)
+
+  if request.query_params.get("format") == "pstats":
+    # 与Stats.dump_stats写入文件的格式相同
+    return Response(marshal.dumps(stats.stats), media_type="application/octet-stream",
+                    headers={"Content-Disposition": f"attachment; filename=nacos-mcp-router-{os.getpid()}.pstats"})
+
+  output = io.StringIO()
+  stats.stream = output
+  try:
+    stats.sort_stats(sort)
+  except KeyError:
+    return PlainTextResponse(f"invalid sort key: {sort}\n", status_code=400)
+  stats.print_stats(limit)
+  return PlainTextResponse(output.getvalue())
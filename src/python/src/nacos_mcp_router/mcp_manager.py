@@ -8,15 +8,22 @@ from typing import Optional, List
 
 from chromadb.api.types import ID
 
+from . import metrics, tracing
 from .md5_util import get_md5
 from .nacos_http_client import NacosHttpClient
 from .router_types import ChromaDb, McpServer
 from .logger import NacosMcpRouteLogger
 from .constants import MODE_ROUTER
+from .index_service import IndexClient
+from .registry_snapshot import RegistrySnapshot
+from .tool_index import ToolIndex, ToolMatch
 import threading
 
 logger = NacosMcpRouteLogger.get_logger()
 
+_MISSING_TTL = 5.0
+_MISSING_MAX = 10000
+
 class McpUpdater:
   def __init__(self,
                nacosHttpClient: NacosHttpClient,
@@ -40,6 +47,20 @@ class McpUpdater:
     self.proxy_mcp_name = proxy_mcp_name
     self.enable_auto_refresh = enable_auto_refresh
     self._thread = None
+    self._first_refresh_done = threading.Event()
+    # 多进程模式下，刷新进程把注册表写入快照供worker读取
+    self.snapshot_writer: RegistrySnapshot | None = None
+    self._missing_until: dict[str, float] = {}
+    # 工具级别的向量索引，为None时只使用服务级别的索引
+    self.tool_index: ToolIndex | None = None
+    # 多进程模式的worker不打开Chroma，向量检索转发给主进程
+    self.index_client: IndexClient | None = None
+    # 后台线程和管理接口触发的刷新串行执行
+    self._refresh_lock = threading.Lock()
+    self.last_refresh_time: float | None = None
+    self.last_refresh_seconds: float | None = None
+    self.last_index_build_time: float | None = None
+    self.last_index_build_seconds: float | None = None
 
   @classmethod
   def create(cls,
@@ -49,34 +70,112 @@ class McpUpdater:
              enable_vector_db: bool = False,
              mode: str = MODE_ROUTER,
              proxy_mcp_name: str = "",
-             enable_auto_refresh: bool = True):
+             enable_auto_refresh: bool = True,
+             snapshot_writer: RegistrySnapshot | None = None,
+             tool_index: ToolIndex | None = None):
     """创建 McpUpdater 实例并启动后台任务"""
     updater = cls(nacos_client, chroma_db, update_interval, enable_vector_db, mode, proxy_mcp_name, enable_auto_refresh)
+    updater.snapshot_writer = snapshot_writer
+    updater.tool_index = tool_index
  
     updater._thread = threading.Thread(target=functools.partial(updater.asyncUpdater))
     updater._thread.daemon = True
     
     if enable_auto_refresh:
         updater._thread.start()
+    else:
+        updater._first_refresh_done.set()
     
     return updater
 
+  @classmethod
+  def create_follower(cls,
+                      nacos_client: NacosHttpClient,
+                      snapshot: RegistrySnapshot,
+                      poll_interval: float = 1.0,
+                      index_client: IndexClient | None = None):
+    """
+    创建只读的 McpUpdater，注册表来自其他进程写入的快照，不请求Nacos。
+    向量检索通过index_client转发给持有Chroma的主进程，为None时只按关键字检索。
+    """
+    updater = cls(nacos_client, None, poll_interval, index_client is not None, MODE_ROUTER, "", False)
+    updater.index_client = index_client
+    updater._thread = threading.Thread(target=functools.partial(updater._follow_snapshot, snapshot), daemon=True)
+    updater._thread.start()
+    return updater
+
+  def _follow_snapshot(self, snapshot: RegistrySnapshot) -> None:
+    while True:
+      try:
+        servers = snapshot.read_if_changed()
+        if servers is not None:
+          with self.lock:
+            self._cache = servers
+          metrics.REFRESH_ITEMS.labels("servers").set(len(servers))
+          logger.info(f"loaded registry snapshot {snapshot.generation}, size: {len(servers)}")
+          self._first_refresh_done.set()
+      except Exception as e:
+        logger.warning(f"exception while loading registry snapshot {snapshot.path}", exc_info=e)
+      time.sleep(self.interval)
+
   def asyncUpdater(self) -> None:
     debug_mode = os.getenv('DEBUG_MODE')
     if debug_mode is not None:
       logger.info("debug mode is enabled")
+      self._first_refresh_done.set()
       return
 
     while True:
       try:
-        if self.mode == MODE_ROUTER:
-            asyncio.run(self.refresh())
-        else:
-            asyncio.run(self.refreshOne())
+        self._run_refresh()
+        self._first_refresh_done.set()
         time.sleep(self.interval)
       except Exception as e:
+        self._first_refresh_done.set()
         logger.warning("exception while updating mcp servers: " , exc_info=e)
 
+  def _run_refresh(self) -> None:
+    with self._refresh_lock:
+      start = time.perf_counter()
+      if self.mode == MODE_ROUTER:
+        asyncio.run(self.refresh())
+      else:
+        asyncio.run(self.refreshOne())
+      self.last_refresh_time = time.time()
+      self.last_refresh_seconds = time.perf_counter() - start
+
+  async def refresh_now(self) -> bool:
+    """立即刷新一次注册表，在线程中执行，不阻塞事件循环；只读的McpUpdater返回False"""
+    if not self.enable_auto_refresh:
+      return False
+    await asyncio.to_thread(self._run_refresh)
+    return True
+
+  def registry_entries(self) -> List[dict]:
+    """缓存的注册表条目及其描述的md5，md5变化时才会重新向量化"""
+    with self.lock:
+      servers = list(self._cache.items())
+    return [{"name": name, "id": getattr(server, "id", None), "version": getattr(server, "version", None),
+             "md5": self.mcp_server_config_version.get(name)} for name, server in servers]
+
+  def index_stats(self) -> dict:
+    if self.index_client is not None:
+      try:
+        return self.index_client.index_stats()
+      except Exception as e:
+        logger.warning("failed to get index stats from the main process", exc_info=e)
+    stats = {"enabled": self.enable_vector_db, "servers": None, "tools": None,
+             "last_build_time": self.last_index_build_time, "last_build_seconds": self.last_index_build_seconds}
+    if self.enable_vector_db and self.chromaDbService is not None:
+      stats["servers"] = self.chromaDbService.count()
+    if self.enable_vector_db and self.tool_index is not None:
+      stats["tools"] = len(self.tool_index)
+    return stats
+
+  async def wait_for_first_refresh(self, timeout: float) -> bool:
+    """等待首次刷新完成，返回是否在超时前完成"""
+    return await asyncio.to_thread(self._first_refresh_done.wait, timeout)
+
   def get_deleted_ids(self) -> List[str]:
     if self.chromaDbService is None:
       return []
@@ -95,7 +194,11 @@ class McpUpdater:
     """刷新所有 MCP 服务器"""
     if not self.enable_auto_refresh:
       return
-    
+
+    with metrics.REFRESH_SECONDS.labels("all").time(), tracing.start_span("mcp_updater.refresh"):
+      await self._refresh()
+
+  async def _refresh(self) -> None:
     try:
       mcpServers = await self.nacosHttpClient.get_mcp_servers()
       logger.info(f"get mcp server list from nacos, size: {len(mcpServers)}")
@@ -125,20 +228,34 @@ class McpUpdater:
           if self.enable_vector_db:
             docs.append(des)
       with self.lock:
+        previous = self._cache
         self._cache = cache
-
-      if not ids:
+      metrics.REFRESH_ITEMS.labels("servers").set(len(cache))
+      metrics.REFRESH_ITEMS.labels("changed").set(len(ids))
+      if self.snapshot_writer is not None and (ids or previous.keys() != cache.keys()):
+        self.snapshot_writer.write(cache)
+      if not self.enable_vector_db:
         return
-      if self.enable_vector_db and self.chromaDbService is not None:
+      start = time.perf_counter()
+      if self.tool_index is not None:
+        # 按工具内容哈希增量更新，未变化的工具不会重新向量化
+        self.tool_index.sync(cache)
+      if ids and self.chromaDbService is not None:
         self.chromaDbService.update_data(documents=docs, ids=ids)
         deleted_id = self.get_deleted_ids()
         if len(deleted_id) > 0 and len(mcpServers) > 0:
           self.chromaDbService.delete_data(ids=deleted_id)
+      self.last_index_build_time = time.time()
+      self.last_index_build_seconds = time.perf_counter() - start
     except Exception as e:
       logger.warning("exception while refreshing mcp servers: ", exc_info=e)
 
   async def refreshOne(self) -> None:
     """刷新单个 MCP 服务器"""
+    with metrics.REFRESH_SECONDS.labels("one").time(), tracing.start_span("mcp_updater.refresh_one"):
+      await self._refresh_one()
+
+  async def _refresh_one(self) -> None:
     try:
       mcpServer = await self.nacosHttpClient.get_mcp_server(id='', name=self.proxy_mcp_name)
       if mcpServer is None:
@@ -165,31 +282,49 @@ class McpUpdater:
 
   async def _get_from_cache(self, id: str) -> Optional[McpServer]:
     """从缓存中获取 MCP 服务器"""
+    start = time.perf_counter()
     with self.lock:
-      return self._cache.get(id)
+      tracing.current_span().set_attribute("registry.lock_wait_ms", (time.perf_counter() - start) * 1000)
+      server = self._cache.get(id)
+    metrics.CACHE_REQUESTS.labels("registry", "hit" if server is not None else "miss").inc()
+    return server
 
   async def _cache_values(self) -> List[McpServer]:
     """获取缓存中的所有值"""
+    start = time.perf_counter()
     with self.lock:
+      tracing.current_span().set_attribute("registry.lock_wait_ms", (time.perf_counter() - start) * 1000)
       return list(self._cache.values())
 
+  def query_server_ids(self, query: str, count: int) -> List[str]:
+    """在服务级别的向量索引中检索，返回按相似度排序的server名称"""
+    if self.chromaDbService is None:
+      return []
+    result = self.chromaDbService.query(query, count)
+    if result is None or result.get('ids') is None:
+      return []
+    return list(itertools.chain.from_iterable(result['ids']))
+
+  def query_tools(self, query: str, count: int) -> List[ToolMatch]:
+    """在工具级别的向量索引中检索，没有工具索引时返回空列表"""
+    if self.tool_index is None:
+      return []
+    return self.tool_index.search(query, count)
+
   async def getMcpServer(self, query: str, count: int) -> List[McpServer]:
     """通过查询获取 MCP 服务器"""
-    if not self.enable_vector_db or self.chromaDbService is None:
+    if not self.enable_vector_db or (self.chromaDbService is None and self.index_client is None):
       return []
 
     try:
-      result = self.chromaDbService.query(query, count)
-      if result is None:
-        return []
-      
-      ids = result.get('ids')
-      logger.info("find mcps in vector db, query: " + query + ",ids: " + str(ids))
-      if ids is None:
-        return []
+      if self.index_client is not None:
+        ids = await self.index_client.query_server_ids(query, count)
+      else:
+        ids = self.query_server_ids(query, count)
+      logger.debug("find mcps in vector db, query: %s, ids: %s", query, ids)
 
       mcp_servers = []
-      for id1 in itertools.chain.from_iterable(ids):
+      for id1 in ids:
         server = await self._get_from_cache(id1)
         if server is not None:
           mcp_servers.append(server)
@@ -200,12 +335,33 @@ class McpUpdater:
       logger.warning(f"exception while getting mcp server by query: {query}", exc_info=e)
       return []
 
+  async def search_tools(self, query: str, count: int) -> List[tuple[McpServer, ToolMatch]]:
+    """在工具级别的向量索引中检索，返回匹配的工具及其所属的 MCP 服务器，按相似度排序"""
+    if not self.enable_vector_db or (self.tool_index is None and self.index_client is None):
+      return []
+
+    try:
+      if self.index_client is not None:
+        found = await self.index_client.query_tools(query, count)
+      else:
+        found = self.query_tools(query, count)
+      matches = []
+      for match in found:
+        server = await self._get_from_cache(match.server_name)
+        if server is not None:
+          matches.append((server, match))
+      logger.debug("find tools in vector db, query: %s, tools: %s", query, matches)
+      return matches
+    except Exception as e:
+      logger.warning(f"exception while searching tools by query: {query}", exc_info=e)
+      return []
+
   async def search_mcp_by_keyword(self, keyword: str) -> List[McpServer]:
     """通过关键词搜索 MCP 服务器"""
     try:
       servers = []
       cache_values = await self._cache_values()
-      logger.info("cache size: " + str(len(cache_values)))
+      logger.debug("cache size: %d", len(cache_values))
 
       for mcp_server in cache_values:
         if mcp_server.description is None:
@@ -214,7 +370,7 @@ class McpUpdater:
         if keyword in mcp_server.description:
           servers.append(mcp_server)
 
-      logger.info(f"result mcp servers search by keywords: {len(servers)}, key: {keyword}")
+      logger.debug("result mcp servers search by keywords: %d, key: %s", len(servers), keyword)
       return servers
       
     except Exception as e:
@@ -225,3 +381,31 @@ class McpUpdater:
     """通过名称获取 MCP 服务器"""
     return await self._get_from_cache(mcp_name)
 
+  async def fetch_mcp_server_by_name(self, mcp_name: str) -> Optional[McpServer]:
+    """安装时通过名称获取 MCP 服务器，缓存未命中时查询一次Nacos"""
+    server = await self._get_from_cache(mcp_name)
+    if server is not None or self.nacosHttpClient is None:
+      return server
+    return await self._fetch_missing(mcp_name)
+
+  async def _fetch_missing(self, mcp_name: str) -> Optional[McpServer]:
+    # 首次刷新完成前或新注册的server也能直接安装；不存在的名称在一段时间内不再查询
+    if self._missing_until.get(mcp_name, 0) > time.monotonic():
+      return None
+    server = await self.nacosHttpClient.get_mcp_server(id='', name=mcp_name)
+    if getattr(server, "mcp_config_detail", None) is None:
+      self._remember_missing(mcp_name)
+      return None
+    with self.lock:
+      server = self._cache.setdefault(mcp_name, server)
+    return server
+
+  def _remember_missing(self, mcp_name: str) -> None:
+    # 名称来自客户端，条目按过期时间的顺序插入，插入前删除已过期的条目并限制总数
+    now = time.monotonic()
+    self._missing_until.pop(mcp_name, None)
+    while self._missing_until and (next(iter(self._missing_until.values())) <= now
+                                   or len(self._missing_until) >= _MISSING_MAX):
+      del self._missing_until[next(iter(self._missing_until))]
+    self._missing_until[mcp_name] = now + _MISSING_TTL
+
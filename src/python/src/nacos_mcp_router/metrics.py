@@ -0,0 +1,283 @@
+#-*- coding: utf-8 -*-
+"""
+进程内指标，按Prometheus文本格式输出。
+
+HTTP传输模式下通过 /metrics 暴露，stdio模式下可以通过 METRICS_DUMP_FILE 定期写入文件。
+"""
+import abc
+import asyncio
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from .logger import NacosMcpRouteLogger
+
+logger = NacosMcpRouteLogger.get_logger()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+  return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+  pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+  if extra:
+    pairs.append(extra)
+  return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+  if value == float("inf"):
+    return "+Inf"
+  if float(value).is_integer():
+    return str(int(value))
+  return repr(float(value))
+
+
+class _Metric(abc.ABC):
+  type_name = ""
+
+  def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = tuple(labelnames)
+    self._lock = threading.Lock()
+    self._children: dict[tuple[str, ...], object] = {}
+
+  def labels(self, *values: str):
+    key = tuple(str(v) for v in values)
+    if len(key) != len(self.labelnames):
+      raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+    child = self._children.get(key)
+    if child is None:
+      with self._lock:
+        child = self._children.setdefault(key, self._new_child())
+    return child
+
+  @abc.abstractmethod
+  def _new_child(self):
+    ...
+
+  @abc.abstractmethod
+  def _samples(self) -> list[str]:
+    ...
+
+  def render(self) -> str:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+    lines.extend(self._samples())
+    return "\n".join(lines)
+
+
+class _CounterChild:
+  def __init__(self) -> None:
+    self.value = 0.0
+    self._lock = threading.Lock()
+
+  def inc(self, amount: float = 1.0) -> None:
+    with self._lock:
+      self.value += amount
+
+
+class Counter(_Metric):
+  type_name = "counter"
+
+  def _new_child(self):
+    return _CounterChild()
+
+  def inc(self, amount: float = 1.0) -> None:
+    self.labels().inc(amount)
+
+  def _samples(self) -> list[str]:
+    return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())]
+
+
+class _GaugeChild:
+  def __init__(self) -> None:
+    self.value = 0.0
+
+  def set(self, value: float) -> None:
+    self.value = value
+
+
+class Gauge(_Metric):
+  type_name = "gauge"
+
+  def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+    super().__init__(name, documentation, labelnames)
+    self._function: Callable[[], Iterable[tuple[tuple[str, ...], float]]] | None = None
+
+  def _new_child(self):
+    return _GaugeChild()
+
+  def set(self, value: float) -> None:
+    self.labels().set(value)
+
+  def set_function(self, function: Callable[[], Iterable[tuple[tuple[str, ...], float]]]) -> None:
+    """采集时调用function获取 (标签值, 数值) 列表，用于连接池大小等按需计算的指标"""
+    self._function = function
+
+  def _samples(self) -> list[str]:
+    if self._function is not None:
+      try:
+        items = list(self._function())
+      except Exception as e:
+        logger.warning(f"failed to collect gauge {self.name}", exc_info=e)
+        items = []
+    else:
+      items = [(key, child.value) for key, child in list(self._children.items())]
+    return [f"{self.name}{_format_labels(self.labelnames, tuple(map(str, key)))} {_format_value(value)}"
+            for key, value in items]
+
+
+class _HistogramChild:
+  def __init__(self, buckets: tuple[float, ...]) -> None:
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0.0
+    self._lock = threading.Lock()
+
+  def observe(self, value: float) -> None:
+    index = bisect.bisect_left(self.buckets, value)
+    with self._lock:
+      self.counts[index] += 1
+      self.sum += value
+
+  @contextmanager
+  def time(self) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+  type_name = "histogram"
+
+  def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+               buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+    super().__init__(name, documentation, labelnames)
+    self.buckets = tuple(sorted(buckets))
+
+  def _new_child(self):
+    return _HistogramChild(self.buckets)
+
+  def observe(self, value: float) -> None:
+    self.labels().observe(value)
+
+  def time(self):
+    return self.labels().time()
+
+  def _samples(self) -> list[str]:
+    lines = []
+    for key, child in list(self._children.items()):
+      with child._lock:
+        counts = list(child.counts)
+        total = child.sum
+      cumulative = 0
+      for bound, count in zip(self.buckets + (float("inf"),), counts):
+        cumulative += count
+        le = 'le="' + _format_value(bound) + '"'
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+      lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+      lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+    return lines
+
+
+MetricT = TypeVar("MetricT", bound=_Metric)
+
+
+class MetricsRegistry:
+  def __init__(self) -> None:
+    self._metrics: dict[str, _Metric] = {}
+
+  def register(self, metric: MetricT) -> MetricT:
+    self._metrics[metric.name] = metric
+    return metric
+
+  def render(self) -> str:
+    return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+TOOL_CALL_SECONDS = REGISTRY.register(Histogram(
+  "nacos_mcp_router_tool_call_seconds", "Latency of MCP tools served by the router.", ["tool"]))
+TOOL_CALL_ERRORS = REGISTRY.register(Counter(
+  "nacos_mcp_router_tool_call_errors", "MCP tool calls served by the router that raised an error.", ["tool"]))
+DOWNSTREAM_CALL_SECONDS = REGISTRY.register(Histogram(
+  "nacos_mcp_router_downstream_call_seconds", "Latency of tool calls to downstream MCP servers.", ["server"]))
+DOWNSTREAM_CALL_ERRORS = REGISTRY.register(Counter(
+  "nacos_mcp_router_downstream_call_errors", "Failed tool calls to downstream MCP servers.", ["server"]))
+DOWNSTREAM_CANCELLATIONS = REGISTRY.register(Counter(
+  "nacos_mcp_router_downstream_cancellations",
+  "Tool calls to downstream MCP servers cancelled by a deadline or by the upstream client.", ["server"]))
+REFRESH_SECONDS = REGISTRY.register(Histogram(
+  "nacos_mcp_router_registry_refresh_seconds", "Duration of McpUpdater refresh cycles.", ["mode"]))
+REFRESH_ITEMS = REGISTRY.register(Gauge(
+  "nacos_mcp_router_registry_refresh_items", "Items seen by the last McpUpdater refresh.", ["kind"]))
+NACOS_REQUEST_SECONDS = REGISTRY.register(Histogram(
+  "nacos_mcp_router_nacos_request_seconds", "Latency of requests to the Nacos server.", ["method", "path"]))
+NACOS_NODE_LATENCY = REGISTRY.register(Gauge(
+  "nacos_mcp_router_nacos_node_latency_seconds", "Moving average latency of each Nacos node.", ["node"]))
+NACOS_NODE_FAILURES = REGISTRY.register(Counter(
+  "nacos_mcp_router_nacos_node_failures", "Failed requests (connection errors and 5xx) by Nacos node.", ["node"]))
+NACOS_HEDGED_REQUESTS = REGISTRY.register(Counter(
+  "nacos_mcp_router_nacos_hedged_requests", "Hedged Nacos reads sent to a second node, and how many of them won.",
+  ["result"]))
+NACOS_LOGINS = REGISTRY.register(Counter(
+  "nacos_mcp_router_nacos_logins", "Logins to Nacos for an access token, by result.", ["result"]))
+NACOS_REQUEST_ERRORS = REGISTRY.register(Counter(
+  "nacos_mcp_router_nacos_request_errors", "Failed requests to the Nacos server by error code.", ["method", "path", "code"]))
+CHROMA_QUERY_SECONDS = REGISTRY.register(Histogram(
+  "nacos_mcp_router_chroma_query_seconds", "Latency of vector queries against Chroma."))
+INSTALLED_SERVERS = REGISTRY.register(Gauge(
+  "nacos_mcp_router_installed_servers", "Downstream MCP server sessions held by the router.", ["protocol", "state"]))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+  "nacos_mcp_router_cache_requests", "Cache lookups by cache and result (hit/miss).", ["cache", "result"]))
+QUOTA_REJECTIONS = REGISTRY.register(Counter(
+  "nacos_mcp_router_quota_rejections", "Tool calls rejected by per-session quotas, by quota.", ["quota"]))
+
+LOOP_LAG_SECONDS = REGISTRY.register(Histogram(
+  "nacos_mcp_router_event_loop_lag_seconds", "Delay of the event loop waking up the lag sampler.",
+  buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+LOOP_STALLS = REGISTRY.register(Counter(
+  "nacos_mcp_router_event_loop_stalls", "Times a callback blocked the event loop longer than LOOP_LAG_THRESHOLD."))
+
+
+def render() -> str:
+  return REGISTRY.render()
+
+
+async def metrics_endpoint(request):
+  from starlette.responses import Response
+  return Response(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class MetricsDumper:
+  """stdio模式下没有HTTP端口，定期把指标写入文件"""
+
+  def __init__(self, path: str, interval: float) -> None:
+    self.path = path
+    self.interval = interval
+
+  def dump(self) -> None:
+    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+    tmp_path = self.path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+      f.write(render())
+    os.replace(tmp_path, self.path)
+
+  async def run(self) -> None:
+    while True:
+      await asyncio.sleep(self.interval)
+      try:
+        await asyncio.to_thread(self.dump)
+      except Exception as e:
+        logger.warning(f"failed to dump metrics to {self.path}", exc_info=e)
@@ -0,0 +1,78 @@
+#-*- coding: utf-8 -*-
+"""
+Nacos集群节点的健康和延迟统计。
+
+NACOS_ADDR可以是逗号分隔的多个host:port。每个节点记录请求延迟的指数滑动平均（EWMA）和连续失败次数，
+请求优先发往延迟最低的健康节点；失败的节点按指数退避暂时排到最后，退避结束后重新参与选择。
+"""
+import random
+import threading
+import time
+
+from . import metrics
+
+_EWMA_ALPHA = 0.3
+_MIN_BACKOFF = 1.0
+_MAX_BACKOFF = 30.0
+
+
+def parse_addresses(value: str) -> list[str]:
+  addresses = []
+  for address in value.split(","):
+    address = address.strip()
+    if address and address not in addresses:
+      addresses.append(address)
+  return addresses
+
+
+class NacosNode:
+  def __init__(self, address: str) -> None:
+    self.address = address
+    self.latency: float | None = None
+    self.failures = 0
+    self.down_until = 0.0
+
+  def healthy(self, now: float) -> bool:
+    return now >= self.down_until
+
+  def to_dict(self) -> dict:
+    return {"address": self.address, "latency": self.latency, "failures": self.failures,
+            "healthy": self.healthy(time.monotonic())}
+
+
+class NacosCluster:
+  def __init__(self, addresses: list[str], hedge_delay: float = 0.0) -> None:
+    if not addresses:
+      raise ValueError("at least one nacos address is required")
+    self.nodes = [NacosNode(address) for address in addresses]
+    self.hedge_delay = hedge_delay
+    self._lock = threading.Lock()
+
+  def ordered(self) -> list[NacosNode]:
+    """健康节点按延迟从低到高排列（尚未请求过的节点优先探测），不健康的节点按恢复时间排在最后"""
+    now = time.monotonic()
+    with self._lock:
+      # 延迟相同（例如都未请求过）时随机打散，避免所有路由实例都压到第一个节点
+      nodes = random.sample(self.nodes, len(self.nodes))
+      healthy = sorted((n for n in nodes if n.healthy(now)), key=lambda n: n.latency or 0.0)
+      down = sorted((n for n in nodes if not n.healthy(now)), key=lambda n: n.down_until)
+    return healthy + down
+
+  def hedge_after(self, node: NacosNode) -> float:
+    """首选节点超过该时间未响应时发出对冲请求；节点本身较慢时按其平均延迟放宽，避免无谓的重复请求"""
+    if self.hedge_delay <= 0 or len(self.nodes) < 2:
+      return 0.0
+    return max(self.hedge_delay, 3 * (node.latency or 0.0))
+
+  def record_success(self, node: NacosNode, latency: float) -> None:
+    with self._lock:
+      node.latency = latency if node.latency is None else _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * node.latency
+      node.failures = 0
+      node.down_until = 0.0
+    metrics.NACOS_NODE_LATENCY.labels(node.address).set(node.latency)
+
+  def record_failure(self, node: NacosNode) -> None:
+    with self._lock:
+      node.failures += 1
+      node.down_until = time.monotonic() + min(_MIN_BACKOFF * 2 ** (node.failures - 1), _MAX_BACKOFF)
+    metrics.NACOS_NODE_FAILURES.labels(node.address).inc()
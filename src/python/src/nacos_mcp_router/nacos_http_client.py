@@ -2,9 +2,10 @@
 import base64
 import hashlib
 import hmac
-import json
+import logging
 import random
 import time
+import typing
 import urllib.parse
 import httpx
 import asyncio
@@ -12,6 +13,9 @@ import os
 from mcp import Tool
 from packaging import version
 
+from . import json_codec, metrics, tracing
+from .auth import AccessToken, StaticCredentialsProvider, TokenCredentialsProvider
+from .nacos_cluster import NacosCluster, NacosNode, parse_addresses
 from .router_types import McpServer
 from .nacos_mcp_server_config import NacosMcpServerConfig
 from .logger import NacosMcpRouteLogger
@@ -27,6 +31,12 @@ CONTENT_TYPE_URLENCODED = "application/x-www-form-urlencoded; charset=utf8"
 _SCHEMA_HTTP = "http"
 _SCHEMA = os.getenv("NACOS_SERVER_SCHEMA", _SCHEMA_HTTP)
 
+# 登录一次后使用accessToken访问Nacos，而不是每个请求都携带用户名密码
+_TOKEN_AUTH = os.getenv("NACOS_TOKEN_AUTH", "true").lower() == "true"
+_DEFAULT_TOKEN_TTL = 18000
+# NACOS_ADDR配置了多个节点时，读请求超过该时间（秒）未响应则向下一个节点发出对冲请求，0表示不对冲
+_HEDGE_DELAY = float(os.getenv("NACOS_HEDGE_DELAY", "0.2"))
+
 class NacosHttpClient:
     def __init__(self, params: dict[str,str]) -> None:
         nacosAddr = params["nacosAddr"]
@@ -34,6 +44,7 @@ class NacosHttpClient:
         passwd = params["password"]
     
         self.nacosAddr = nacosAddr
+        self.cluster = NacosCluster(parse_addresses(nacosAddr), _HEDGE_DELAY)
         self.userName = userName
         self.passwd = passwd
         self.schema = _SCHEMA
@@ -46,12 +57,123 @@ class NacosHttpClient:
         if self.sk and not self.ak:
             raise ValueError("ak and sk are required when using nacos http client")
 
-        from .auth import StaticCredentialsProvider
-        self.credentials_provider = StaticCredentialsProvider(self.ak, self.sk)
+        if _TOKEN_AUTH and self.passwd:
+            self.credentials_provider = TokenCredentialsProvider(self._login, self.ak, self.sk)
+        else:
+            self.credentials_provider = StaticCredentialsProvider(self.ak, self.sk)
+        # 复用HMAC的密钥初始化结果，签名内容不变时（例如设置了namespace）直接复用签名
+        self._signer: tuple[str, typing.Any] | None = None
+        self._last_signature: tuple[str, str, str] | None = None
+
+    async def _access_token(self) -> str | None:
+        if isinstance(self.credentials_provider, TokenCredentialsProvider):
+            return await self.credentials_provider.get_token()
+        return None
+
+    async def _login(self) -> AccessToken | None:
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await self._send(client, "POST", "/nacos/v3/auth/user/login", {},
+                                            {"username": self.userName, "password": self.passwd})
+            if response.status_code == 200:
+                data = json_codec.loads(response.content)
+                token = data.get("accessToken")
+                if token:
+                    metrics.NACOS_LOGINS.labels("success").inc()
+                    ttl = float(data.get("tokenTtl") or _DEFAULT_TOKEN_TTL)
+                    logger.info(f"logged in to NACOS server as {self.userName}, token ttl: {ttl}s")
+                    return AccessToken(token, ttl)
+            logger.warning(f"failed to login to NACOS server, code: {response.status_code}, "
+                           f"falling back to username/password headers")
+        except Exception as e:
+            logger.warning(f"failed to login to NACOS server, error: {e}, falling back to username/password headers")
+        metrics.NACOS_LOGINS.labels("failure").inc()
+        return None
+
+    async def _send(self, client: httpx.AsyncClient, method: str, uri: str, headers: dict[str, str],
+                    data=None) -> httpx.Response:
+        """
+        按延迟从低到高依次尝试集群节点。连接失败时换下一个节点；GET请求在5xx时也换节点，
+        并且首选节点响应慢时向下一个节点发出一次对冲请求，取先成功的响应。
+        """
+        nodes = iter(self.cluster.ordered())
+        pending: dict[asyncio.Task, NacosNode] = {}
+        hedged = method != "GET"
+        hedge_node = None
+        last_response, last_error = None, None
+
+        def start_next() -> NacosNode | None:
+            node = next(nodes, None)
+            if node is not None:
+                task = asyncio.create_task(self._send_to(client, node, method, uri, headers, data))
+                pending[task] = node
+            return node
+
+        first = start_next()
+        try:
+            while pending:
+                timeout = None if hedged else self.cluster.hedge_after(first) or None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    hedge_node = start_next()
+                    if hedge_node is not None:
+                        metrics.NACOS_HEDGED_REQUESTS.labels("sent").inc()
+                    continue
+                for task in done:
+                    node = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except httpx.TransportError as e:
+                        # 非GET请求只在确定未发送成功（连接失败）时重试其他节点
+                        if method != "GET" and not isinstance(e, httpx.ConnectError):
+                            raise
+                        logger.warning(f"failed to request NACOS node {node.address}, uri: {uri}, error: {e}")
+                        last_error = e
+                        continue
+                    if response.status_code >= 500 and method == "GET":
+                        last_response = response
+                        continue
+                    if node is hedge_node:
+                        metrics.NACOS_HEDGED_REQUESTS.labels("won").inc()
+                    tracing.current_span().set_attribute("nacos.node", node.address)
+                    return response
+                if not pending:
+                    hedged = True
+                    start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    async def _send_to(self, client: httpx.AsyncClient, node: NacosNode, method: str, uri: str,
+                       headers: dict[str, str], data=None) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, f"{self.schema}://{node.address}{uri}", headers=headers,
+                                            data=data if method in ("POST", "PUT") else None)
+        except httpx.TransportError:
+            self.cluster.record_failure(node)
+            raise
+        if response.status_code >= 500:
+            self.cluster.record_failure(node)
+        else:
+            self.cluster.record_success(node, time.perf_counter() - start)
+        return response
 
     def __do_sign(self, sign_str, sk):
-        return base64.encodebytes(
-            hmac.new(sk.encode(), sign_str.encode(), digestmod=hashlib.sha1).digest()).decode().strip()
+        last = self._last_signature
+        if last is not None and last[0] == sk and last[1] == sign_str:
+            return last[2]
+        if self._signer is None or self._signer[0] != sk:
+            self._signer = (sk, hmac.new(sk.encode(), digestmod=hashlib.sha1))
+        signer = self._signer[1].copy()
+        signer.update(sign_str.encode())
+        signature = base64.encodebytes(signer.digest()).decode().strip()
+        self._last_signature = (sk, sign_str, signature)
+        return signature
 
     def _inject_auth_info(self, headers: dict[str, str]) -> None:
         credentials = self.credentials_provider.get_credentials()
@@ -247,7 +369,8 @@ class NacosHttpClient:
 
         params = _parse_tool_params(data, mcp_name, tools)
 
-        logger.info(f"Trying to update mcp tools with params {json.dumps(params, ensure_ascii=False)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Trying to update mcp tools with params %s", json_codec.dumps(params))
 
         success, _ = await self.request_nacos(f"/nacos/v3/admin/ai/mcp?",
                                               method='PUT',
@@ -284,39 +407,54 @@ class NacosHttpClient:
             ValueError: If an invalid HTTP method is provided.
         """
 
-        try:
-            url = f"{self.schema}://{self.nacosAddr}{uri}"
-            headers = {"Content-Type": content_type,
-                       "charset": "utf-8",
-                       "userName": self.userName,
-                       "password": self.passwd}
-            self._inject_auth_info(headers)
-
-            async with httpx.AsyncClient() as client:
-                if method == "GET":
-                    response = await client.get(url, headers=headers)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, data=data)
-                elif method == "PUT":
-                    response = await client.put(url, headers=headers, data=data)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=headers)
-                else:
+        path = uri.split("?", 1)[0]
+        start = time.perf_counter()
+        with tracing.start_span(f"nacos {method} {path}", {"http.method": method, "http.route": path}) as span:
+            try:
+                if method not in ("GET", "POST", "PUT", "DELETE"):
                     raise ValueError("Invalid method")
-        except Exception as e:
-            logger.warning(f"failed to request with NACOS server, uri: {uri}, error: {e}", exc_info=e)
-            return False, {}
-
-        code = response.status_code
-        if code != 200:
-            logger.warning(f"failed to request with NACOS server, uri: {uri}, code: {code}, response: {response.content}")
-            return False, {}
-
-        try:
-            return True, json.loads(response.content.decode("utf-8")).get("data")
-        except Exception as e:
-            logger.warning(f"failed to parse response with NACOS server, uri: {uri}, error: {e}")
-            return False, {}
+                for attempt in range(2):
+                    headers = {"Content-Type": content_type,
+                               "charset": "utf-8"}
+                    access_token = await self._access_token()
+                    if access_token:
+                        headers["accessToken"] = access_token
+                    else:
+                        headers["userName"] = self.userName
+                        headers["password"] = self.passwd
+                    self._inject_auth_info(headers)
+                    if tracing.is_enabled():
+                        headers[tracing.TRACEPARENT] = span.traceparent()
+
+                    async with httpx.AsyncClient() as client:
+                        response = await self._send(client, method, uri, headers, data)
+                    if not access_token or response.status_code not in (401, 403) or attempt > 0:
+                        break
+                    # token可能已被服务端吊销或过期，重新登录后重试一次
+                    logger.info(f"access token rejected by NACOS server, uri: {uri}, code: {response.status_code}")
+                    self.credentials_provider.invalidate(access_token)
+            except Exception as e:
+                span.record_exception(e)
+                metrics.NACOS_REQUEST_ERRORS.labels(method, path, "exception").inc()
+                logger.warning(f"failed to request with NACOS server, uri: {uri}, error: {e}", exc_info=e)
+                return False, {}
+            finally:
+                metrics.NACOS_REQUEST_SECONDS.labels(method, path).observe(time.perf_counter() - start)
+
+            code = response.status_code
+            span.set_attribute("http.status_code", code)
+            if code != 200:
+                span.set_status(tracing.STATUS_ERROR, f"http status {code}")
+                metrics.NACOS_REQUEST_ERRORS.labels(method, path, str(code)).inc()
+                logger.warning(f"failed to request with NACOS server, uri: {uri}, code: {code}, response: {response.content}")
+                return False, {}
+
+            try:
+                return True, json_codec.loads(response.content).get("data")
+            except Exception as e:
+                metrics.NACOS_REQUEST_ERRORS.labels(method, path, "parse").inc()
+                logger.warning(f"failed to parse response with NACOS server, uri: {uri}, error: {e}")
+                return False, {}
 
 
 def _parse_tool_params(data, mcp_name, tools) -> dict[str, str]:
@@ -343,9 +481,9 @@ def _parse_tool_params(data, mcp_name, tools) -> dict[str, str]:
 
     return {
         'mcpName': mcp_name,
-        'serverSpecification': json.dumps(data, ensure_ascii=False),
-        'endpointSpecification': json.dumps(endpoint_specification or {}, ensure_ascii=False),
-        'toolSpecification': json.dumps(tool_spec, ensure_ascii=False),
+        'serverSpecification': json_codec.dumps(data),
+        'endpointSpecification': json_codec.dumps(endpoint_specification or {}),
+        'toolSpecification': json_codec.dumps(tool_spec),
         'latest':'True'
     }
 
@@ -0,0 +1,418 @@
+#-*- coding: utf-8 -*-
+"""
+代理模式的JSON-RPC直通引擎（PROXY_ENGINE=passthrough）。
+
+默认引擎中，每个请求都要由mcp_app解析为pydantic模型，经ClientSession重新发给下游，
+下游的响应再解析一次、为上游重新编码一次。直通引擎只和下游保持一条连接，
+把上游各个会话的JSON-RPC帧改写请求id后原样转发，只拦截以下消息：
+    * initialize：用路由连接下游时得到的初始化结果直接应答，protocolVersion按上游会话请求的版本协商
+    * tools/list：按注册中心的配置过滤工具、替换描述和参数定义
+    * ping：直接应答
+进度通知按改写后的progressToken转回对应的上游请求；上游取消请求或断开时丢弃对应的响应，
+DOWNSTREAM_CANCELLATION=true时同时向下游发送取消通知。
+"""
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable
+
+import anyio
+import mcp.types as types
+from mcp.shared.message import ServerMessageMetadata, SessionMessage
+from mcp.shared.version import SUPPORTED_PROTOCOL_VERSIONS
+
+from .logger import NacosMcpRouteLogger
+from .router_types import DOWNSTREAM_CANCELLATION, transport_context
+from .shutdown import ShutdownCoordinator, ShuttingDown
+
+logger = NacosMcpRouteLogger.get_logger()
+
+ConfigLoader = Callable[[], Awaitable[dict[str, Any]]]
+ToolsFilter = Callable[[list[types.Tool]], Awaitable[list[types.Tool]]]
+
+_CONNECT_TIMEOUT = 30
+_RECONNECT_INITIAL_DELAY = 1.0
+_RECONNECT_MAX_DELAY = 30.0
+_CANCEL_PROBE_TIMEOUT = 2.0
+_FLUSH_TIMEOUT = 1.0
+
+
+def _message(root: types.JSONRPCRequest | types.JSONRPCNotification | types.JSONRPCResponse | types.JSONRPCError,
+             related_request_id: types.RequestId | None = None) -> SessionMessage:
+  metadata = ServerMessageMetadata(related_request_id=related_request_id) if related_request_id is not None else None
+  return SessionMessage(message=types.JSONRPCMessage(root), metadata=metadata)
+
+
+def _error(request_id: types.RequestId, code: int, message: str) -> types.JSONRPCError:
+  return types.JSONRPCError(jsonrpc="2.0", id=request_id, error=types.ErrorData(code=code, message=message))
+
+
+class _Upstream:
+  """
+  一个上游会话，记录其未完成的下游请求id。
+  发往上游的消息先放入该会话自己的队列，由run中的任务写出，读取慢的上游不会阻塞下游连接的读循环。
+  """
+
+  def __init__(self, write_stream) -> None:
+    self.write_stream = write_stream
+    self.pending: set[int] = set()
+    self.closed = False
+    self._outbox: asyncio.Queue[SessionMessage | None] = asyncio.Queue()
+
+  def send(self, message: SessionMessage) -> None:
+    if not self.closed:
+      self._outbox.put_nowait(message)
+
+  def close(self) -> None:
+    """不再接收新的消息，flush写完已经排队的消息后退出"""
+    if not self.closed:
+      self.closed = True
+      self._outbox.put_nowait(None)
+
+  async def flush(self) -> None:
+    while True:
+      message = await self._outbox.get()
+      if message is None:
+        return
+      try:
+        await self.write_stream.send(message)
+      except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+        # 上游已经断开，丢弃迟到的响应
+        self.closed = True
+        return
+
+
+class _Pending:
+  __slots__ = ("upstream", "upstream_id", "method", "progress_token", "future")
+
+  def __init__(self, upstream: _Upstream | None, upstream_id: types.RequestId, method: str,
+               progress_token: types.ProgressToken | None = None, future: asyncio.Future | None = None) -> None:
+    self.upstream = upstream
+    self.upstream_id = upstream_id
+    self.method = method
+    self.progress_token = progress_token
+    self.future = future
+
+
+class PassthroughProxy:
+  """
+  与mcp.server.Server.run签名兼容，可以直接交给stdio/SSE/streamable HTTP的服务端传输层运行。
+  """
+
+  def __init__(self, name: str, config_loader: ConfigLoader, tools_filter: ToolsFilter | None = None,
+               client_info: types.Implementation | None = None,
+               shutdown_coordinator: ShutdownCoordinator | None = None,
+               cancel_downstream: bool = DOWNSTREAM_CANCELLATION) -> None:
+    self.name = name
+    self.cancel_downstream = cancel_downstream
+    # 上游转发的请求计入进行中的调用，退出时等待其完成
+    self._shutdown_coordinator = shutdown_coordinator
+    self._config_loader = config_loader
+    self._tools_filter = tools_filter
+    self._client_info = client_info or types.Implementation(name="nacos-mcp-router", version="1.0.0")
+    self.initialize_result: dict[str, Any] | None = None
+    self._write = None
+    self._ids = itertools.count(1)
+    self._init_id: int | None = None
+    self._pending: dict[int, _Pending] = {}
+    self._upstreams: set[_Upstream] = set()
+    self._connected = asyncio.Event()
+    self._start_lock = asyncio.Lock()
+    self._task: asyncio.Task | None = None
+    self._closed = False
+    self._connection_scope: anyio.CancelScope | None = None
+    self._probe: asyncio.Task | None = None
+    self._background_tasks: set[asyncio.Task] = set()
+
+  @property
+  def connected(self) -> bool:
+    return self._connected.is_set()
+
+  def create_initialization_options(self) -> None:
+    return None
+
+  async def start(self, timeout: float = _CONNECT_TIMEOUT) -> bool:
+    """连接并初始化下游，返回是否已连接；断开后在后台自动重连"""
+    async with self._start_lock:
+      if self._task is None:
+        self._task = asyncio.create_task(self._connection_loop())
+    try:
+      async with asyncio.timeout(timeout):
+        await self._connected.wait()
+    except TimeoutError:
+      return False
+    return True
+
+  async def close(self) -> None:
+    self._closed = True
+    if self._probe is not None:
+      self._probe.cancel()
+    if self._task is not None:
+      self._task.cancel()
+      try:
+        await self._task
+      except BaseException:
+        pass
+      self._task = None
+
+  async def _connection_loop(self) -> None:
+    attempt = 0
+    while not self._closed:
+      try:
+        config = await self._config_loader()
+        with anyio.CancelScope() as self._connection_scope:
+          async with transport_context(config) as streams:
+            await self._run_connection(streams[0], streams[1])
+        attempt = 0
+      except Exception as e:
+        logger.warning(f"passthrough connection to {self.name} closed with error", exc_info=e)
+      finally:
+        with anyio.CancelScope(shield=True):
+          await self._on_disconnected()
+      if self._closed:
+        break
+      attempt += 1
+      delay = min(_RECONNECT_INITIAL_DELAY * 2 ** (attempt - 1), _RECONNECT_MAX_DELAY)
+      logger.info(f"passthrough connection to {self.name} closed, reconnecting in {delay:.1f}s")
+      await asyncio.sleep(delay)
+
+  async def _run_connection(self, read_stream, write_stream) -> None:
+    self._write = write_stream
+    self._init_id = next(self._ids)
+    params = types.InitializeRequestParams(protocolVersion=types.LATEST_PROTOCOL_VERSION,
+                                           capabilities=types.ClientCapabilities(), clientInfo=self._client_info)
+    await write_stream.send(_message(types.JSONRPCRequest(
+      jsonrpc="2.0", id=self._init_id, method="initialize",
+      params=params.model_dump(by_alias=True, mode="json", exclude_none=True))))
+    async for message in read_stream:
+      if isinstance(message, Exception):
+        logger.warning(f"passthrough connection to {self.name} received an error", exc_info=message)
+        continue
+      await self._on_downstream(message.message.root)
+
+  async def _on_disconnected(self) -> None:
+    """下游断开时，未完成的请求立即返回错误，不等待重连"""
+    self._write = None
+    self._connected.clear()
+    message = f"connection to mcp server {self.name} closed"
+    for downstream_id in list(self._pending):
+      entry = self._take(downstream_id)
+      if entry.future is not None:
+        if not entry.future.done():
+          entry.future.set_exception(ConnectionError(message))
+      else:
+        entry.upstream.send(_message(_error(entry.upstream_id, types.INTERNAL_ERROR, message)))
+
+  def _take(self, downstream_id: int) -> _Pending | None:
+    """移除未完成的请求；上游转发的请求同时结束其在ShutdownCoordinator中的登记"""
+    entry = self._pending.pop(downstream_id, None)
+    if entry is not None and entry.upstream is not None:
+      entry.upstream.pending.discard(downstream_id)
+      if self._shutdown_coordinator is not None:
+        self._shutdown_coordinator.release()
+    return entry
+
+  async def _send_downstream(self, root) -> None:
+    if self._write is None:
+      raise ConnectionError(f"mcp server {self.name} is not connected")
+    await self._write.send(_message(root))
+
+  async def _on_downstream(self, root) -> None:
+    if isinstance(root, (types.JSONRPCResponse, types.JSONRPCError)):
+      if root.id == self._init_id:
+        await self._on_initialized(root)
+        return
+      entry = self._take(root.id)
+      if entry is None:
+        return
+      if entry.future is not None:
+        if not entry.future.done():
+          if isinstance(root, types.JSONRPCError):
+            entry.future.set_exception(RuntimeError(root.error.message))
+          else:
+            entry.future.set_result(root.result)
+        return
+      if entry.method == "tools/list" and isinstance(root, types.JSONRPCResponse) and self._tools_filter is not None:
+        # 过滤可能要查询注册中心，放到后台任务中，不阻塞其他会话的响应
+        self._spawn(self._reply_tools(entry, root))
+        return
+      entry.upstream.send(_message(root.model_copy(update={"id": entry.upstream_id})))
+    elif isinstance(root, types.JSONRPCNotification):
+      if root.method == "notifications/progress":
+        entry = self._pending.get((root.params or {}).get("progressToken"))
+        if entry is not None and entry.upstream is not None and entry.progress_token is not None:
+          params = dict(root.params, progressToken=entry.progress_token)
+          entry.upstream.send(_message(root.model_copy(update={"params": params}), entry.upstream_id))
+      elif root.method != "notifications/cancelled":
+        for upstream in list(self._upstreams):
+          upstream.send(_message(root))
+    elif isinstance(root, types.JSONRPCRequest):
+      # 下游发起的请求（sampling、roots等）无法确定属于哪个上游会话
+      if root.method == "ping":
+        await self._send_downstream(types.JSONRPCResponse(jsonrpc="2.0", id=root.id, result={}))
+      else:
+        await self._send_downstream(_error(root.id, types.METHOD_NOT_FOUND,
+                                           f"{root.method} is not supported by the passthrough proxy"))
+
+  async def _on_initialized(self, root) -> None:
+    if isinstance(root, types.JSONRPCError):
+      raise ConnectionError(f"failed to initialize mcp server {self.name}: {root.error.message}")
+    self.initialize_result = root.result
+    await self._send_downstream(types.JSONRPCNotification(jsonrpc="2.0", method="notifications/initialized"))
+    self._connected.set()
+    logger.info(f"passthrough connection to {self.name} initialized")
+
+  def _negotiate(self, requested: str | None) -> str:
+    """
+    下游连接只有一条，协商的是路由支持的最新版本；上游请求的版本不高于该版本且路由支持时按上游的版本应答，
+    与mcp.server的协商规则一致，否则返回下游的版本，由客户端决定是否继续。
+    """
+    downstream = self.initialize_result.get("protocolVersion", types.LATEST_PROTOCOL_VERSION)
+    if requested in SUPPORTED_PROTOCOL_VERSIONS and requested <= downstream:
+      return requested
+    return downstream
+
+  async def _reply_tools(self, entry: _Pending, root: types.JSONRPCResponse) -> None:
+    result = await self._filter_tools(root.result)
+    entry.upstream.send(_message(root.model_copy(update={"id": entry.upstream_id, "result": result})))
+
+  def _spawn(self, coro) -> None:
+    task = asyncio.create_task(coro)
+    self._background_tasks.add(task)
+    task.add_done_callback(self._background_tasks.discard)
+
+  async def _filter_tools(self, result: dict[str, Any]) -> dict[str, Any]:
+    try:
+      tools = [types.Tool.model_validate(tool) for tool in result.get("tools", [])]
+      tools = await self._tools_filter(tools)
+      return dict(result, tools=[tool.model_dump(by_alias=True, mode="json", exclude_none=True) for tool in tools])
+    except Exception as e:
+      logger.warning(f"failed to filter tools of {self.name}", exc_info=e)
+      return result
+
+  async def request(self, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    """路由自身向下游发起请求，例如自动注册工具时获取工具列表"""
+    if not await self.start():
+      raise ConnectionError(f"mcp server {self.name} is not connected")
+    downstream_id = next(self._ids)
+    future = asyncio.get_running_loop().create_future()
+    self._pending[downstream_id] = _Pending(None, downstream_id, method, future=future)
+    try:
+      await self._send_downstream(types.JSONRPCRequest(jsonrpc="2.0", id=downstream_id, method=method, params=params))
+      return await future
+    finally:
+      self._pending.pop(downstream_id, None)
+
+  async def list_tools(self) -> list[types.Tool]:
+    result = await self.request("tools/list")
+    return [types.Tool.model_validate(tool) for tool in result.get("tools", [])]
+
+  async def run(self, read_stream, write_stream, initialization_options: Any = None,
+                raise_exceptions: bool = False, stateless: bool = False) -> None:
+    """转发一个上游会话的消息，直到上游断开"""
+    upstream = _Upstream(write_stream)
+    self._upstreams.add(upstream)
+    try:
+      async with read_stream, write_stream, anyio.create_task_group() as tg:
+        tg.start_soon(upstream.flush)
+        async for message in read_stream:
+          if isinstance(message, Exception):
+            continue
+          root = message.message.root
+          if isinstance(root, types.JSONRPCRequest):
+            await self._on_upstream_request(upstream, root)
+          elif isinstance(root, types.JSONRPCNotification):
+            await self._on_upstream_notification(upstream, root)
+          # 上游的JSONRPCResponse只会应答下游发起的请求，而这些请求不会转发给上游
+        upstream.close()
+        # 写出已经排队的消息，上游不再读取时不无限等待
+        tg.cancel_scope.deadline = anyio.current_time() + _FLUSH_TIMEOUT
+    finally:
+      upstream.close()
+      self._upstreams.discard(upstream)
+      self._cancel_pending(upstream, "client disconnected")
+
+  async def _on_upstream_request(self, upstream: _Upstream, root: types.JSONRPCRequest) -> None:
+    if root.method == "ping":
+      upstream.send(_message(types.JSONRPCResponse(jsonrpc="2.0", id=root.id, result={})))
+      return
+    if not self._connected.is_set() and not await self.start():
+      upstream.send(_message(_error(root.id, types.INTERNAL_ERROR, f"mcp server {self.name} is not connected")))
+      return
+    if root.method == "initialize":
+      requested = (root.params or {}).get("protocolVersion")
+      result = dict(self.initialize_result, protocolVersion=self._negotiate(requested))
+      upstream.send(_message(types.JSONRPCResponse(jsonrpc="2.0", id=root.id, result=result)))
+      return
+
+    if self._shutdown_coordinator is not None:
+      try:
+        self._shutdown_coordinator.acquire()
+      except ShuttingDown as e:
+        upstream.send(_message(_error(root.id, types.INTERNAL_ERROR, str(e))))
+        return
+
+    downstream_id = next(self._ids)
+    update: dict[str, Any] = {"id": downstream_id}
+    progress_token = None
+    meta = (root.params or {}).get("_meta")
+    if meta and "progressToken" in meta:
+      # 不同上游会话的progressToken可能相同，改为使用唯一的下游请求id
+      progress_token = meta["progressToken"]
+      update["params"] = dict(root.params, _meta=dict(meta, progressToken=downstream_id))
+    self._pending[downstream_id] = _Pending(upstream, root.id, root.method, progress_token)
+    upstream.pending.add(downstream_id)
+    try:
+      await self._send_downstream(root.model_copy(update=update))
+    except Exception as e:
+      self._take(downstream_id)
+      upstream.send(_message(_error(root.id, types.INTERNAL_ERROR, str(e))))
+
+  async def _on_upstream_notification(self, upstream: _Upstream, root: types.JSONRPCNotification) -> None:
+    if root.method == "notifications/initialized":
+      return
+    if root.method == "notifications/cancelled":
+      request_id = (root.params or {}).get("requestId")
+      for downstream_id in list(upstream.pending):
+        entry = self._pending.get(downstream_id)
+        if entry is not None and entry.upstream_id == request_id:
+          await self._cancel(upstream, downstream_id, (root.params or {}).get("reason"))
+      return
+    if self._write is not None:
+      await self._send_downstream(root)
+
+  async def _cancel(self, upstream: _Upstream, downstream_id: int, reason: str | None) -> None:
+    self._take(downstream_id)
+    # 不通知下游时，迟到的响应找不到对应的请求，直接丢弃
+    if self.cancel_downstream:
+      await self._notify_cancelled([downstream_id], reason)
+
+  async def _notify_cancelled(self, downstream_ids: list[int], reason: str | None) -> None:
+    if self._write is None:
+      return
+    for downstream_id in downstream_ids:
+      params = types.CancelledNotificationParams(requestId=downstream_id, reason=reason)
+      try:
+        await self._send_downstream(types.JSONRPCNotification(
+          jsonrpc="2.0", method="notifications/cancelled", params=params.model_dump(exclude_none=True)))
+      except Exception as e:
+        logger.debug("failed to cancel request %s of %s: %s", downstream_id, self.name, e)
+    if self._probe is None or self._probe.done():
+      self._probe = asyncio.create_task(self._probe_connection(self._connection_scope))
+
+  async def _probe_connection(self, scope: anyio.CancelScope | None) -> None:
+    """下游处理取消通知出错时不再响应，但连接不会断开；此时断开重连，让其他未完成的请求立即返回错误"""
+    try:
+      async with asyncio.timeout(_CANCEL_PROBE_TIMEOUT):
+        await self.request("ping")
+    except Exception as e:
+      if scope is not None and scope is self._connection_scope:
+        logger.warning(f"passthrough connection to {self.name} not responding after cancellation, reconnecting: {e!r}")
+        scope.cancel()
+
+  def _cancel_pending(self, upstream: _Upstream, reason: str) -> None:
+    # 上游断开时run所在的任务已被取消，无法在其中发送消息，取消通知改由后台任务发送
+    downstream_ids = list(upstream.pending)
+    for downstream_id in downstream_ids:
+      self._take(downstream_id)
+    if downstream_ids and self.cancel_downstream:
+      self._spawn(self._notify_cancelled(downstream_ids, reason))
@@ -0,0 +1,68 @@
+#-*- coding: utf-8 -*-
+"""
+多进程模式下的注册表快照文件。
+
+主进程刷新注册表后整体写入快照（先写临时文件再rename，读者不会读到写了一半的文件），
+worker进程检测到文件变化后通过mmap映射并反序列化，不需要各自请求Nacos。
+"""
+import mmap
+import os
+import pickle
+import struct
+import threading
+from typing import Any
+
+from .logger import NacosMcpRouteLogger
+
+logger = NacosMcpRouteLogger.get_logger()
+
+_MAGIC = b"NMRSNAP1"
+_HEADER = struct.Struct("<8sQ")
+
+
+class RegistrySnapshot:
+  def __init__(self, path: str) -> None:
+    self.path = path
+    self.generation = 0
+    self._last_stat: tuple[int, int, int] | None = None
+    self._lock = threading.Lock()
+
+  def write(self, servers: dict[str, Any]) -> int:
+    """写入新的快照，返回快照代数"""
+    with self._lock:
+      self.generation += 1
+      data = pickle.dumps(servers, protocol=pickle.HIGHEST_PROTOCOL)
+      os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+      tmp_path = f"{self.path}.{os.getpid()}.tmp"
+      with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, self.generation))
+        f.write(data)
+      os.replace(tmp_path, self.path)
+      return self.generation
+
+  def read_if_changed(self) -> dict[str, Any] | None:
+    """快照文件变化时返回新的注册表，否则返回None"""
+    try:
+      st = os.stat(self.path)
+    except FileNotFoundError:
+      return None
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if key == self._last_stat or st.st_size <= _HEADER.size:
+      return None
+
+    with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      magic, generation = _HEADER.unpack_from(mm)
+      if magic != _MAGIC:
+        logger.warning(f"invalid registry snapshot: {self.path}")
+        return None
+      with memoryview(mm) as view:
+        servers = pickle.loads(view[_HEADER.size:])
+    self._last_stat = key
+    self.generation = generation
+    return servers
+
+  def remove(self) -> None:
+    try:
+      os.remove(self.path)
+    except FileNotFoundError:
+      pass
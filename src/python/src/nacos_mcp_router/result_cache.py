@@ -0,0 +1,122 @@
+#-*- coding: utf-8 -*-
+"""
+幂等工具（文档检索、地理编码等纯查询）的结果缓存。
+
+按 (server, tool, 规范化后的参数) 缓存use_tool的结果，只缓存显式声明可缓存的工具：
+    * Nacos注册表中工具的 toolsMeta.<tool>.invokeContext 设置 cacheTtl（秒）或 cacheable: true
+    * 本地配置 TOOL_RESULT_CACHE_TOOLS，例如 "amap-maps/maps_geo=600,docs-search/*"，未写TTL时使用TOOL_RESULT_CACHE_TTL
+缓存有条目数（TOOL_RESULT_CACHE_SIZE）和总字节数（TOOL_RESULT_CACHE_MAX_BYTES）上限，超出时按LRU淘汰。
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Sequence
+
+from . import json_codec, metrics
+from .logger import NacosMcpRouteLogger
+from .tool_result import Content, content_size
+
+logger = NacosMcpRouteLogger.get_logger()
+
+CacheKey = tuple[str, str, str]
+
+
+def canonical_arguments(arguments: dict[str, Any] | None) -> str:
+  """参数顺序、空白不同但内容相同的调用使用同一个缓存键"""
+  return json_codec.dumps(arguments or {}, sort_keys=True, default=str)
+
+
+def parse_tool_ttls(value: str, default_ttl: float,
+                    setting: str = "TOOL_RESULT_CACHE_TOOLS") -> dict[tuple[str, str], float]:
+  """解析 "<server>/<tool>[=秒数]" 的逗号分隔列表，tool为*时匹配该server的所有工具"""
+  ttls = {}
+  for item in value.split(","):
+    item = item.strip()
+    if not item:
+      continue
+    name, _, ttl = item.partition("=")
+    server, sep, tool = name.strip().partition("/")
+    if not sep or not server or not tool:
+      logger.warning(f"invalid {setting} item: {item}, expected <server>/<tool>[=seconds]")
+      continue
+    ttls[(server, tool.strip())] = float(ttl) if ttl.strip() else default_ttl
+  return ttls
+
+
+class ToolResultCache:
+  def __init__(self, max_entries: int = 1000, max_bytes: int = 64 << 20, default_ttl: float = 300,
+               tool_ttls: dict[tuple[str, str], float] | None = None) -> None:
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.default_ttl = default_ttl
+    self.tool_ttls = tool_ttls or {}
+    self.size_bytes = 0
+    self._entries: OrderedDict[CacheKey, tuple[float, list[Content], int]] = OrderedDict()
+
+  @classmethod
+  def from_env(cls) -> "ToolResultCache | None":
+    max_entries = int(os.getenv("TOOL_RESULT_CACHE_SIZE", "1000"))
+    if max_entries <= 0:
+      return None
+    default_ttl = float(os.getenv("TOOL_RESULT_CACHE_TTL", "300"))
+    return cls(max_entries=max_entries,
+               max_bytes=int(os.getenv("TOOL_RESULT_CACHE_MAX_BYTES", str(64 << 20))),
+               default_ttl=default_ttl,
+               tool_ttls=parse_tool_ttls(os.getenv("TOOL_RESULT_CACHE_TOOLS", ""), default_ttl))
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def ttl_for(self, mcp_server_name: str, tool_name: str, invoke_context: dict[str, Any] | None = None) -> float:
+    """工具的缓存时间，0表示不缓存。本地配置优先于注册表"""
+    for key in ((mcp_server_name, tool_name), (mcp_server_name, "*")):
+      if key in self.tool_ttls:
+        return self.tool_ttls[key]
+    if not invoke_context:
+      return 0
+    try:
+      if "cacheTtl" in invoke_context:
+        return max(float(invoke_context["cacheTtl"]), 0)
+    except (TypeError, ValueError):
+      logger.warning(f"invalid cacheTtl of tool {mcp_server_name}/{tool_name}: {invoke_context['cacheTtl']}")
+      return 0
+    return self.default_ttl if str(invoke_context.get("cacheable", "")).lower() == "true" else 0
+
+  @staticmethod
+  def key(mcp_server_name: str, tool_name: str, arguments: dict[str, Any] | None) -> CacheKey:
+    return mcp_server_name, tool_name, canonical_arguments(arguments)
+
+  def get(self, key: CacheKey) -> list[Content] | None:
+    entry = self._entries.get(key)
+    if entry is not None and entry[0] <= time.monotonic():
+      self._remove(key)
+      entry = None
+    metrics.CACHE_REQUESTS.labels("tool_result", "hit" if entry is not None else "miss").inc()
+    if entry is None:
+      return None
+    self._entries.move_to_end(key)
+    return list(entry[1])
+
+  def put(self, key: CacheKey, content: Sequence[Content], ttl: float) -> None:
+    if ttl <= 0:
+      return
+    self._remove(key)
+    size = sum(content_size(item) for item in content)
+    if size > self.max_bytes:
+      return
+    self._entries[key] = (time.monotonic() + ttl, list(content), size)
+    self.size_bytes += size
+    while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+      self._remove(next(iter(self._entries)))
+
+  def _remove(self, key: CacheKey) -> None:
+    entry = self._entries.pop(key, None)
+    if entry is not None:
+      self.size_bytes -= entry[2]
+
+  def invalidate(self, mcp_server_name: str | None = None) -> int:
+    """删除某个server（或全部）的缓存，返回删除的条目数"""
+    keys = [key for key in self._entries if mcp_server_name is None or key[0] == mcp_server_name]
+    for key in keys:
+      self._remove(key)
+    return len(keys)
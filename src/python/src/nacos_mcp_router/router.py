@@ -10,14 +10,31 @@ import anyio
 from mcp import types
 from mcp.client.stdio import get_default_environment
 from mcp.server import Server
-
-from .constants import TRANSPORT_TYPE_STDIO, MODE_ROUTER, MODE_PROXY
-from .logger import NacosMcpRouteLogger
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.shared.session import ProgressFnT
+
+from . import json_codec, metrics, tracing
+from .blob_store import BlobNotFound, BlobStore, URI_PREFIX
+from .constants import TRANSPORT_TYPE_STDIO, TRANSPORT_TYPE_STREAMABLE_HTTP, MODE_ROUTER, MODE_PROXY
+from .logger import NacosMcpRouteLogger, HOT_PATH
+from .loop_monitor import LoopMonitor
+from .admin import AdminApi
+from .index_service import IndexClient, IndexServer
 from .mcp_manager import McpUpdater
 from .nacos_http_client import NacosHttpClient
-from .router_exceptions import NacosMcpRouterException
+from .nacos_mcp_server_config import Tool
+from .passthrough import PassthroughProxy
+from .registry_snapshot import RegistrySnapshot
+from .result_cache import ToolResultCache, parse_tool_ttls
+from .router_exceptions import McpServerNotFound, NacosMcpRouterException, ToolCallTimeout
 from .router_types import ChromaDb, McpServer
 from .router_types import CustomServer
+from .session_quota import QuotaExceeded, SessionQuotaManager
+from .shutdown import ShutdownCoordinator
+from .tool_index import ToolIndex
+from .tool_registrar import ToolRegistrar
+from .tool_result import Content, limit_content, text_result
+from .usage_stats import UsageStats
 
 version_number = f"nacos-mcp-router:v{get_version('nacos-mcp-router')}"
 router_logger = NacosMcpRouteLogger.get_logger()
@@ -25,13 +42,56 @@ mcp_servers_dict: dict[str, CustomServer] = {}
 
 mcp_updater: McpUpdater
 nacos_http_client: NacosHttpClient
+tool_registrar: ToolRegistrar | None = None
 proxied_mcp_name: str = ""
 mode: str = MODE_ROUTER
 proxied_mcp_server_config: dict = {}
 transport_type: str = TRANSPORT_TYPE_STDIO
 auto_register_tools: bool = True
 proxied_mcp_version: str = ''
-mcp_app: Server
+mcp_app: Server = Server("nacos-mcp-router")
+# 代理模式的引擎：session（默认，经mcp_app和ClientSession转发）或passthrough（直接转发JSON-RPC帧）
+proxy_engine: str = "session"
+passthrough_proxy: PassthroughProxy | None = None
+shutdown_coordinator: ShutdownCoordinator = ShutdownCoordinator()
+loop_monitor: LoopMonitor | None = None
+enable_profiling: bool = False
+admin_token: str = ""
+usage_stats: UsageStats | None = None
+prewarm_mcp_names: list[str] = []
+prewarm_top_n: int = 0
+prewarm_concurrency: int = 4
+background_tasks: set[asyncio.Task] = set()
+metrics_dump_file: str = ""
+metrics_dump_interval: float = 60
+workers: int = 1
+# 多进程模式：主进程写注册表快照并提供向量检索，worker进程启动前设置快照和检索服务的路径
+registry_snapshot: RegistrySnapshot | None = None
+index_server: IndexServer | None = None
+worker_snapshot_path: str = ""
+worker_index_path: str = ""
+streamable_http_stateless: bool = True
+streamable_http_event_store: str = "none"
+_install_locks: dict[str, asyncio.Lock] = {}
+# 按工具检索时最多取回的工具数，合并为最多5个server
+_TOOL_SEARCH_COUNT = 20
+# search_mcp_tools默认返回的工具数
+_TOOL_SEARCH_DEFAULT = 5
+# 搜索结果中每个server的序列化结果，描述不变时复用
+_search_fragments = json_codec.FragmentCache()
+session_quotas: SessionQuotaManager | None = None
+tool_result_max_bytes: int = 0
+tool_result_chunk_bytes: int = 0
+blob_store: BlobStore | None = None
+result_cache: ToolResultCache | None = None
+# 每个MCP server同时进行的工具调用数，0表示不限制
+server_max_in_flight: int = 0
+_server_semaphores: dict[str, asyncio.Semaphore] = {}
+# batch_use_tool一次最多包含的调用数
+batch_max_calls: int = 16
+# 工具调用的默认截止时间（秒），0表示不限制；TOOL_CALL_TIMEOUTS及注册表invokeContext.timeout可以按server/工具覆盖
+tool_call_timeout: float = 0
+tool_call_timeouts: dict[tuple[str, str], float] = {}
 def router_tools() -> list[types.Tool]:
     return [
         types.Tool(
@@ -52,6 +112,29 @@ def router_tools() -> list[types.Tool]:
                 },
             },
         ),
+        types.Tool(
+            name="search_mcp_tools",
+            description="根据任务描述搜索可以直接调用的工具，返回工具所属的mcp server、工具名称、描述及参数定义。"
+                        "无需安装mcp server，选择合适的工具后直接调用use_tool。",
+            inputSchema={
+                "type": "object",
+                "required": ["task_description"],
+                "properties": {
+                    "task_description": {
+                        "type": "string",
+                        "description": "用户任务描述"
+                    },
+                    "key_words": {
+                        "type": "string",
+                        "description": "用户任务关键字，可以为多个，英文逗号分隔，最多为2个"
+                    },
+                    "count": {
+                        "type": "integer",
+                        "description": "返回的工具数量，默认为5"
+                    }
+                },
+            },
+        ),
         types.Tool(
             name="add_mcp_server",
             description="安装指定的mcp server",
@@ -87,15 +170,44 @@ def router_tools() -> list[types.Tool]:
                     }
                 }
             }
+        ),
+        types.Tool(
+            name="batch_use_tool",
+            description="并发调用多个互相独立的MCP Server工具，按调用顺序返回每个调用的结果或错误",
+            inputSchema={
+                "type": "object",
+                "required": ["calls"],
+                "properties": {
+                    "calls": {
+                        "type": "array",
+                        "description": "工具调用列表",
+                        "items": {
+                            "type": "object",
+                            "required": ["mcp_server_name", "mcp_tool_name", "params"],
+                            "properties": {
+                                "mcp_server_name": {
+                                    "type": "string",
+                                    "description": "需要使用的MCP Server名称"
+                                },
+                                "mcp_tool_name": {
+                                    "type": "string",
+                                    "description": "需要使用的MCP Server工具名称"
+                                },
+                                "params": {
+                                    "type": "string",
+                                    "description": "需要使用的MCP Server工具的参数"
+                                }
+                            }
+                        }
+                    }
+                }
+            }
         )
     ]
 
 
-async def init_proxied_mcp() -> bool:
+async def _load_proxied_mcp_server_config() -> dict:
     global proxied_mcp_server_config
-    if proxied_mcp_name in mcp_servers_dict:
-        return True
-    
     proxied_mcp_server_config_str = os.getenv("PROXIED_MCP_SERVER_CONFIG", "")
 
     if mode == MODE_PROXY and (proxied_mcp_server_config_str == "" or proxied_mcp_server_config_str is None):
@@ -103,7 +215,43 @@ async def init_proxied_mcp() -> bool:
         mcp_server = await nacos_http_client.get_mcp_server(id="", name=proxied_mcp_name)
         router_logger.info(f"proxied_mcp_server_config: {mcp_server.agent_config()}")
         proxied_mcp_server_config = mcp_server.agent_config()
+    return proxied_mcp_server_config
+
+
+async def _passthrough_server_config() -> dict:
+    """直通引擎每次（重新）连接下游时读取配置"""
+    config = await _load_proxied_mcp_server_config()
+    servers = config.get("mcpServers", {})
+    return servers.get(proxied_mcp_name) or next(iter(servers.values()), config)
+
+
+async def _filter_proxied_tools(tools: list[types.Tool]) -> list[types.Tool]:
+    return await filter_tools(tools, await mcp_updater.get_mcp_server_by_name(proxied_mcp_name))
+
+
+async def _init_passthrough_proxy() -> bool:
+    if not await passthrough_proxy.start():
+        return False
+    server_info = (passthrough_proxy.initialize_result or {}).get("serverInfo") or {}
+    version = server_info.get("version", "1.0.0")
+    if auto_register_tools and tool_registrar is not None:
+        tools = await passthrough_proxy.list_tools()
+        tool_registrar.submit(proxied_mcp_name, tools, version, "")
+    return True
+
 
+def _server_app() -> Server | PassthroughProxy:
+    """交给服务端传输层运行的应用"""
+    return passthrough_proxy if passthrough_proxy is not None else mcp_app
+
+
+async def init_proxied_mcp() -> bool:
+    if passthrough_proxy is not None:
+        return passthrough_proxy.connected or await _init_passthrough_proxy()
+    if proxied_mcp_name in mcp_servers_dict:
+        return True
+
+    await _load_proxied_mcp_server_config()
     mcp_server = CustomServer(name=proxied_mcp_name, config=proxied_mcp_server_config)
     await mcp_server.wait_for_initialization()
 
@@ -113,9 +261,9 @@ async def init_proxied_mcp() -> bool:
         version = getattr(getattr(init_result, 'serverInfo', None), 'version', "1.0.0")
         mcp_app.version = version
 
-        if auto_register_tools and nacos_http_client is not None:
+        if auto_register_tools and tool_registrar is not None:
             tools = await mcp_server.list_tools()
-            await nacos_http_client.update_mcp_tools(proxied_mcp_name, tools, version, "")
+            tool_registrar.submit(proxied_mcp_name, tools, version, "")
         return True
     else:
         return False
@@ -187,27 +335,42 @@ async def search_mcp_server(task_description: str, key_words: str) -> str:
         if mcp_updater is None:
             return "服务初始化中，请稍后再试"
 
-        router_logger.info(f"Searching tools for {task_description}, key words: {key_words}")
+        router_logger.info("Searching tools for %s, key words: %s", task_description, key_words, extra=HOT_PATH)
         mcp_servers1 = []
         keywords = key_words.split(",")
         for key_word in keywords:
             mcps = await mcp_updater.search_mcp_by_keyword(key_word)
             mcp_servers1.extend(mcps or [])
-        router_logger.info("mcp size searched by keywords is " + str(len(mcp_servers1)))
+        router_logger.debug("mcp size searched by keywords is %d", len(mcp_servers1))
+        matched_tools: dict[str, list[str]] = {}
         if len(mcp_servers1) < 5:
-            mcp_servers2 = await mcp_updater.getMcpServer(task_description, 5 - len(mcp_servers1))
+            mcp_servers2 = []
+            # 优先按工具检索，返回匹配工具所属的server；工具索引不可用时按server描述检索
+            for server, match in await mcp_updater.search_tools(task_description, _TOOL_SEARCH_COUNT):
+                if match.server_name not in matched_tools:
+                    if len(matched_tools) >= 5 - len(mcp_servers1):
+                        continue
+                    matched_tools[match.server_name] = []
+                    mcp_servers2.append(server)
+                matched_tools[match.server_name].append(match.tool_name)
+            if not mcp_servers2:
+                mcp_servers2 = await mcp_updater.getMcpServer(task_description, 5 - len(mcp_servers1))
             mcp_servers1.extend(mcp_servers2 or [])
 
         result = {}
         for mcpServer in mcp_servers1:
             mname = str(mcpServer.get_name())
-            dct = dict(name=mname,
-                       description=mcpServer.get_description())
-
-            result[mname] = dct
+            if mname in result:
+                continue
+            description = mcpServer.get_description()
+            tools = tuple(matched_tools.get(mname, ()))
+            entry = dict(name=mname, description=description)
+            if tools:
+                entry["tools"] = list(tools)
+            result[mname] = _search_fragments.dumps((mname, description, tools), entry)
 
-        router_logger.info(f"Found {len(result)} server(s) totally")
-        content = json.dumps(result, ensure_ascii=False)
+        router_logger.debug("Found %d server(s) totally", len(result))
+        content = json_codec.join_object(result)
 
         json_string = ("## 获取" + task_description + "的步骤如下：\n"
                   + "### 1. 当前可用的mcp server列表为：" + content
@@ -220,19 +383,196 @@ async def search_mcp_server(task_description: str, key_words: str) -> str:
         return f"Error: {msg}"
 
 
-async def use_tool(mcp_server_name: str, mcp_tool_name: str, params: dict) -> str:
+def _enabled_tools(mcp_server: McpServer) -> list[Tool]:
+    detail = getattr(mcp_server, "mcp_config_detail", None)
+    if detail is None or detail.tool_spec is None:
+        return []
+    return [tool for tool in detail.tool_spec.tools
+            if tool.name not in detail.tool_spec.tools_meta or detail.tool_spec.tools_meta[tool.name].enabled]
+
+
+async def search_mcp_tools(task_description: str, key_words: str = "", count: int = _TOOL_SEARCH_DEFAULT) -> str:
+    """
+    搜索可以直接调用的工具。工具的参数定义来自注册表缓存的ToolSpec，不安装mcp server；
+    use_tool第一次调用某个server时才按需安装，agent可以在一轮对话内从搜索直接进入调用。
+    """
+    try:
+        if mcp_updater is None:
+            return "服务初始化中，请稍后再试"
+
+        router_logger.info("Searching tools for %s, key words: %s", task_description, key_words, extra=HOT_PATH)
+        count = max(1, min(int(count), _TOOL_SEARCH_COUNT))
+        candidates: list[tuple[McpServer, str]] = []
+        for server, match in await mcp_updater.search_tools(task_description, count):
+            candidates.append((server, match.tool_name))
+        if len(candidates) < count:
+            # 工具索引不可用或结果不足时，补充关键字及server描述匹配到的server的全部工具
+            servers = []
+            for key_word in filter(None, (k.strip() for k in key_words.split(","))):
+                servers.extend(await mcp_updater.search_mcp_by_keyword(key_word) or [])
+            servers.extend(await mcp_updater.getMcpServer(task_description, 5) or [])
+            for server in servers:
+                candidates.extend((server, tool.name) for tool in _enabled_tools(server))
+
+        result = []
+        seen = set()
+        for server, tool_name in candidates:
+            tool = next((t for t in _enabled_tools(server) if t.name == tool_name), None)
+            if tool is None or (server.name, tool_name) in seen:
+                continue
+            seen.add((server.name, tool_name))
+            result.append(dict(mcp_server_name=server.name, mcp_tool_name=tool.name,
+                               description=tool.description, inputSchema=tool.input_schema))
+            if len(result) >= count:
+                break
+
+        router_logger.debug("Found %d tool(s) totally", len(result))
+        return ("## 可以直接调用的工具如下：\n" + json_codec.dumps(result)
+                + "\n### 选择需要的工具，按inputSchema构造参数后调用use_tool，无需先调用add_mcp_server")
+    except Exception as e:
+        msg = f"failed to search mcp tools for {task_description}"
+        router_logger.warning(msg, exc_info=e)
+        return f"Error: {msg}"
+
+
+async def use_tool(mcp_server_name: str, mcp_tool_name: str, params: dict) -> list[Content]:
     try:
-        if mcp_server_name not in mcp_servers_dict or mcp_servers_dict[mcp_server_name] is None :
-            router_logger.warning(f"mcp server {mcp_server_name} not found, "
-                                  f"use search_mcp_server to get mcp servers")
-            return "mcp server not found, use search_mcp_server to get mcp servers"
-
-        mcp_server = mcp_servers_dict[mcp_server_name]
-        response = await mcp_server.execute_tool(mcp_tool_name, params)        
-        return str(response.content)
+        content, _ = await _invoke_tool(mcp_server_name, mcp_tool_name, params, _progress_forwarder())
+        return content
+    except McpServerNotFound:
+        router_logger.warning(f"mcp server {mcp_server_name} not found, "
+                              f"use search_mcp_server to get mcp servers")
+        return text_result("mcp server not found, use search_mcp_server to get mcp servers")
+    except ToolCallTimeout as e:
+        router_logger.warning(str(e))
+        return text_result(str(e))
     except Exception as e:
         router_logger.warning("failed to use tool: " + mcp_tool_name, exc_info=e)
-        return "failed to use tool: " + mcp_tool_name + ", please use add_mcp_server to install mcp server"
+        return text_result("failed to use tool: " + mcp_tool_name + ", please use add_mcp_server to install mcp server")
+
+
+async def batch_use_tool(calls: list[dict]) -> list[Content]:
+    """
+    并发执行多个互相独立的工具调用，每个server的并发数受server_max_in_flight限制。
+    结果按调用顺序排列，每个调用的结果前有一行 "[序号] server/tool: ok|error" 的说明。
+    """
+    if not calls:
+        return text_result("calls is empty")
+    if len(calls) > batch_max_calls:
+        return text_result(f"too many calls in one batch: {len(calls)}, at most {batch_max_calls}")
+
+    async def run(call: dict) -> tuple[list[Content], bool]:
+        try:
+            params = call.get("params") or {}
+            if isinstance(params, str):
+                params = json_codec.loads(params)
+            # 多个调用共用一个progressToken时进度无法区分，批量调用不转发进度
+            return await _invoke_tool(call["mcp_server_name"], call["mcp_tool_name"], params, None)
+        except (McpServerNotFound, ToolCallTimeout) as e:
+            return text_result(str(e)), True
+        except Exception as e:
+            router_logger.warning(f"failed to use tool in batch: {call.get('mcp_tool_name')}", exc_info=e)
+            return text_result(f"failed to use tool: {e!r}"), True
+
+    with tracing.start_span("batch_use_tool", {"batch.size": len(calls)}):
+        results = await asyncio.gather(*[run(call) for call in calls])
+
+    content: list[Content] = []
+    for i, (call, (result, is_error)) in enumerate(zip(calls, results)):
+        status = "error" if is_error else "ok"
+        content.append(types.TextContent(
+            type="text", text=f"[{i}] {call.get('mcp_server_name')}/{call.get('mcp_tool_name')}: {status}"))
+        content.extend(result)
+    return content
+
+
+def _server_semaphore(mcp_server_name: str) -> asyncio.Semaphore | None:
+    if server_max_in_flight <= 0:
+        return None
+    semaphore = _server_semaphores.get(mcp_server_name)
+    if semaphore is None:
+        semaphore = _server_semaphores[mcp_server_name] = asyncio.Semaphore(server_max_in_flight)
+    return semaphore
+
+
+async def _invoke_tool(mcp_server_name: str, mcp_tool_name: str, params: dict,
+                       progress_callback: ProgressFnT | None) -> tuple[list[Content], bool]:
+    """调用下游工具，返回 (结果, 是否为错误结果)；server不存在时抛出McpServerNotFound"""
+    cache_key, cache_ttl = None, 0.0
+    if result_cache is not None:
+        cache_ttl = await _result_cache_ttl(mcp_server_name, mcp_tool_name)
+        if cache_ttl > 0:
+            cache_key = result_cache.key(mcp_server_name, mcp_tool_name, params)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                _record_usage(mcp_server_name)
+                return cached, False
+
+    installed = mcp_servers_dict.get(mcp_server_name)
+    if installed is None or installed.is_closed():
+        # 多副本/多worker部署时add_mcp_server可能由其他实例处理过，在本实例按需安装；
+        # 放弃重连的server仍留在字典中，同样重新安装
+        await add_mcp_server(mcp_server_name)
+        if result_cache is not None and cache_ttl <= 0:
+            # 注册表缓存未命中的server在安装时才从Nacos加载，重新读取缓存时间
+            cache_ttl = await _result_cache_ttl(mcp_server_name, mcp_tool_name)
+            if cache_ttl > 0:
+                cache_key = result_cache.key(mcp_server_name, mcp_tool_name, params)
+
+    if mcp_server_name not in mcp_servers_dict or mcp_servers_dict[mcp_server_name] is None :
+        raise McpServerNotFound(msg=f"mcp server {mcp_server_name} not found, use search_mcp_server to get mcp servers")
+
+    mcp_server = mcp_servers_dict[mcp_server_name]
+    timeout = await _tool_timeout(mcp_server_name, mcp_tool_name)
+    semaphore = _server_semaphore(mcp_server_name)
+    if semaphore is None:
+        response = await mcp_server.execute_tool(mcp_tool_name, params, progress_callback=progress_callback,
+                                                 timeout=timeout)
+    else:
+        async with semaphore:
+            response = await mcp_server.execute_tool(mcp_tool_name, params, progress_callback=progress_callback,
+                                                     timeout=timeout)
+    _record_usage(mcp_server_name)
+    content = await _shape_result(response.content)
+    if cache_key is not None and not response.isError:
+        result_cache.put(cache_key, content, cache_ttl)
+    return content, bool(response.isError)
+
+
+def _record_usage(mcp_server_name: str) -> None:
+    if usage_stats is not None:
+        usage_stats.record(mcp_server_name)
+
+
+async def _invoke_context(mcp_server_name: str, mcp_tool_name: str) -> dict | None:
+    """注册表中工具的invokeContext"""
+    mcp_server = await mcp_updater.get_mcp_server_by_name(mcp_server_name)
+    detail = getattr(mcp_server, "mcp_config_detail", None)
+    if detail is not None:
+        tool_meta = detail.tool_spec.tools_meta.get(mcp_tool_name)
+        if tool_meta is not None:
+            return tool_meta.invoke_context
+    return None
+
+
+async def _result_cache_ttl(mcp_server_name: str, mcp_tool_name: str) -> float:
+    """本地配置或注册表中工具的invokeContext声明的缓存时间"""
+    invoke_context = await _invoke_context(mcp_server_name, mcp_tool_name)
+    return result_cache.ttl_for(mcp_server_name, mcp_tool_name, invoke_context)
+
+
+async def _tool_timeout(mcp_server_name: str, mcp_tool_name: str) -> float | None:
+    """工具调用的截止时间，本地配置优先于注册表中的invokeContext.timeout，都没有时使用默认值"""
+    for key in ((mcp_server_name, mcp_tool_name), (mcp_server_name, "*")):
+        if key in tool_call_timeouts:
+            return tool_call_timeouts[key] or None
+    invoke_context = await _invoke_context(mcp_server_name, mcp_tool_name) if mcp_updater is not None else None
+    if invoke_context and "timeout" in invoke_context:
+        try:
+            return float(invoke_context["timeout"]) or None
+        except (TypeError, ValueError):
+            router_logger.warning(f"invalid timeout of tool {mcp_server_name}/{mcp_tool_name}: {invoke_context['timeout']}")
+    return tool_call_timeout or None
 
 async def add_mcp_server(mcp_server_name: str) -> str:
     """
@@ -244,7 +584,7 @@ async def add_mcp_server(mcp_server_name: str) -> str:
         if nacos_http_client is None or mcp_updater is None:
             return "服务初始化中，请稍后再试"
 
-        mcp_server = await mcp_updater.get_mcp_server_by_name(mcp_server_name)
+        mcp_server = await mcp_updater.fetch_mcp_server_by_name(mcp_server_name)
 
         if mcp_server is None:
             return mcp_server_name + " is not found" + ", use search_mcp_server to get mcp servers"
@@ -256,28 +596,45 @@ async def add_mcp_server(mcp_server_name: str) -> str:
             if not meta.enabled:
                 disenabled_tools[tool_name] = True
 
-        if mcp_server_name not in mcp_servers_dict or mcp_servers_dict[mcp_server_name] is None or not await mcp_servers_dict[mcp_server_name].healthy():
-            env = get_default_environment()
-            if mcp_server.agentConfig is None:
-                mcp_server.agentConfig = {}
-            if 'mcpServers' not in mcp_server.agentConfig or mcp_server.agentConfig['mcpServers'] is None:
-                mcp_server.agentConfig['mcpServers'] = {}
-
-            mcp_servers = mcp_server.agentConfig["mcpServers"]
-            for key, value in mcp_servers.items():
-                server_config = value
-                if 'env' in server_config:
-                    for k in server_config['env']:
-                        env[k] = server_config['env'][k]
-                server_config['env'] = env
-                if 'headers' not in server_config:
-                    server_config['headers'] = {}
-            router_logger.info(f"add mcp server: {mcp_server_name}, config:{mcp_server.agentConfig}")
-            server = CustomServer(name=mcp_server_name, config=mcp_server.agentConfig)
-            await server.wait_for_initialization()
-            if await server.healthy():
-                mcp_servers_dict[mcp_server_name] = server
-        
+        # 同一个MCP server的并发安装合并为一次，后到的请求直接使用已建立的连接
+        async with _install_locks.setdefault(mcp_server_name, asyncio.Lock()):
+            installed = mcp_servers_dict.get(mcp_server_name)
+            if installed is not None and installed.is_reconnecting():
+                # 后台正在重连，等待重连结果而不是重新创建
+                await installed.wait_for_session()
+
+            if installed is None or not await installed.healthy():
+                if shutdown_coordinator.closing:
+                    # 关闭过程中不再安装，避免关闭下游之后新建的server无人关闭
+                    return "nacos-mcp-router is shutting down, failed to install mcp server: " + mcp_server_name
+                if installed is not None:
+                    await installed.request_for_shutdown()
+                env = get_default_environment()
+                if mcp_server.agentConfig is None:
+                    mcp_server.agentConfig = {}
+                if 'mcpServers' not in mcp_server.agentConfig or mcp_server.agentConfig['mcpServers'] is None:
+                    mcp_server.agentConfig['mcpServers'] = {}
+
+                mcp_servers = mcp_server.agentConfig["mcpServers"]
+                for key, value in mcp_servers.items():
+                    server_config = value
+                    if 'env' in server_config:
+                        for k in server_config['env']:
+                            env[k] = server_config['env'][k]
+                    server_config['env'] = env
+                    if 'headers' not in server_config:
+                        server_config['headers'] = {}
+                router_logger.debug("add mcp server: %s, config:%s", mcp_server_name, mcp_server.agentConfig)
+                server = CustomServer(name=mcp_server_name, config=mcp_server.agentConfig)
+                await server.wait_for_initialization()
+                if shutdown_coordinator.closing:
+                    await server.shutdown(shutdown_coordinator.close_timeout)
+                    return "nacos-mcp-router is shutting down, failed to install mcp server: " + mcp_server_name
+                if await server.healthy():
+                    mcp_servers_dict[mcp_server_name] = server
+                else:
+                    mcp_servers_dict.pop(mcp_server_name, None)
+
         if mcp_server_name not in mcp_servers_dict:
             return "failed to install mcp server: " + mcp_server_name
     
@@ -286,7 +643,7 @@ async def add_mcp_server(mcp_server_name: str) -> str:
         tools = await server.list_tools()
         init_result = server.get_initialized_response()
         mcp_version = init_result.serverInfo.version if init_result and hasattr(init_result, 'serverInfo') else "1.0.0"
-        router_logger.info(f"add mcp server: {mcp_server_name}, version:{mcp_version}")
+        router_logger.info("add mcp server: %s, version:%s", mcp_server_name, mcp_version, extra=HOT_PATH)
 
         tool_list = []
         for tool in tools:
@@ -304,16 +661,177 @@ async def add_mcp_server(mcp_server_name: str) -> str:
 
             tool_list.append(dct)
 
-        if nacos_http_client is not None:
-            await nacos_http_client.update_mcp_tools(mcp_server_name, tools, mcp_version,
-                                                     mcp_server.id if mcp_server.id else "")
+        if tool_registrar is not None:
+            tool_registrar.submit(mcp_server_name, tools, mcp_version, mcp_server.id if mcp_server.id else "")
 
-        result = "1. " + mcp_server_name + "安装完成, tool 列表为: " + json.dumps(tool_list, ensure_ascii=False) + "\n2." + mcp_server_name + "的工具需要通过nacos-mcp-router的use_tool工具代理使用"
+        result = "1. " + mcp_server_name + "安装完成, tool 列表为: " + json_codec.dumps(tool_list) + "\n2." + mcp_server_name + "的工具需要通过nacos-mcp-router的use_tool工具代理使用"
         return result
     except Exception as e:
         router_logger.warning("failed to install mcp server: " + mcp_server_name, exc_info=e)
         return "failed to install mcp server: " + mcp_server_name
 
+async def prewarm_mcp_servers() -> None:
+    """
+    启动时在后台并发安装配置的MCP server以及最近常用的MCP server，
+    使首次use_tool调用直接命中已建立的session。
+    """
+    names = list(prewarm_mcp_names)
+    if usage_stats is not None:
+        names.extend(usage_stats.top(prewarm_top_n))
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        return
+
+    if not await mcp_updater.wait_for_first_refresh(timeout=60):
+        router_logger.warning("mcp server cache is not ready, prewarm may fail")
+
+    semaphore = asyncio.Semaphore(max(prewarm_concurrency, 1))
+
+    async def _prewarm(name: str) -> None:
+        async with semaphore:
+            await add_mcp_server(name)
+
+    await asyncio.gather(*[_prewarm(name) for name in names])
+    installed = [name for name in names if name in mcp_servers_dict]
+    router_logger.info(f"prewarm mcp servers finished, installed: {installed}, requested: {names}")
+
+
+def _spawn_background_task(coro: typing.Coroutine) -> None:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+def start_background_tasks() -> None:
+    if loop_monitor is not None:
+        _spawn_background_task(loop_monitor.run())
+    if metrics_dump_file:
+        _spawn_background_task(metrics.MetricsDumper(metrics_dump_file, metrics_dump_interval).run())
+    if usage_stats is not None:
+        _spawn_background_task(usage_stats.run())
+    if mode == MODE_ROUTER:
+        _spawn_background_task(prewarm_mcp_servers())
+
+
+def _installed_servers_gauge():
+    counts: dict[tuple[str, str], int] = {}
+    for server in list(mcp_servers_dict.values()):
+        if server is None:
+            continue
+        key = (server.protocol, server.state)
+        counts[key] = counts.get(key, 0) + 1
+    return list(counts.items())
+
+
+async def on_shutdown() -> None:
+    if passthrough_proxy is not None:
+        await passthrough_proxy.close()
+    if tool_registrar is not None:
+        await tool_registrar.flush(timeout=5)
+    if usage_stats is not None:
+        usage_stats.save()
+    if metrics_dump_file:
+        metrics.MetricsDumper(metrics_dump_file, metrics_dump_interval).dump()
+
+
+async def evict_mcp_server(mcp_server_name: str) -> bool:
+    """
+    关闭并移除已安装的MCP server，下次调用时重新安装
+    :param mcp_server_name: mcp server名称
+    :return: 该server是否已安装
+    """
+    async with _install_locks.setdefault(mcp_server_name, asyncio.Lock()):
+        server = mcp_servers_dict.pop(mcp_server_name, None)
+    if server is None:
+        return False
+    router_logger.info(f"evict mcp server: {mcp_server_name}, in flight: {server.in_flight}")
+    await server.shutdown(shutdown_coordinator.close_timeout)
+    return True
+
+
+def _management_routes() -> list:
+    if not admin_token:
+        if enable_profiling:
+            router_logger.warning("ENABLE_PROFILING requires ADMIN_TOKEN, /debug/profile is disabled")
+        return []
+    return AdminApi(admin_token, mcp_servers_dict, mcp_updater, evict_mcp_server, enable_profiling).routes()
+
+
+def create_streamable_http_app():
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.types import Scope
+    from starlette.types import Receive
+    from starlette.types import Send
+
+    event_store = None
+    if not streamable_http_stateless and streamable_http_event_store == "memory":
+        from .event_store import InMemoryEventStore
+        event_store = InMemoryEventStore()
+    session_manager = StreamableHTTPSessionManager(
+        app=_server_app(),
+        event_store=event_store,
+        json_response=False,
+        stateless=streamable_http_stateless,
+    )
+
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+    import contextlib
+    from collections.abc import AsyncIterator
+
+    sse_transport = SseServerTransport("/messages/")
+
+    async def handle_streamable_http(
+            scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        await session_manager.handle_request(scope, receive, send)
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        """Context manager for session manager."""
+        async with session_manager.run():
+            try:
+                if mode == MODE_PROXY:
+                    if not await init_proxied_mcp():
+                        raise NacosMcpRouterException("failed to init mcp server")
+                start_background_tasks()
+                yield
+            finally:
+                await shutdown_coordinator.shutdown(mcp_servers_dict)
+                await on_shutdown()
+                router_logger.info("Application shutting down...")
+
+    starlette_app = Starlette(
+        debug=True,
+        routes=[
+            Mount("/mcp", app=handle_streamable_http),
+            Route("/metrics", endpoint=metrics.metrics_endpoint, methods=["GET"]),
+            Mount("/messages/", app=sse_transport.handle_post_message),
+            *_management_routes(),
+        ],
+        lifespan=lifespan,
+    )
+    return starlette_app
+
+
+def serve_http(app, host: str, port: int, sockets: list | None = None) -> None:
+    """
+    运行uvicorn。收到退出信号时立即停止接收新的工具调用，
+    等待HTTP连接结束的时间受SHUTDOWN_DRAIN_TIMEOUT限制，长连接的SSE会话不会无限期阻塞退出。
+    """
+    import uvicorn
+
+    class _Server(uvicorn.Server):
+        def handle_exit(self, sig, frame) -> None:
+            shutdown_coordinator.begin()
+            super().handle_exit(sig, frame)
+
+    config = uvicorn.Config(app, host=host, port=port,
+                            timeout_graceful_shutdown=max(int(shutdown_coordinator.drain_timeout), 1))
+    _Server(config).run(sockets=sockets)
+
+
 def start_server() -> int:
     
     match transport_type:
@@ -321,10 +839,18 @@ def start_server() -> int:
             from mcp.server.stdio import stdio_server
 
             async def arun():
-                async with stdio_server() as streams:
-                    await mcp_app.run(
-                        streams[0], streams[1], mcp_app.create_initialization_options()
-                    )
+                start_background_tasks()
+                if passthrough_proxy is not None:
+                    _spawn_background_task(init_proxied_mcp())
+                try:
+                    async with stdio_server() as streams:
+                        app = _server_app()
+                        await app.run(
+                            streams[0], streams[1], app.create_initialization_options()
+                        )
+                finally:
+                    await shutdown_coordinator.shutdown(mcp_servers_dict)
+                    await on_shutdown()
 
             anyio.run(arun)
 
@@ -343,8 +869,9 @@ def start_server() -> int:
                 async with sse_transport.connect_sse(
                     request.scope, request.receive, request._send
                 ) as streams:
-                    await mcp_app.run(
-                    streams[0], streams[1], mcp_app.create_initialization_options()
+                    app = _server_app()
+                    await app.run(
+                    streams[0], streams[1], app.create_initialization_options()
                     )
             @contextlib.asynccontextmanager
             async def sse_lifespan(app: Starlette) -> AsyncIterator[None]:
@@ -353,10 +880,11 @@ def start_server() -> int:
                     if mode == MODE_PROXY:
                         if not await init_proxied_mcp():
                             raise NacosMcpRouterException("failed to init mcp server")
+                    start_background_tasks()
                     yield
-                    for mcp in mcp_servers_dict.values():
-                        await mcp.cleanup()
                 finally:
+                    await shutdown_coordinator.shutdown(mcp_servers_dict)
+                    await on_shutdown()
                     router_logger.info("Application shutting down...")
 
 
@@ -364,100 +892,145 @@ def start_server() -> int:
                 debug=True,
                 routes=[
                     Route("/sse", endpoint=handle_sse, methods=["GET"]),
+                    Route("/metrics", endpoint=metrics.metrics_endpoint, methods=["GET"]),
                     Mount("/messages/", app=sse_transport.handle_post_message),
+                    *_management_routes(),
                 ],
                 lifespan= sse_lifespan,
             )
 
-            import uvicorn
-
-            uvicorn.run(starlette_app, host="0.0.0.0", port=sse_port)
+            serve_http(starlette_app, "0.0.0.0", sse_port)
             return 0
         case 'streamable_http':
-            from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
-            from starlette.types import Scope
-            from starlette.types import Receive
-            from starlette.types import Send
-
             streamable_port = int(os.getenv("PORT", "8000"))
-            session_manager = StreamableHTTPSessionManager(
-                app=mcp_app,
-                event_store=None,
-                json_response=False,
-                stateless=True,
-            )
-
-            from mcp.server.sse import SseServerTransport
-            from starlette.applications import Starlette
-            from starlette.responses import Response
-            from starlette.routing import Mount, Route
-            import contextlib
-            from collections.abc import AsyncIterator
+            if workers > 1:
+                from .workers import serve
+                return serve(workers, "0.0.0.0", streamable_port, registry_snapshot, index_server)
 
-            sse_transport = SseServerTransport("/messages/")
-
-            async def handle_streamable_http(
-                    scope: Scope, receive: Receive, send: Send
-            ) -> None:
-                await session_manager.handle_request(scope, receive, send)
-            @contextlib.asynccontextmanager
-            async def lifespan(app: Starlette) -> AsyncIterator[None]:
-                """Context manager for session manager."""
-                async with session_manager.run():
-                    try:
-                        if mode == MODE_PROXY:
-                            if not await init_proxied_mcp():
-                                raise NacosMcpRouterException("failed to init mcp server")
-                        yield
-
-                        for mcp in mcp_servers_dict.values():
-                            await mcp.cleanup()
-                    finally:
-                        router_logger.info("Application shutting down...")
-
-            starlette_app = Starlette(
-                debug=True,
-                routes=[
-                    Mount("/mcp", app=handle_streamable_http),
-                    Mount("/messages/", app=sse_transport.handle_post_message),
-                ],
-                lifespan=lifespan,
-            )
-            import uvicorn
-            uvicorn.run(starlette_app, host="0.0.0.0", port=streamable_port)
+            serve_http(create_streamable_http_app(), "0.0.0.0", streamable_port)
             return 0
         case _:
             router_logger.error("unknown transport type: " + transport_type)
             return 1
 
 
+def _request_session() -> tuple[typing.Any, typing.Any]:
+    """当前请求所属的MCP会话及HTTP请求，stdio等没有请求上下文时返回None"""
+    try:
+        context = mcp_app.request_context
+    except LookupError:
+        return None, None
+    return context.session, context.request
+
+
+async def _shape_result(content: list[Content]) -> list[Content]:
+    """大体积二进制内容先落盘，再按大小限制截断或分片"""
+    if blob_store is not None:
+        content = await blob_store.spill(content, owner=_request_session()[0])
+    return limit_content(content, tool_result_max_bytes, tool_result_chunk_bytes)
+
+
+def _progress_forwarder() -> typing.Callable[[float, float | None, str | None], typing.Awaitable[None]] | None:
+    """上游请求携带progressToken时，把下游工具的进度通知转发给上游客户端"""
+    try:
+        context = mcp_app.request_context
+    except LookupError:
+        return None
+    progress_token = getattr(context.meta, "progressToken", None) if context.meta is not None else None
+    if progress_token is None:
+        return None
+
+    async def forward(progress: float, total: float | None, message: str | None) -> None:
+        try:
+            await context.session.send_progress_notification(progress_token, progress, total, message,
+                                                             related_request_id=str(context.request_id))
+        except Exception as e:
+            router_logger.debug(f"failed to forward progress notification: {e}")
+
+    return forward
+
+
+def _incoming_traceparent() -> str | None:
+    """上游客户端可以在请求的 _meta 中携带traceparent"""
+    if not tracing.is_enabled():
+        return None
+    try:
+        meta = mcp_app.request_context.meta
+    except LookupError:
+        return None
+    return getattr(meta, tracing.TRACEPARENT, None) if meta is not None else None
+
+
 def create_mcp_app() -> Server:
+    router_tool_names = {tool.name for tool in router_tools()}
+    metrics.INSTALLED_SERVERS.set_function(_installed_servers_gauge)
+
     @mcp_app.call_tool()
     async def call_tool(
             name: str, arguments: dict
-    ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-        router_logger.info(f"calling tool: {name}, arguments: {arguments}")
+    ) -> list[Content]:
+        router_logger.info("calling tool: %s", name, extra=HOT_PATH)
+        router_logger.debug("calling tool: %s, arguments: %s", name, arguments)
+        # 路由模式下只统计路由工具，避免未知工具名导致指标标签无限增长
+        metric_label = name if mode == MODE_PROXY or name in router_tool_names else "unknown"
+        try:
+            async with shutdown_coordinator.track():
+                with (metrics.TOOL_CALL_SECONDS.labels(metric_label).time(),
+                      tracing.start_span(f"call_tool {metric_label}", {"mcp.tool.name": name},
+                                         traceparent=_incoming_traceparent())):
+                    if session_quotas is None or not session_quotas.enabled:
+                        return await dispatch_tool(name, arguments)
+                    try:
+                        usage = session_quotas.usage_for(*_request_session())
+                        servers = []
+                        if name in ("add_mcp_server", "use_tool") and "mcp_server_name" in arguments:
+                            servers = [arguments["mcp_server_name"]]
+                        if name == "batch_use_tool":
+                            servers = [call["mcp_server_name"] for call in arguments.get("calls") or []
+                                       if isinstance(call, dict) and "mcp_server_name" in call]
+                        async with session_quotas.admit(usage, servers):
+                            return await dispatch_tool(name, arguments)
+                    except QuotaExceeded as e:
+                        router_logger.warning(f"{e}, session: {usage.key}", extra=HOT_PATH)
+                        return [types.TextContent(type="text", text=str(e))]
+        except Exception:
+            metrics.TOOL_CALL_ERRORS.labels(metric_label).inc()
+            raise
+
+    async def dispatch_tool(
+            name: str, arguments: dict
+    ) -> list[Content]:
         if mode == 'proxy':
             if proxied_mcp_name not in mcp_servers_dict:
                 if await init_proxied_mcp():
                     raise NameError(f"failed to init proxied mcp: {proxied_mcp_name}")
-            result = await mcp_servers_dict[proxied_mcp_name].execute_tool(tool_name=name, arguments=arguments)
-            return result.content
+            result = await mcp_servers_dict[proxied_mcp_name].execute_tool(tool_name=name, arguments=arguments,
+                                                                           progress_callback=_progress_forwarder(),
+                                                                           timeout=await _tool_timeout(proxied_mcp_name, name))
+            return await _shape_result(result.content)
         else:
             match name:
                 case "search_mcp_server":
                     content = await search_mcp_server(arguments["task_description"], arguments["key_words"])
                     return [types.TextContent(type="text", text=content)]
+                case "search_mcp_tools":
+                    content = await search_mcp_tools(arguments["task_description"], arguments.get("key_words", ""),
+                                                     arguments.get("count", _TOOL_SEARCH_DEFAULT))
+                    return [types.TextContent(type="text", text=content)]
                 case "add_mcp_server":
                     content = await add_mcp_server(arguments["mcp_server_name"])
                     return [types.TextContent(type="text", text=content)]
                 case "use_tool":
                     if isinstance(arguments["params"], str):
-                        params = json.loads(arguments["params"])
+                        params = json_codec.loads(arguments["params"])
                     else:
                         params = arguments["params"]
-                    content = await use_tool(arguments["mcp_server_name"], arguments["mcp_tool_name"], params)
-                    return [types.TextContent(type="text", text=content)]
+                    return await use_tool(arguments["mcp_server_name"], arguments["mcp_tool_name"], params)
+                case "batch_use_tool":
+                    calls = arguments["calls"]
+                    if isinstance(calls, str):
+                        calls = json_codec.loads(calls)
+                    return await batch_use_tool(calls)
                 case _:
                     return [types.TextContent(type="text", text="not implemented tool")]
 
@@ -468,6 +1041,22 @@ def create_mcp_app() -> Server:
         else:
             return router_tools()
 
+    if blob_store is not None:
+        @mcp_app.list_resources()
+        async def list_resources() -> list[types.Resource]:
+            # 只列出当前会话的结果；读取不限制会话，无状态HTTP和多worker下读取请求不一定属于写入的会话，
+            # 依靠URI不可猜测保证其他会话无法读取
+            session, _ = _request_session()
+            return [types.Resource(uri=uri, name=uri[len(URI_PREFIX):]) for uri in blob_store.uris_for(session)]
+
+        @mcp_app.read_resource()
+        async def read_resource(uri) -> list[ReadResourceContents]:
+            try:
+                data, mime_type = await blob_store.read(str(uri))
+            except BlobNotFound:
+                raise ValueError(f"resource not found: {uri}")
+            return [ReadResourceContents(content=data, mime_type=mime_type)]
+
     return mcp_app
 
 
@@ -480,9 +1069,16 @@ def main() -> int:
 
 def init() -> int:
     global mcp_app, mcp_updater, nacos_http_client, mode, proxied_mcp_name, proxied_mcp_server_config, transport_type, auto_register_tools, proxied_mcp_version
+    global usage_stats, prewarm_mcp_names, prewarm_top_n, prewarm_concurrency, tool_registrar
+    global metrics_dump_file, metrics_dump_interval, workers, registry_snapshot, index_server
+    global streamable_http_stateless, streamable_http_event_store, session_quotas
+    global tool_result_max_bytes, tool_result_chunk_bytes, blob_store, result_cache
+    global server_max_in_flight, batch_max_calls, tool_call_timeout, tool_call_timeouts
+    global proxy_engine, passthrough_proxy, shutdown_coordinator, loop_monitor, enable_profiling, admin_token
     
     try:
         mcp_app = Server("nacos-mcp-router")
+        tracing.configure_from_env()
         nacos_addr = os.getenv("NACOS_ADDR", "127.0.0.1:8848")
         nacos_user_name = os.getenv("NACOS_USERNAME", "nacos")
         nacos_password = os.getenv("NACOS_PASSWORD", "")
@@ -496,14 +1092,41 @@ def init() -> int:
         proxied_mcp_name = os.getenv("PROXIED_MCP_NAME", "")
         proxied_mcp_server_config_str = os.getenv("PROXIED_MCP_SERVER_CONFIG", "")
         update_interval = int(os.getenv("UPDATE_INTERVAL", 60))
+        enable_vector_db = os.getenv("ENABLE_VECTOR_DB", "true").lower() == "true"
 
         if update_interval < 10:
             update_interval = 10
 
+        prewarm_mcp_names = [name.strip() for name in os.getenv("PREWARM_MCP_SERVERS", "").split(",") if name.strip()]
+        prewarm_top_n = int(os.getenv("PREWARM_TOP_N", "0"))
+        prewarm_concurrency = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+        metrics_dump_file = os.getenv("METRICS_DUMP_FILE", "")
+        metrics_dump_interval = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+        tool_result_max_bytes = int(os.getenv("TOOL_RESULT_MAX_BYTES", "0"))
+        tool_result_chunk_bytes = int(os.getenv("TOOL_RESULT_CHUNK_BYTES", "0"))
+        server_max_in_flight = int(os.getenv("SERVER_MAX_IN_FLIGHT", "0"))
+        batch_max_calls = int(os.getenv("BATCH_USE_TOOL_MAX_CALLS", "16"))
+        tool_call_timeout = float(os.getenv("TOOL_CALL_TIMEOUT", "0"))
+        tool_call_timeouts = parse_tool_ttls(os.getenv("TOOL_CALL_TIMEOUTS", ""), tool_call_timeout, "TOOL_CALL_TIMEOUTS")
+        blob_store = BlobStore.from_env()
+        shutdown_coordinator = ShutdownCoordinator.from_env()
+        loop_monitor = LoopMonitor.from_env()
+        enable_profiling = os.getenv("ENABLE_PROFILING", "false").lower() == "true"
+        admin_token = os.getenv("ADMIN_TOKEN", "")
+
         if proxied_mcp_server_config_str != "" :
             proxied_mcp_server_config = json.loads(proxied_mcp_server_config_str)
 
         transport_type = os.getenv("TRANSPORT_TYPE", TRANSPORT_TYPE_STDIO)
+        workers = int(os.getenv("WORKERS", "1"))
+        if workers > 1 and (transport_type != TRANSPORT_TYPE_STREAMABLE_HTTP or mode != MODE_ROUTER):
+            router_logger.warning("WORKERS is only supported in router mode with streamable_http, using 1 worker")
+            workers = 1
+        streamable_http_stateless = os.getenv("STREAMABLE_HTTP_STATELESS", "true").lower() == "true"
+        streamable_http_event_store = os.getenv("STREAMABLE_HTTP_EVENT_STORE", "none").lower()
+        if workers > 1 and not streamable_http_stateless:
+            router_logger.warning("stateful streamable_http sessions can not be shared by workers, using stateless mode")
+            streamable_http_stateless = True
 
         if mode == MODE_ROUTER or (mode == MODE_PROXY and auto_register_tools):
             if not isinstance(nacos_addr, str) or not nacos_addr.strip():
@@ -516,6 +1139,7 @@ def init() -> int:
                 raise ValueError("passwd must be a non-empty string")
         
         nacos_http_client = NacosHttpClient(params)
+        tool_registrar = ToolRegistrar(nacos_http_client)
         
         init_str = (
             f"init server, nacos_addr: {nacos_addr}, "
@@ -534,9 +1158,33 @@ def init() -> int:
         if mode == MODE_PROXY and proxied_mcp_name == "":
             raise NacosMcpRouterException("proxied_mcp_name must be set in proxy mode")
 
+        proxy_engine = os.getenv("PROXY_ENGINE", "session").lower()
+        if mode == MODE_PROXY and proxy_engine == "passthrough":
+            passthrough_proxy = PassthroughProxy(proxied_mcp_name, _passthrough_server_config, _filter_proxied_tools,
+                                                 types.Implementation(name="nacos-mcp-router",
+                                                                      version=get_version("nacos-mcp-router")),
+                                                 shutdown_coordinator)
+
         if  mode == MODE_ROUTER:
-            chroma_db_service = ChromaDb()
-            mcp_updater =  McpUpdater.create(nacos_client=nacos_http_client, chroma_db=chroma_db_service, update_interval=update_interval, enable_vector_db=True, mode=mode, proxy_mcp_name=proxied_mcp_name, enable_auto_refresh=True)
+            session_quotas = SessionQuotaManager.from_env()
+            result_cache = ToolResultCache.from_env()
+            usage_stats = UsageStats()
+            usage_stats.load()
+            # worker不打开Chroma，向量检索转发给主进程
+            chroma_db_service = ChromaDb() if enable_vector_db and not worker_snapshot_path else None
+            tool_index = None
+            if chroma_db_service is not None and os.getenv("ENABLE_TOOL_INDEX", "true").lower() == "true":
+                tool_index = ToolIndex.create(chroma_db_service.dbClient)
+            if worker_snapshot_path:
+                index_client = IndexClient(worker_index_path) if worker_index_path else None
+                mcp_updater = McpUpdater.create_follower(nacos_http_client, RegistrySnapshot(worker_snapshot_path),
+                                                         index_client=index_client)
+            else:
+                if workers > 1:
+                    registry_snapshot = RegistrySnapshot(os.path.expanduser("~") + f"/.nacos_mcp_router/registry-{os.getpid()}.snapshot")
+                mcp_updater =  McpUpdater.create(nacos_client=nacos_http_client, chroma_db=chroma_db_service, update_interval=update_interval, enable_vector_db=enable_vector_db, mode=mode, proxy_mcp_name=proxied_mcp_name, enable_auto_refresh=True, snapshot_writer=registry_snapshot, tool_index=tool_index)
+                if workers > 1 and enable_vector_db:
+                    index_server = IndexServer(os.path.expanduser("~") + f"/.nacos_mcp_router/index-{os.getpid()}.sock", mcp_updater)
         else:
             if auto_register_tools:
                 mcp_updater = McpUpdater.create(nacos_client=nacos_http_client, chroma_db=None, update_interval=update_interval, enable_vector_db=False, mode=mode, proxy_mcp_name=proxied_mcp_name, enable_auto_refresh=True)
@@ -11,3 +11,11 @@ class NacosMcpRouterException(Exception):
 
     def get_error_message(self) -> str | None:
         return self.msg
+
+
+class McpServerNotFound(NacosMcpRouterException):
+    pass
+
+
+class ToolCallTimeout(NacosMcpRouterException):
+    pass
@@ -1,11 +1,14 @@
 #-*- coding: utf-8 -*-
 
 import asyncio
+import contextvars
 import logging
 import os
+import time
 from contextlib import AsyncExitStack
-from typing import Optional, Any
+from typing import Callable, Optional, Any
 
+import anyio
 import chromadb
 import mcp.types
 from chromadb import Metadata
@@ -14,20 +17,101 @@ from chromadb.api.types import OneOrMany, ID, Document, GetResult, QueryResult
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.shared.session import ProgressFnT
+from . import metrics, tracing
 from .logger import NacosMcpRouteLogger
 from .nacos_mcp_server_config import NacosMcpServerConfig
+from .router_exceptions import ToolCallTimeout
 from mcp.client.streamable_http import streamablehttp_client
 
+_RECONNECT_INITIAL_DELAY = float(os.getenv("RECONNECT_INITIAL_DELAY", "1"))
+_RECONNECT_MAX_DELAY = float(os.getenv("RECONNECT_MAX_DELAY", "30"))
+_RECONNECT_MAX_ATTEMPTS = int(os.getenv("RECONNECT_MAX_ATTEMPTS", "10"))
+_RECONNECT_WAIT_TIMEOUT = float(os.getenv("RECONNECT_WAIT_TIMEOUT", "10"))
+# 截止时间到达或上游取消时是否向下游发送notifications/cancelled。
+# mcp 1.9.x的服务端收到取消通知后会话异常退出，默认不发送，只在下游的SDK能正确处理时开启
+DOWNSTREAM_CANCELLATION = os.getenv("DOWNSTREAM_CANCELLATION", "false").lower() == "true"
+# 发送取消通知后用ping确认下游会话仍然可用，超时则关闭该会话并重连
+_CANCEL_PROBE_TIMEOUT = 2.0
+# 当前任务发往下游的tools/call请求id，由_RequestRecorder记录，取消时用它通知下游
+_sent_tool_calls: contextvars.ContextVar[list | None] = contextvars.ContextVar("sent_tool_calls", default=None)
+
 
 def _stdio_transport_context(config: dict[str, Any]):
   server_params = StdioServerParameters(command=config['command'], args=config['args'] if 'args' in config else [], env=config['env'] if 'env' in config else {})
   return stdio_client(server_params)
 
 def _sse_transport_context(config: dict[str, Any]):
-  return sse_client(url=config['url'], headers=config['headers'] if 'headers' in config else {}, timeout=10)
+  auth = tracing.TraceContextAuth() if tracing.is_enabled() else None
+  return sse_client(url=config['url'], headers=config['headers'] if 'headers' in config else {}, timeout=10, auth=auth)
 
 def _streamable_http_transport_context(config: dict[str, Any]):
-  return streamablehttp_client(url=config["url"], headers=config['headers'] if 'headers' in config else {})
+  auth = tracing.TraceContextAuth() if tracing.is_enabled() else None
+  return streamablehttp_client(url=config["url"], headers=config['headers'] if 'headers' in config else {}, auth=auth)
+
+def transport_context(server_config: dict[str, Any]):
+  """按server配置中的protocol创建下游传输层，返回 (read_stream, write_stream, ...) 的异步上下文"""
+  protocol = server_config.get("protocol")
+  if protocol == "mcp-sse":
+    return _sse_transport_context(server_config)
+  if protocol == "mcp-streamable":
+    return _streamable_http_transport_context(server_config)
+  return _stdio_transport_context(server_config)
+
+async def _relay_messages(source, sink, closed: asyncio.Event) -> None:
+  try:
+    async with sink:
+      async for message in source:
+        await sink.send(message)
+  except anyio.ClosedResourceError:
+    # 会话被主动关闭
+    pass
+  finally:
+    closed.set()
+
+class _RequestRecorder:
+  """
+  包装ClientSession的写入流，记录当前任务发出的tools/call请求id。
+  ClientSession不公开请求id，这样不需要读取SDK的私有字段。
+  """
+
+  def __init__(self, stream) -> None:
+    self._stream = stream
+
+  async def send(self, message) -> None:
+    sent = _sent_tool_calls.get()
+    root = message.message.root
+    if sent is not None and isinstance(root, mcp.types.JSONRPCRequest) and root.method == "tools/call":
+      sent.append(root.id)
+    await self._stream.send(message)
+
+  async def aclose(self) -> None:
+    await self._stream.aclose()
+
+  async def __aenter__(self) -> "_RequestRecorder":
+    return self
+
+  async def __aexit__(self, *exc_info) -> None:
+    await self.aclose()
+
+async def _fail_pending_requests(relay_send, has_pending: Callable[[], bool]) -> None:
+  """
+  结束ClientSession的接收循环，由SDK向未完成的请求返回连接关闭错误，调用方立即收到错误而不是等到截止时间；
+  直接退出ClientSession只会取消接收循环，未完成的请求会一直等待。
+  """
+  await relay_send.aclose()
+  with anyio.move_on_after(1):
+    while has_pending():
+      await asyncio.sleep(0.01)
+
+
+async def _wait_first(*events: asyncio.Event) -> None:
+  waiters = [asyncio.ensure_future(event.wait()) for event in events]
+  try:
+    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+  finally:
+    for waiter in waiters:
+      waiter.cancel()
 
 class CustomServer:
   def __init__(self, name: str, config: dict[str, Any]) -> None:
@@ -39,7 +123,16 @@ class CustomServer:
     self.exit_stack: AsyncExitStack = AsyncExitStack()
     self._initialized_event = asyncio.Event()
     self._shutdown_event = asyncio.Event()
+    self._connected_event = asyncio.Event()  # 当前是否有可用的session
     self._initialized: bool = False  # 初始化状态标记
+    self._reconnecting: bool = False
+    self.reconnect_count: int = 0
+    self.created_at: float = time.time()
+    self.last_used: float = time.monotonic()
+    self.in_flight: int = 0  # 进行中的工具调用数
+    self._session_broken = asyncio.Event()
+    self._probes: set[asyncio.Task] = set()
+    self._pending_calls: dict[ClientSession, int] = {}  # 各session上未完成的工具调用数
     if 'protocol' in config['mcpServers'][name] and  "mcp-sse" == config['mcpServers'][name]['protocol']:
       self._transport_context_factory = _sse_transport_context
       self._protocol = 'mcp-sse'
@@ -52,44 +145,129 @@ class CustomServer:
 
     self._server_task = asyncio.create_task(self._server_lifespan_cycle())
 
+  async def _server_lifespan_cycle(self):
+    """
+    监管下游连接：建立session后等待关闭请求或传输层断开；
+    断开后在后台按指数退避重连，调用方无需在请求中自行重新初始化。
+    """
+    server_config = self.config
+    if "mcpServers" in self.config:
+      mcp_servers = self.config["mcpServers"]
+      for key, value in mcp_servers.items():
+        server_config = value
 
+    attempt = 0
+    while not self._shutdown_event.is_set():
+      try:
+        await self._run_session(server_config)
+        attempt = 0
+      except Exception as e:
+        if not self._initialized_event.is_set():
+          NacosMcpRouteLogger.get_logger().warning("failed to init mcp server " + self.name + ", config: " + str(self.config), exc_info=e)
+        else:
+          NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: session closed with error", exc_info=e)
 
-  async def _server_lifespan_cycle(self):
-    try:
-      server_config = self.config
-      if "mcpServers" in self.config:
-        mcp_servers = self.config["mcpServers"]
-        for key, value in mcp_servers.items():
-          server_config = value
-      if self._protocol == 'mcp-streamable':
-        async with _streamable_http_transport_context(server_config) as (read, write, _):
-          async with ClientSession(read, write) as session:
-            self.session_initialized_response = await session.initialize()
-            self.session = session
-            self._initialized = True
-            self._initialized_event.set()
-            await self.wait_for_shutdown_request()
-      elif self._protocol == 'mcp-sse':
-        async with _sse_transport_context(server_config) as (read, write):
-          async with ClientSession(read, write) as session:
-            self.session_initialized_response = await session.initialize()
-            self.session = session
-            self._initialized = True
-            self._initialized_event.set()
-            await self.wait_for_shutdown_request()
-      else:
-        async with _stdio_transport_context(server_config) as (read, write):
-          async with ClientSession(read, write) as session:
-            self.session_initialized_response = await session.initialize()
-            self.session = session
-            self._initialized = True
-            self._initialized_event.set()
-            await self.wait_for_shutdown_request()
-    except Exception as e:
-      NacosMcpRouteLogger.get_logger().warning("failed to init mcp server " + self.name + ", config: " + str(self.config), exc_info=e)
+      self.session = None
       self._initialized = False
-      self._initialized_event.set()
-      self._shutdown_event.set()
+      self._connected_event.clear()
+
+      if self._shutdown_event.is_set():
+        break
+
+      # 首次连接失败时不重连，保持原有语义：wait_for_initialization返回后healthy()为False
+      if not self._initialized_event.is_set():
+        self._initialized_event.set()
+        self._shutdown_event.set()
+        break
+
+      attempt += 1
+      if attempt > _RECONNECT_MAX_ATTEMPTS:
+        NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: giving up after {attempt - 1} reconnect attempts")
+        self._shutdown_event.set()
+        break
+
+      delay = min(_RECONNECT_INITIAL_DELAY * (2 ** (attempt - 1)), _RECONNECT_MAX_DELAY)
+      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: transport closed, reconnecting in {delay:.1f}s (attempt {attempt})")
+      self._reconnecting = True
+      try:
+        async with asyncio.timeout(delay):
+          await self._shutdown_event.wait()
+      except TimeoutError:
+        pass
+
+    self._reconnecting = False
+
+  async def _run_session(self, server_config: dict[str, Any]) -> None:
+    async with self._transport_context_factory(server_config) as streams:
+      read, write = streams[0], streams[1]
+      # 通过中转流感知传输层关闭，ClientSession本身不会暴露该事件
+      relay_send, relay_read = anyio.create_memory_object_stream(0)
+      transport_closed = asyncio.Event()
+      self._session_broken = session_broken = asyncio.Event()
+      async with anyio.create_task_group() as tg:
+        tg.start_soon(_relay_messages, read, relay_send, transport_closed)
+        async with ClientSession(relay_read, _RequestRecorder(write)) as session:
+          self.session_initialized_response = await session.initialize()
+          self.session = session
+          self._initialized = True
+          if self._reconnecting:
+            self.reconnect_count += 1
+            NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: reconnected")
+          self._reconnecting = False
+          self._connected_event.set()
+          self._initialized_event.set()
+          await _wait_first(self._shutdown_event, transport_closed, session_broken)
+          self._connected_event.clear()
+          await _fail_pending_requests(relay_send, lambda: session in self._pending_calls)
+        tg.cancel_scope.cancel()
+
+  def is_reconnecting(self) -> bool:
+    return self._reconnecting
+
+  def is_connected(self) -> bool:
+    return self._connected_event.is_set()
+
+  def is_closed(self) -> bool:
+    """已关闭（放弃重连或请求了关闭），不会再恢复连接"""
+    return self._shutdown_event.is_set()
+
+  @property
+  def protocol(self) -> str:
+    return self._protocol
+
+  @property
+  def state(self) -> str:
+    if self.is_connected():
+      return "connected"
+    if self.is_reconnecting():
+      return "reconnecting"
+    return "disconnected"
+
+  def to_dict(self) -> dict[str, Any]:
+    return {"name": self.name, "protocol": self._protocol, "state": self.state,
+            "in_flight": self.in_flight, "idle_seconds": round(time.monotonic() - self.last_used, 3),
+            "created_at": self.created_at, "reconnect_count": self.reconnect_count}
+
+  async def wait_for_session(self, timeout: float | None = None) -> ClientSession | None:
+    """
+    等待可用的session，重连期间最多等待timeout秒。
+
+    Returns:
+        ClientSession | None: 可用的session，超时或已关闭时返回None
+    """
+    if self._connected_event.is_set():
+      return self.session
+    if self._shutdown_event.is_set():
+      return None
+    if timeout is None:
+      timeout = _RECONNECT_WAIT_TIMEOUT
+    try:
+      async with asyncio.timeout(timeout):
+        await _wait_first(self._connected_event, self._shutdown_event)
+    except TimeoutError:
+      return None
+    return self.session if self._connected_event.is_set() else None
+
   def get_initialized_response(self) -> mcp.types.InitializeResult:
     return self.session_initialized_response
 
@@ -123,34 +301,133 @@ class CustomServer:
           arguments: dict[str, Any],
           retries: int = 2,
           delay: float = 1.0,
+          progress_callback: ProgressFnT | None = None,
+          timeout: float | None = None,
   ) -> Any:
-    if not self.session:
-      raise RuntimeError(f"Server {self.name} not initialized")
-
+    """
+    调用下游工具。timeout为整个调用（包括等待重连和重试）的截止时间，
+    超时或上游取消时向下游发送取消通知并立即返回，超时抛出ToolCallTimeout。
+    """
+    with tracing.start_span("execute_tool", {"mcp.server.name": self.name, "mcp.tool.name": tool_name}) as span:
+      deadline = asyncio.get_running_loop().time() + timeout if timeout else None
+      self.in_flight += 1
+      try:
+        async with asyncio.timeout_at(deadline):
+          return await self._execute_tool(span, tool_name, arguments, retries, delay, progress_callback)
+      except TimeoutError as e:
+        metrics.DOWNSTREAM_CALL_ERRORS.labels(self.name).inc()
+        raise ToolCallTimeout(msg=f"tool {tool_name} of mcp server {self.name} timed out after {timeout}s") from e
+      finally:
+        self.in_flight -= 1
+        self.last_used = time.monotonic()
+
+  async def _execute_tool(self, span, tool_name: str, arguments: dict[str, Any], retries: int, delay: float,
+                          progress_callback: ProgressFnT | None) -> Any:
     attempt = 0
-    while attempt < retries:
+    while True:
+      if self._connected_event.is_set():
+        session = self.session
+      else:
+        with tracing.start_span("wait_for_session", {"mcp.server.name": self.name}):
+          session = await self.wait_for_session()
+      if session is None:
+        metrics.DOWNSTREAM_CALL_ERRORS.labels(self.name).inc()
+        raise RuntimeError(f"Server {self.name} not initialized")
+      span.set_attribute("mcp.attempt", attempt + 1)
       try:
-        result = await self.session.call_tool(tool_name, arguments)
-
-        return result
-
-      except Exception as e:
+        with metrics.DOWNSTREAM_CALL_SECONDS.labels(self.name).time():
+          return await self._call_tool(session, tool_name, arguments, progress_callback)
+      except Exception:
+        metrics.DOWNSTREAM_CALL_ERRORS.labels(self.name).inc()
         attempt += 1
-        if attempt < retries:
-          await asyncio.sleep(delay)
-          await self.session.initialize()
-          try:
-            result = await self.session.call_tool(tool_name, arguments)
-            return result
-          except Exception as e:
-            raise e
-        else:
+        if attempt >= retries or self._shutdown_event.is_set():
           raise
+        # session仍然存活说明不是连接问题，按原逻辑稍后重试；否则等待后台重连完成
+        if session is self.session and self._connected_event.is_set():
+          await asyncio.sleep(delay)
+
+  async def _call_tool(self, session: ClientSession, tool_name: str, arguments: dict[str, Any],
+                       progress_callback: ProgressFnT | None = None) -> mcp.types.CallToolResult:
+    meta = tracing.inject_meta()
+    sent: list = []
+    token = _sent_tool_calls.set(sent)
+    self._pending_calls[session] = self._pending_calls.get(session, 0) + 1
+    try:
+      if meta is None:
+        return await session.call_tool(tool_name, arguments, progress_callback=progress_callback)
+      # 通过 _meta 传递traceparent，HTTP传输再由TraceContextAuth写入请求头
+      return await session.send_request(
+        mcp.types.ClientRequest(
+          mcp.types.CallToolRequest(
+            method="tools/call",
+            params=mcp.types.CallToolRequestParams(name=tool_name, arguments=arguments, _meta=meta),
+          )
+        ),
+        mcp.types.CallToolResult,
+        progress_callback=progress_callback,
+      )
+    except (asyncio.CancelledError, anyio.get_cancelled_exc_class()):
+      if DOWNSTREAM_CANCELLATION and sent:
+        await self._send_cancelled(session, sent[-1], tool_name)
+      raise
+    finally:
+      _sent_tool_calls.reset(token)
+      remaining = self._pending_calls[session] - 1
+      if remaining:
+        self._pending_calls[session] = remaining
+      else:
+        del self._pending_calls[session]
 
+  async def _send_cancelled(self, session: ClientSession, request_id: mcp.types.RequestId, tool_name: str) -> None:
+    """截止时间到达或上游客户端取消请求时，通知下游停止执行，避免下游积压已经没人等待的调用"""
+    metrics.DOWNSTREAM_CANCELLATIONS.labels(self.name).inc()
+    try:
+      with anyio.move_on_after(1, shield=True):
+        await session.send_notification(mcp.types.ClientNotification(mcp.types.CancelledNotification(
+          method="notifications/cancelled",
+          params=mcp.types.CancelledNotificationParams(requestId=request_id, reason="request cancelled by router"),
+        )))
+    except Exception as e:
+      NacosMcpRouteLogger.get_logger().debug("failed to cancel tool %s of %s: %s", tool_name, self.name, e)
+    probe = asyncio.create_task(self._probe_session(session))
+    self._probes.add(probe)
+    probe.add_done_callback(self._probes.discard)
+
+  async def _probe_session(self, session: ClientSession) -> None:
+    """下游处理取消通知出错时会话不再响应，但传输层不会断开；此时关闭会话，让其他进行中的调用立即失败并重连"""
+    try:
+      async with asyncio.timeout(_CANCEL_PROBE_TIMEOUT):
+        await session.send_ping()
+      return
+    except Exception as e:
+      if session is not self.session:
+        return
+      NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: session not responding after cancellation, "
+                                               f"reconnecting: {e!r}")
+    self._session_broken.set()
 
+  async def shutdown(self, timeout: float = 5) -> None:
+    """
+    结束session生命周期：通知后台任务退出，由其关闭传输层（stdio子进程随之退出），
+    超过timeout仍未退出时取消后台任务。
+    """
+    self._shutdown_event.set()
+    if self._server_task.done():
+      return
+    try:
+      async with asyncio.timeout(timeout):
+        await asyncio.shield(self._server_task)
+    except TimeoutError:
+      NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: not closed in {timeout}s, cancelling")
+      self._server_task.cancel()
+      try:
+        await self._server_task
+      except BaseException:
+        pass
 
   async def cleanup(self) -> None:
     """Clean up server resources."""
+    await self.shutdown()
     async with self._cleanup_lock:
       try:
         await self.exit_stack.aclose()
@@ -171,22 +448,22 @@ class CustomServer:
     """
     # 基础检查：session对象是否存在
     if not self.session:
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: session object is None")
+      NacosMcpRouteLogger.get_logger().debug("Server %s: session object is None", self.name)
       return True
     
     # 检查是否已初始化
     if not self._initialized:
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: not initialized")
+      NacosMcpRouteLogger.get_logger().debug("Server %s: not initialized", self.name)
       return True
     
     # 检查是否请求关闭
     if self._shutdown_event.is_set():
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: shutdown requested")
+      NacosMcpRouteLogger.get_logger().debug("Server %s: shutdown requested", self.name)
       return True
     
     try:
       # 尝试执行一个轻量级操作来测试连接
-      NacosMcpRouteLogger.get_logger().info(f"Server {self.name}: testing connection health")
+      NacosMcpRouteLogger.get_logger().debug("Server %s: testing connection health", self.name)
       return await self._test_connection_health(timeout)
     except Exception as e:
       NacosMcpRouteLogger.get_logger().warning(f"Server {self.name}: connection test failed: {e}")
@@ -280,11 +557,15 @@ class ChromaDb:
     self._collection.delete(ids=ids)
 
   def query(self, query: str, count: int) -> QueryResult:
-    NacosMcpRouteLogger.get_logger().info(f"Querying chroma {query}")
-    return self._collection.query(
-      query_texts=[query],
-      n_results=count
-    )
+    NacosMcpRouteLogger.get_logger().debug("Querying chroma %s", query)
+    with metrics.CHROMA_QUERY_SECONDS.time(), tracing.start_span("chroma.query", {"db.operation": "query", "n_results": count}):
+      return self._collection.query(
+        query_texts=[query],
+        n_results=count
+      )
 
   def get(self, id: list[str]) -> GetResult:
     return self._collection.get(ids=id)
+
+  def count(self) -> int:
+    return self._collection.count()
@@ -0,0 +1,221 @@
+#-*- coding: utf-8 -*-
+"""
+按MCP客户端会话统计和限制路由资源，避免单个agent占满路由：
+    SESSION_MAX_SERVERS:    每个会话最多使用的MCP server数量
+    SESSION_MAX_IN_FLIGHT:  每个会话同时进行的工具调用数，超出的调用排队
+    SESSION_CALL_RATE:      每个会话每秒的工具调用数（令牌桶，允许2倍突发），超出时拒绝
+    ROUTER_MAX_IN_FLIGHT:   整个路由同时进行的工具调用数，排队的调用按会话轮流执行
+
+会话默认为MCP会话（SSE连接或有状态的streamable HTTP会话）。
+无状态streamable HTTP的每个请求都是新的会话，可以设置 SESSION_KEY_HEADER 按请求头区分客户端。
+全部为0（默认）时不做任何限制。
+"""
+import asyncio
+import os
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Iterable
+
+from . import metrics
+from .router_exceptions import NacosMcpRouterException
+
+_IDLE_CLIENT_TTL = 3600
+_MAX_CLIENTS = 10000
+
+
+class QuotaExceeded(NacosMcpRouterException):
+  pass
+
+
+class SessionUsage:
+  def __init__(self, key: str) -> None:
+    self.key = key
+    self.servers: set[str] = set()
+    self.in_flight = 0
+    self.calls = 0
+    self.rejected = 0
+    self.last_active = time.monotonic()
+    self._tokens: float | None = None
+    self._token_time = time.monotonic()
+    self._semaphore: asyncio.Semaphore | None = None
+
+  def take_token(self, rate: float) -> bool:
+    burst = max(rate * 2, 1.0)
+    now = time.monotonic()
+    tokens = burst if self._tokens is None else min(burst, self._tokens + (now - self._token_time) * rate)
+    self._token_time = now
+    if tokens < 1:
+      self._tokens = tokens
+      return False
+    self._tokens = tokens - 1
+    return True
+
+  def semaphore(self, limit: int) -> asyncio.Semaphore:
+    if self._semaphore is None:
+      self._semaphore = asyncio.Semaphore(limit)
+    return self._semaphore
+
+  def to_dict(self) -> dict[str, Any]:
+    return {
+      "key": self.key,
+      "servers": sorted(self.servers),
+      "in_flight": self.in_flight,
+      "calls": self.calls,
+      "rejected": self.rejected,
+    }
+
+
+class FairScheduler:
+  """
+  全局并发上限。没有空闲槽位时调用按会话排队，释放的槽位轮流交给下一个会话，
+  一个会话排队再多的调用也只能和其他会话交替执行。
+  """
+
+  def __init__(self, capacity: int) -> None:
+    self.capacity = capacity
+    self.active = 0
+    self._waiters: OrderedDict[SessionUsage, deque[asyncio.Future]] = OrderedDict()
+
+  @property
+  def waiting(self) -> int:
+    return sum(len(queue) for queue in self._waiters.values())
+
+  async def acquire(self, usage: SessionUsage) -> None:
+    if self.capacity <= 0:
+      return
+    if self.active < self.capacity and not self._waiters:
+      self.active += 1
+      return
+
+    future = asyncio.get_running_loop().create_future()
+    self._waiters.setdefault(usage, deque()).append(future)
+    try:
+      await future
+    except asyncio.CancelledError:
+      if future.done() and not future.cancelled():
+        # 已经分到槽位但调用被取消，交给下一个等待者
+        self.release()
+      else:
+        queue = self._waiters.get(usage)
+        if queue is not None and future in queue:
+          queue.remove(future)
+          if not queue:
+            del self._waiters[usage]
+      raise
+
+  def release(self) -> None:
+    if self.capacity <= 0:
+      return
+    while self._waiters:
+      usage, queue = next(iter(self._waiters.items()))
+      future = queue.popleft()
+      if queue:
+        self._waiters.move_to_end(usage)
+      else:
+        del self._waiters[usage]
+      if not future.done():
+        future.set_result(None)
+        return
+    self.active -= 1
+
+
+class SessionQuotaManager:
+  def __init__(self, max_servers: int = 0, max_in_flight: int = 0, call_rate: float = 0.0,
+               global_in_flight: int = 0, key_header: str = "") -> None:
+    self.max_servers = max_servers
+    self.max_in_flight = max_in_flight
+    self.call_rate = call_rate
+    self.key_header = key_header.lower()
+    self.scheduler = FairScheduler(global_in_flight)
+    self._sessions: weakref.WeakKeyDictionary[Any, SessionUsage] = weakref.WeakKeyDictionary()
+    self._clients: dict[str, SessionUsage] = {}
+    self._default = SessionUsage("default")
+
+  @classmethod
+  def from_env(cls) -> "SessionQuotaManager":
+    return cls(max_servers=int(os.getenv("SESSION_MAX_SERVERS", "0")),
+               max_in_flight=int(os.getenv("SESSION_MAX_IN_FLIGHT", "0")),
+               call_rate=float(os.getenv("SESSION_CALL_RATE", "0")),
+               global_in_flight=int(os.getenv("ROUTER_MAX_IN_FLIGHT", "0")),
+               key_header=os.getenv("SESSION_KEY_HEADER", ""))
+
+  @property
+  def enabled(self) -> bool:
+    return self.max_servers > 0 or self.max_in_flight > 0 or self.call_rate > 0 or self.scheduler.capacity > 0
+
+  def usage_for(self, session: Any, request: Any = None) -> SessionUsage:
+    if self.key_header and request is not None:
+      client = request.headers.get(self.key_header)
+      if client:
+        usage = self._clients.get(client)
+        if usage is None:
+          self._prune_clients()
+          usage = self._clients[client] = SessionUsage(f"{self.key_header}:{client}")
+        return usage
+    if session is None:
+      return self._default
+    usage = self._sessions.get(session)
+    if usage is None:
+      usage = self._sessions[session] = SessionUsage(f"session:{id(session):x}")
+    return usage
+
+  def _prune_clients(self) -> None:
+    if len(self._clients) < _MAX_CLIENTS:
+      return
+    expired = time.monotonic() - _IDLE_CLIENT_TTL
+    for key, usage in list(self._clients.items()):
+      if usage.in_flight == 0 and usage.last_active < expired:
+        del self._clients[key]
+
+  def check_servers(self, usage: SessionUsage, mcp_server_names: Iterable[str]) -> set[str]:
+    """一次调用（例如batch_use_tool）涉及的server整体检查，返回尚未计入会话的server，不修改会话"""
+    new_servers = {name for name in mcp_server_names if name not in usage.servers}
+    if self.max_servers > 0 and new_servers and len(usage.servers) + len(new_servers) > self.max_servers:
+      usage.rejected += 1
+      metrics.QUOTA_REJECTIONS.labels("servers").inc()
+      raise QuotaExceeded(f"session quota exceeded: at most {self.max_servers} mcp servers per session, "
+                          f"already using {', '.join(sorted(usage.servers)) or 'none'}, "
+                          f"requested {', '.join(sorted(new_servers))}")
+    return new_servers
+
+  @asynccontextmanager
+  async def admit(self, usage: SessionUsage, mcp_server_names: Iterable[str] = ()) -> AsyncIterator[None]:
+    """
+    调用涉及的server在通过限流、拿到执行槽位后才计入会话，被拒绝或排队时取消的调用不占用server配额。
+    排队期间其他调用可能已经用掉配额，拿到槽位后再检查一次。
+    """
+    mcp_server_names = set(mcp_server_names)
+    usage.last_active = time.monotonic()
+    self.check_servers(usage, mcp_server_names)
+    if self.call_rate > 0 and not usage.take_token(self.call_rate):
+      usage.rejected += 1
+      metrics.QUOTA_REJECTIONS.labels("rate").inc()
+      raise QuotaExceeded(f"session rate limit exceeded: at most {self.call_rate:g} calls per second")
+
+    usage.calls += 1
+    usage.in_flight += 1
+    try:
+      if self.max_in_flight > 0:
+        async with usage.semaphore(self.max_in_flight), self._scheduled(usage):
+          usage.servers.update(self.check_servers(usage, mcp_server_names))
+          yield
+      else:
+        async with self._scheduled(usage):
+          usage.servers.update(self.check_servers(usage, mcp_server_names))
+          yield
+    finally:
+      usage.in_flight -= 1
+      usage.last_active = time.monotonic()
+
+  @asynccontextmanager
+  async def _scheduled(self, usage: SessionUsage) -> AsyncIterator[None]:
+    await self.scheduler.acquire(usage)
+    try:
+      yield
+    finally:
+      self.scheduler.release()
+
+  def sessions(self) -> list[SessionUsage]:
+    return [*self._sessions.values(), *self._clients.values()]
@@ -0,0 +1,91 @@
+#-*- coding: utf-8 -*-
+"""
+进程退出时的有序关闭：
+    1. 停止接收新的工具调用（新调用直接返回错误，客户端可以重试其他副本）
+    2. 等待进行中的工具调用结束，最多等待SHUTDOWN_DRAIN_TIMEOUT秒
+    3. 并发关闭所有下游MCP server，每个server最多等待SHUTDOWN_CLOSE_TIMEOUT秒，超时后强制取消
+整个过程的耗时与安装的server数量无关，最多为两个超时之和。
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Mapping
+
+from .logger import NacosMcpRouteLogger
+from .router_exceptions import NacosMcpRouterException
+from .router_types import CustomServer
+
+logger = NacosMcpRouteLogger.get_logger()
+
+
+class ShuttingDown(NacosMcpRouterException):
+  pass
+
+
+class ShutdownCoordinator:
+  def __init__(self, drain_timeout: float = 10, close_timeout: float = 5) -> None:
+    self.drain_timeout = drain_timeout
+    self.close_timeout = close_timeout
+    self.in_flight = 0
+    self._closing = False
+    self._idle = asyncio.Event()
+    self._idle.set()
+
+  @classmethod
+  def from_env(cls) -> "ShutdownCoordinator":
+    return cls(drain_timeout=float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10")),
+               close_timeout=float(os.getenv("SHUTDOWN_CLOSE_TIMEOUT", "5")))
+
+  @property
+  def closing(self) -> bool:
+    return self._closing
+
+  def begin(self) -> None:
+    """停止接收新的调用，可以在信号处理函数中调用"""
+    if not self._closing:
+      self._closing = True
+      logger.info(f"shutting down, {self.in_flight} tool call(s) in flight")
+
+  def acquire(self) -> None:
+    """登记一个进行中的调用，关闭过程中抛出ShuttingDown；不在同一个协程中结束的调用（例如直通代理转发的请求）直接使用"""
+    if self._closing:
+      raise ShuttingDown(msg="nacos-mcp-router is shutting down, please retry later")
+    self.in_flight += 1
+    self._idle.clear()
+
+  def release(self) -> None:
+    self.in_flight -= 1
+    if self.in_flight == 0:
+      self._idle.set()
+
+  @asynccontextmanager
+  async def track(self) -> AsyncIterator[None]:
+    self.acquire()
+    try:
+      yield
+    finally:
+      self.release()
+
+  async def drain(self) -> int:
+    """等待进行中的调用结束，返回超时后仍未结束的调用数"""
+    self.begin()
+    try:
+      async with asyncio.timeout(self.drain_timeout):
+        await self._idle.wait()
+    except TimeoutError:
+      logger.warning(f"{self.in_flight} tool call(s) still in flight after {self.drain_timeout}s, closing anyway")
+    return self.in_flight
+
+  async def close_servers(self, servers: Iterable[CustomServer]) -> None:
+    servers = [server for server in servers if server is not None]
+    if not servers:
+      return
+    start = time.monotonic()
+    await asyncio.gather(*[server.shutdown(self.close_timeout) for server in servers], return_exceptions=True)
+    logger.info(f"closed {len(servers)} mcp server(s) in {time.monotonic() - start:.2f}s")
+
+  async def shutdown(self, servers: Mapping[str, CustomServer]) -> None:
+    """servers为已安装的server字典，等待期间进行中的调用可能安装新的server，drain结束后再取出要关闭的server"""
+    await self.drain()
+    await self.close_servers(list(servers.values()))
@@ -0,0 +1,108 @@
+#-*- coding: utf-8 -*-
+"""
+工具级别的向量索引。
+
+服务级别的索引把server描述和所有工具描述拼成一篇文档，工具多的server文档很长，向量化慢且相似度被稀释。
+这里为每个 (server, tool) 建立一条记录，文档只包含工具名称和描述；
+记录的metadata保存内容哈希，刷新时只向量化新增或变化的工具，并删除已经不存在的工具。
+"""
+import threading
+from typing import Any, NamedTuple
+
+from . import metrics, tracing
+from .logger import NacosMcpRouteLogger
+from .md5_util import get_md5
+from .router_types import McpServer
+
+logger = NacosMcpRouteLogger.get_logger()
+
+COLLECTION_NAME = "nacos_mcp_router-tools"
+_UPSERT_BATCH = 256
+
+
+class ToolMatch(NamedTuple):
+  server_name: str
+  tool_name: str
+  distance: float
+
+
+def tool_id(server_name: str, tool_name: str) -> str:
+  return f"{server_name}/{tool_name}"
+
+
+def tool_document(tool_name: str, description: str | None) -> str:
+  return f"{tool_name}: {description}" if description else tool_name
+
+
+class ToolIndex:
+  def __init__(self, collection: Any) -> None:
+    self._collection = collection
+    self._hashes: dict[str, str] | None = None
+    self._lock = threading.Lock()
+
+  @classmethod
+  def create(cls, client: Any) -> "ToolIndex":
+    return cls(client.get_or_create_collection(name=COLLECTION_NAME))
+
+  def _load_hashes(self) -> dict[str, str]:
+    # 进程重启后从已有的集合恢复哈希，未变化的工具不需要重新向量化
+    if self._hashes is None:
+      existing = self._collection.get(include=["metadatas"])
+      self._hashes = {id_: (metadata or {}).get("hash", "")
+                      for id_, metadata in zip(existing.get("ids") or [], existing.get("metadatas") or [])}
+    return self._hashes
+
+  def sync(self, servers: dict[str, McpServer]) -> tuple[int, int]:
+    """按注册表更新索引，返回 (更新的工具数, 删除的工具数)"""
+    with self._lock, tracing.start_span("tool_index.sync"):
+      hashes = self._load_hashes()
+      desired: dict[str, str] = {}
+      changed_ids, documents, metadatas = [], [], []
+      for server_name, server in servers.items():
+        detail = getattr(server, "mcp_config_detail", None)
+        if detail is None:
+          continue
+        for tool in detail.tool_spec.tools:
+          meta = detail.tool_spec.tools_meta.get(tool.name)
+          if meta is not None and not meta.enabled:
+            continue
+          document = tool_document(tool.name, tool.description)
+          id_ = tool_id(server_name, tool.name)
+          digest = get_md5(document)
+          desired[id_] = digest
+          if hashes.get(id_) != digest:
+            changed_ids.append(id_)
+            documents.append(document)
+            metadatas.append({"server": server_name, "tool": tool.name, "hash": digest})
+
+      for start in range(0, len(changed_ids), _UPSERT_BATCH):
+        end = start + _UPSERT_BATCH
+        self._collection.upsert(ids=changed_ids[start:end], documents=documents[start:end],
+                                metadatas=metadatas[start:end])
+        for id_, metadata in zip(changed_ids[start:end], metadatas[start:end]):
+          hashes[id_] = metadata["hash"]
+
+      deleted = [id_ for id_ in hashes if id_ not in desired]
+      if deleted:
+        self._collection.delete(ids=deleted)
+        for id_ in deleted:
+          del hashes[id_]
+
+    metrics.REFRESH_ITEMS.labels("tools").set(len(desired))
+    metrics.REFRESH_ITEMS.labels("tools_changed").set(len(changed_ids))
+    if changed_ids or deleted:
+      logger.info(f"tool index updated, tools: {len(desired)}, changed: {len(changed_ids)}, deleted: {len(deleted)}")
+    return len(changed_ids), len(deleted)
+
+  def __len__(self) -> int:
+    with self._lock:
+      return len(self._load_hashes())
+
+  def search(self, query: str, count: int) -> list[ToolMatch]:
+    with metrics.CHROMA_QUERY_SECONDS.time(), \
+        tracing.start_span("chroma.query", {"db.operation": "query", "db.collection": COLLECTION_NAME, "n_results": count}):
+      result = self._collection.query(query_texts=[query], n_results=count, include=["metadatas", "distances"])
+    metadatas = (result.get("metadatas") or [[]])[0]
+    distances = (result.get("distances") or [[]])[0]
+    return [ToolMatch(metadata["server"], metadata["tool"], float(distance))
+            for metadata, distance in zip(metadatas, distances) if metadata]
@@ -0,0 +1,90 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import json
+from typing import NamedTuple
+
+from mcp import Tool
+
+from .logger import NacosMcpRouteLogger
+from .md5_util import get_md5
+from .nacos_http_client import NacosHttpClient
+
+logger = NacosMcpRouteLogger.get_logger()
+
+
+class _PendingUpdate(NamedTuple):
+  tools: list[Tool]
+  mcp_version: str
+  id: str
+  digest: str
+
+
+def tools_digest(tools: list[Tool], mcp_version: str) -> str:
+  tool_list = [{"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+               for tool in tools]
+  return get_md5(mcp_version + json.dumps(tool_list, ensure_ascii=False, sort_keys=True))
+
+
+class ToolRegistrar:
+  """
+  将MCP server的工具列表异步回写到Nacos。
+
+  同一个server的多次更新在队列中合并为最后一次；工具列表（含版本）与上次成功推送的
+  哈希一致时跳过更新，调用方不会被Nacos请求阻塞。
+  """
+
+  def __init__(self, nacos_http_client: NacosHttpClient) -> None:
+    self.nacos_http_client = nacos_http_client
+    self._pending: dict[str, _PendingUpdate] = {}
+    self._pushed_digest: dict[str, str] = {}
+    self._wakeup: asyncio.Event | None = None
+    self._idle: asyncio.Event | None = None
+    self._worker: asyncio.Task | None = None
+
+  def submit(self, mcp_name: str, tools: list[Tool], mcp_version: str, id: str) -> None:
+    digest = tools_digest(tools, mcp_version)
+    if self._pushed_digest.get(mcp_name) == digest:
+      self._pending.pop(mcp_name, None)
+      return
+
+    self._pending[mcp_name] = _PendingUpdate(tools, mcp_version, id, digest)
+    self._ensure_worker()
+    self._idle.clear()
+    self._wakeup.set()
+
+  def _ensure_worker(self) -> None:
+    loop = asyncio.get_running_loop()
+    if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+      return
+    self._wakeup = asyncio.Event()
+    self._idle = asyncio.Event()
+    self._worker = loop.create_task(self._run())
+
+  async def _run(self) -> None:
+    while True:
+      await self._wakeup.wait()
+      self._wakeup.clear()
+      while self._pending:
+        mcp_name = next(iter(self._pending))
+        update = self._pending.pop(mcp_name)
+        if self._pushed_digest.get(mcp_name) == update.digest:
+          continue
+        try:
+          success = await self.nacos_http_client.update_mcp_tools(mcp_name, update.tools, update.mcp_version, update.id)
+          if success:
+            self._pushed_digest[mcp_name] = update.digest
+        except Exception as e:
+          logger.warning(f"failed to update mcp tools for {mcp_name}", exc_info=e)
+      self._idle.set()
+
+  async def flush(self, timeout: float) -> bool:
+    """等待队列中的更新全部推送完成，返回是否在超时前完成"""
+    if self._worker is None or self._worker.done() or not self._pending and self._idle.is_set():
+      return True
+    try:
+      async with asyncio.timeout(timeout):
+        await self._idle.wait()
+      return True
+    except TimeoutError:
+      logger.warning(f"{len(self._pending)} mcp tools update(s) not flushed before timeout")
+      return False
@@ -0,0 +1,104 @@
+#-*- coding: utf-8 -*-
+"""
+下游工具调用结果的处理。
+
+结果按MCP的content列表原样返回（文本、图片、音频、嵌入资源），不再转换成字符串；
+可选地限制结果大小（TOOL_RESULT_MAX_BYTES）或把超长文本拆成多个content（TOOL_RESULT_CHUNK_BYTES），
+避免单个结果占用过多内存或超出客户端的上下文长度。
+"""
+from typing import Sequence
+
+from mcp import types
+
+Content = types.TextContent | types.ImageContent | types.AudioContent | types.EmbeddedResource
+
+
+def text_result(text: str) -> list[Content]:
+  return [types.TextContent(type="text", text=text)]
+
+
+def content_size(content: Content) -> int:
+  """content的大致字节数，二进制内容按解码后的大小计算"""
+  if isinstance(content, types.TextContent):
+    return len(content.text.encode("utf-8"))
+  if isinstance(content, (types.ImageContent, types.AudioContent)):
+    return len(content.data) * 3 // 4
+  resource = getattr(content, "resource", None)
+  if isinstance(resource, types.TextResourceContents):
+    return len(resource.text.encode("utf-8"))
+  if isinstance(resource, types.BlobResourceContents):
+    return len(resource.blob) * 3 // 4
+  return 0
+
+
+def _split_utf8(data: bytes, size: int) -> list[str]:
+  chunks = []
+  while data:
+    end = min(size, len(data))
+    # 不在多字节字符中间截断
+    while end < len(data) and end > 0 and (data[end] & 0xC0) == 0x80:
+      end -= 1
+    if end == 0:
+      end = min(size, len(data))
+    chunks.append(data[:end].decode("utf-8", errors="ignore"))
+    data = data[end:]
+  return chunks
+
+
+def chunk_content(content: Sequence[Content], chunk_bytes: int) -> list[Content]:
+  """把超过chunk_bytes的文本拆成多个TextContent，其他类型保持不变"""
+  if chunk_bytes <= 0:
+    return list(content)
+  result: list[Content] = []
+  for item in content:
+    if isinstance(item, types.TextContent):
+      data = item.text.encode("utf-8")
+      if len(data) > chunk_bytes:
+        result.extend(types.TextContent(type="text", text=chunk) for chunk in _split_utf8(data, chunk_bytes))
+        continue
+    result.append(item)
+  return result
+
+
+def truncate_content(content: Sequence[Content], max_bytes: int) -> list[Content]:
+  """
+  结果总大小不超过max_bytes：超出部分的文本被截断，放不下的图片和资源被替换为说明文字。
+  """
+  if max_bytes <= 0:
+    return list(content)
+  total = sum(content_size(item) for item in content)
+  if total <= max_bytes:
+    return list(content)
+
+  result: list[Content] = []
+  remaining = max_bytes
+  for item in content:
+    size = content_size(item)
+    if size <= remaining:
+      result.append(item)
+      remaining -= size
+    elif isinstance(item, types.TextContent) and remaining > 0:
+      text = _split_utf8(item.text.encode("utf-8"), remaining)[0]
+      result.append(types.TextContent(type="text", text=text, annotations=item.annotations))
+      remaining = 0
+    elif not isinstance(item, types.TextContent):
+      result.append(types.TextContent(type="text", text=f"[{item.type} content omitted: {size} bytes]"))
+  result.append(types.TextContent(type="text",
+                                  text=f"[result truncated: {total} bytes exceeds the limit of {max_bytes} bytes]"))
+  return result
+
+
+def limit_content(content: Sequence[Content], max_bytes: int = 0, chunk_bytes: int = 0) -> list[Content]:
+  return chunk_content(truncate_content(content, max_bytes), chunk_bytes)
+
+
+def to_text(content: Sequence[Content]) -> str:
+  """content中的文本部分，供只关心文本的调用方使用"""
+  parts = []
+  for item in content:
+    if isinstance(item, types.TextContent):
+      parts.append(item.text)
+    elif isinstance(getattr(item, "resource", None), types.TextResourceContents):
+      parts.append(item.resource.text)
+  return "".join(parts)
+
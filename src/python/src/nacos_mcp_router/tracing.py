@@ -0,0 +1,327 @@
+#-*- coding: utf-8 -*-
+"""
+轻量的链路追踪，数据模型与OpenTelemetry一致（W3C trace context、OTLP格式导出）。
+
+默认关闭，通过 TRACE_EXPORTER 选择导出器：
+    log:    以JSON写入路由日志
+    otlp:   以OTLP/HTTP JSON发送到 OTEL_EXPORTER_OTLP_ENDPOINT
+    memory: 保存在内存中，用于测试
+"""
+import abc
+import contextvars
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import httpx
+
+from . import json_codec
+from .logger import NacosMcpRouteLogger
+
+logger = NacosMcpRouteLogger.get_logger()
+
+TRACEPARENT = "traceparent"
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+STATUS_UNSET = "UNSET"
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+
+class Span:
+  def __init__(self, name: str, trace_id: str, span_id: str, parent_span_id: str | None,
+               attributes: dict[str, Any] | None = None) -> None:
+    self.name = name
+    self.trace_id = trace_id
+    self.span_id = span_id
+    self.parent_span_id = parent_span_id
+    self.attributes: dict[str, Any] = dict(attributes or {})
+    self.status = STATUS_UNSET
+    self.status_message = ""
+    self.start_time_ns = time.time_ns()
+    self.end_time_ns: int | None = None
+
+  def set_attribute(self, key: str, value: Any) -> None:
+    self.attributes[key] = value
+
+  def set_status(self, status: str, message: str = "") -> None:
+    self.status = status
+    self.status_message = message
+
+  def record_exception(self, e: BaseException) -> None:
+    self.set_status(STATUS_ERROR, f"{type(e).__name__}: {e}")
+
+  def traceparent(self) -> str:
+    return f"00-{self.trace_id}-{self.span_id}-01"
+
+  def to_dict(self) -> dict[str, Any]:
+    return {
+      "name": self.name,
+      "traceId": self.trace_id,
+      "spanId": self.span_id,
+      "parentSpanId": self.parent_span_id,
+      "startTimeUnixNano": self.start_time_ns,
+      "endTimeUnixNano": self.end_time_ns,
+      "attributes": self.attributes,
+      "status": self.status,
+      "statusMessage": self.status_message,
+    }
+
+
+class _NonRecordingSpan(Span):
+  """tracing关闭时使用，不记录任何数据"""
+
+  def __init__(self) -> None:
+    super().__init__("", "0" * 32, "0" * 16, None)
+
+  def set_attribute(self, key: str, value: Any) -> None:
+    pass
+
+  def set_status(self, status: str, message: str = "") -> None:
+    pass
+
+
+_NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+class SpanExporter(abc.ABC):
+  @abc.abstractmethod
+  def export(self, spans: list[Span]) -> None:
+    ...
+
+  def shutdown(self) -> None:
+    pass
+
+
+class InMemorySpanExporter(SpanExporter):
+  def __init__(self) -> None:
+    self._spans: list[Span] = []
+    self._lock = threading.Lock()
+
+  def export(self, spans: list[Span]) -> None:
+    with self._lock:
+      self._spans.extend(spans)
+
+  def get_finished_spans(self) -> list[Span]:
+    with self._lock:
+      return list(self._spans)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._spans.clear()
+
+
+class LoggingSpanExporter(SpanExporter):
+  def export(self, spans: list[Span]) -> None:
+    for span in spans:
+      logger.info("span %s", json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+  if isinstance(value, bool):
+    return {"boolValue": value}
+  if isinstance(value, int):
+    return {"intValue": str(value)}
+  if isinstance(value, float):
+    return {"doubleValue": value}
+  return {"stringValue": str(value)}
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+  """以OTLP/HTTP JSON协议导出，可直接对接OpenTelemetry Collector"""
+
+  _STATUS_CODES = {STATUS_UNSET: 0, STATUS_OK: 1, STATUS_ERROR: 2}
+
+  def __init__(self, endpoint: str, service_name: str, timeout: float = 5) -> None:
+    self.endpoint = endpoint.rstrip("/") + "/v1/traces"
+    self.service_name = service_name
+    self.timeout = timeout
+
+  def _encode(self, spans: list[Span]) -> dict[str, Any]:
+    return {"resourceSpans": [{
+      "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+      "scopeSpans": [{
+        "scope": {"name": "nacos_mcp_router"},
+        "spans": [{
+          "traceId": span.trace_id,
+          "spanId": span.span_id,
+          "parentSpanId": span.parent_span_id or "",
+          "name": span.name,
+          "kind": 1,
+          "startTimeUnixNano": str(span.start_time_ns),
+          "endTimeUnixNano": str(span.end_time_ns),
+          "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+          "status": {"code": self._STATUS_CODES[span.status], "message": span.status_message},
+        } for span in spans],
+      }],
+    }]}
+
+  def export(self, spans: list[Span]) -> None:
+    try:
+      response = httpx.post(self.endpoint, json=self._encode(spans), timeout=self.timeout)
+      if response.status_code >= 300:
+        logger.warning(f"failed to export spans, code: {response.status_code}")
+    except Exception as e:
+      logger.warning(f"failed to export spans to {self.endpoint}: {e}")
+
+
+class BatchSpanProcessor:
+  """在后台线程中批量导出，避免导出阻塞请求"""
+
+  def __init__(self, exporter: SpanExporter, max_batch: int = 512, interval: float = 2.0) -> None:
+    self.exporter = exporter
+    self.max_batch = max_batch
+    self.interval = interval
+    self._queue: queue.SimpleQueue[Span | None] = queue.SimpleQueue()
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def on_end(self, span: Span) -> None:
+    self._queue.put(span)
+
+  def _run(self) -> None:
+    while True:
+      batch: list[Span] = []
+      deadline = time.monotonic() + self.interval
+      stop = False
+      while len(batch) < self.max_batch:
+        try:
+          span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+        except queue.Empty:
+          break
+        if span is None:
+          stop = True
+          break
+        batch.append(span)
+      if batch:
+        self.exporter.export(batch)
+      if stop:
+        return
+
+  def shutdown(self) -> None:
+    self._queue.put(None)
+    self._thread.join(timeout=5)
+    self.exporter.shutdown()
+
+
+class SimpleSpanProcessor:
+  def __init__(self, exporter: SpanExporter) -> None:
+    self.exporter = exporter
+
+  def on_end(self, span: Span) -> None:
+    self.exporter.export([span])
+
+  def shutdown(self) -> None:
+    self.exporter.shutdown()
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("nacos_mcp_router_span", default=None)
+_processor: SimpleSpanProcessor | BatchSpanProcessor | None = None
+
+
+def configure(processor: SimpleSpanProcessor | BatchSpanProcessor | None) -> None:
+  global _processor
+  if _processor is not None:
+    _processor.shutdown()
+  _processor = processor
+
+
+def configure_from_env() -> None:
+  exporter_name = os.getenv("TRACE_EXPORTER", "none").lower()
+  if exporter_name == "log":
+    configure(BatchSpanProcessor(LoggingSpanExporter()))
+  elif exporter_name == "otlp":
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+    service_name = os.getenv("OTEL_SERVICE_NAME", "nacos-mcp-router")
+    configure(BatchSpanProcessor(OtlpHttpSpanExporter(endpoint, service_name)))
+  elif exporter_name == "memory":
+    configure(SimpleSpanProcessor(InMemorySpanExporter()))
+  elif exporter_name != "none":
+    logger.warning(f"unknown trace exporter: {exporter_name}, tracing is disabled")
+
+
+def is_enabled() -> bool:
+  return _processor is not None
+
+
+def current_span() -> Span:
+  span = _current_span.get()
+  return span if span is not None else _NON_RECORDING_SPAN
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+  if not value:
+    return None
+  match = _TRACEPARENT_RE.match(value.strip().lower())
+  if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+    return None
+  return match.group(1), match.group(2)
+
+
+@contextmanager
+def start_span(name: str, attributes: dict[str, Any] | None = None,
+               traceparent: str | None = None) -> Iterator[Span]:
+  """
+  开始一个span并设为当前span。traceparent用于延续上游传入的链路，
+  否则以当前span为父span，没有当前span时开始新的链路。
+  """
+  processor = _processor
+  if processor is None:
+    yield _NON_RECORDING_SPAN
+    return
+
+  remote = parse_traceparent(traceparent)
+  parent = _current_span.get()
+  if remote is not None:
+    trace_id, parent_span_id = remote
+  elif parent is not None:
+    trace_id, parent_span_id = parent.trace_id, parent.span_id
+  else:
+    trace_id, parent_span_id = secrets.token_hex(16), None
+
+  span = Span(name, trace_id, secrets.token_hex(8), parent_span_id, attributes)
+  token = _current_span.set(span)
+  try:
+    yield span
+  except BaseException as e:
+    span.record_exception(e)
+    raise
+  finally:
+    _current_span.reset(token)
+    span.end_time_ns = time.time_ns()
+    processor.on_end(span)
+
+
+def inject_meta(meta: dict[str, Any] | None = None) -> dict[str, Any] | None:
+  """把当前链路写入MCP请求的 _meta，下游stdio/HTTP传输都可以从中获取"""
+  span = _current_span.get()
+  if span is None:
+    return meta
+  meta = dict(meta or {})
+  meta[TRACEPARENT] = span.traceparent()
+  return meta
+
+
+class TraceContextAuth(httpx.Auth):
+  """
+  把MCP请求 _meta 中的traceparent复制到HTTP请求头。
+  SSE/streamable HTTP传输在独立的任务中发送请求，无法直接读取调用方的上下文。
+  """
+  requires_request_body = True
+
+  def auth_flow(self, request: httpx.Request):
+    if TRACEPARENT not in request.headers and request.content:
+      try:
+        body = json_codec.loads(request.content)
+        traceparent = body.get("params", {}).get("_meta", {}).get(TRACEPARENT) if isinstance(body, dict) else None
+        if traceparent:
+          request.headers[TRACEPARENT] = traceparent
+      except Exception:
+        pass
+    yield request
@@ -0,0 +1,90 @@
+#-*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import threading
+import time
+
+from .logger import NacosMcpRouteLogger
+
+logger = NacosMcpRouteLogger.get_logger()
+
+# 使用分数的半衰期，越近的使用权重越高
+_HALF_LIFE_SECONDS = 7 * 24 * 3600
+_SAVE_INTERVAL_SECONDS = 60
+
+
+def _default_path() -> str:
+  # 多进程模式下每个worker保存自己的使用记录，避免互相覆盖
+  worker_id = os.getenv("ROUTER_WORKER_ID", "")
+  name = f"usage_stats-worker-{worker_id}.json" if worker_id else "usage_stats.json"
+  return os.path.expanduser("~") + "/.nacos_mcp_router/" + name
+
+
+class UsageStats:
+  """
+  记录每个MCP server的使用情况，按时间衰减后的使用次数排序，并持久化到本地文件，
+  用于启动时预热最近常用的MCP server。
+  """
+
+  def __init__(self, path: str | None = None, half_life: float = _HALF_LIFE_SECONDS,
+               save_interval: float = _SAVE_INTERVAL_SECONDS) -> None:
+    self.path = path or _default_path()
+    self.save_interval = save_interval
+    self.half_life = half_life
+    self._scores: dict[str, dict[str, float]] = {}
+    self._lock = threading.Lock()
+    self._dirty = False
+
+  def load(self) -> None:
+    try:
+      with open(self.path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+      with self._lock:
+        self._scores = {name: {"score": float(v["score"]), "last_used": float(v["last_used"])}
+                        for name, v in data.items()}
+    except FileNotFoundError:
+      return
+    except Exception as e:
+      logger.warning(f"failed to load usage stats from {self.path}", exc_info=e)
+
+  def save(self) -> None:
+    with self._lock:
+      if not self._dirty:
+        return
+      data = dict(self._scores)
+      self._dirty = False
+    try:
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      tmp_path = f"{self.path}.{os.getpid()}.tmp"
+      with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+      os.replace(tmp_path, self.path)
+    except Exception as e:
+      logger.warning(f"failed to save usage stats to {self.path}", exc_info=e)
+
+  async def run(self) -> None:
+    """定期在后台线程中保存，工具调用只更新内存中的记录"""
+    while True:
+      await asyncio.sleep(self.save_interval)
+      if self._dirty:
+        await asyncio.to_thread(self.save)
+
+  def _decayed(self, entry: dict[str, float], now: float) -> float:
+    return entry["score"] * 0.5 ** ((now - entry["last_used"]) / self.half_life)
+
+  def record(self, mcp_server_name: str) -> None:
+    now = time.time()
+    with self._lock:
+      entry = self._scores.get(mcp_server_name)
+      score = self._decayed(entry, now) if entry else 0.0
+      self._scores[mcp_server_name] = {"score": score + 1, "last_used": now}
+      self._dirty = True
+
+  def top(self, n: int) -> list[str]:
+    if n <= 0:
+      return []
+    now = time.time()
+    with self._lock:
+      ranked = sorted(self._scores.items(), key=lambda item: self._decayed(item[1], now), reverse=True)
+    return [name for name, _ in ranked[:n]]
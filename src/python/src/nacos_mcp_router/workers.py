@@ -0,0 +1,98 @@
+#-*- coding: utf-8 -*-
+"""
+多进程模式（WORKERS > 1，仅支持router模式的streamable_http传输）。
+
+主进程只负责从Nacos刷新注册表、写入快照文件、维护向量索引并管理worker，不处理MCP请求；
+worker进程共享同一个监听socket，由内核分配连接，通过mmap读取注册表快照，
+向量检索通过Unix domain socket转发给主进程（见index_service）。
+streamable_http是无状态模式，任意请求都可以由任意worker处理，
+下游MCP server的连接由各worker独立持有，use_tool时按需在当前worker安装：
+每个worker都会用到的stdio MCP server在每个worker中各有一个子进程。
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from .index_service import IndexServer
+from .logger import NacosMcpRouteLogger
+from .registry_snapshot import RegistrySnapshot
+
+logger = NacosMcpRouteLogger.get_logger()
+
+_RESTART_DELAY = 1.0
+_SHUTDOWN_TIMEOUT = 30.0
+
+
+def _worker_main(sock: socket.socket, snapshot_path: str, index_path: str, host: str, port: int) -> None:
+  from . import router
+
+  router.worker_snapshot_path = snapshot_path
+  router.worker_index_path = index_path
+  if router.init() != 0:
+    return
+  router.create_mcp_app()
+  router.serve_http(router.create_streamable_http_app(), host, port, sockets=[sock])
+
+
+def serve(workers: int, host: str, port: int, snapshot: RegistrySnapshot | None,
+          index_server: IndexServer | None = None) -> int:
+  if snapshot is None:
+    logger.error("registry snapshot is required in multi-worker mode")
+    return 1
+
+  sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+  sock.bind((host, port))
+  sock.set_inheritable(True)
+  index_path = index_server.start().path if index_server is not None else ""
+
+  context = multiprocessing.get_context("spawn")
+  stop = threading.Event()
+
+  def start_worker(index: int) -> multiprocessing.Process:
+    # worker根据ROUTER_WORKER_ID使用独立的日志文件，spawn时继承当前环境变量
+    os.environ["ROUTER_WORKER_ID"] = str(index)
+    try:
+      process = context.Process(target=_worker_main, args=(sock, snapshot.path, index_path, host, port),
+                                name=f"nacos-mcp-router-worker-{index}")
+      process.start()
+    finally:
+      os.environ.pop("ROUTER_WORKER_ID", None)
+    logger.info(f"started worker {index}, pid: {process.pid}")
+    return process
+
+  def handle_exit(signum, frame) -> None:
+    stop.set()
+
+  signal.signal(signal.SIGINT, handle_exit)
+  signal.signal(signal.SIGTERM, handle_exit)
+
+  logger.info(f"serving streamable_http on {host}:{port} with {workers} workers")
+  processes = [start_worker(i) for i in range(workers)]
+  started_at = [time.monotonic()] * workers
+  try:
+    while not stop.wait(0.5):
+      for i, process in enumerate(processes):
+        if process.is_alive() or time.monotonic() - started_at[i] < _RESTART_DELAY:
+          continue
+        logger.warning(f"worker {i} exited with code {process.exitcode}, restarting")
+        processes[i] = start_worker(i)
+        started_at[i] = time.monotonic()
+  finally:
+    logger.info("stopping workers")
+    for process in processes:
+      if process.is_alive():
+        process.terminate()
+    deadline = time.monotonic() + _SHUTDOWN_TIMEOUT
+    for process in processes:
+      process.join(timeout=max(deadline - time.monotonic(), 0))
+      if process.is_alive():
+        process.kill()
+    sock.close()
+    snapshot.remove()
+    if index_server is not None:
+      index_server.close()
+  return 0
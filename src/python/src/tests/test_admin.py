@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+from starlette.applications import Starlette
+
+from ..nacos_mcp_router import router
+from ..nacos_mcp_router.admin import AdminApi
+from ..nacos_mcp_router.constants import MODE_ROUTER
+from ..nacos_mcp_router.fake_backends import FakeNacosServer, stdio_command
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+
+_TOKEN = "secret"
+
+
+class TestAdminApi(unittest.TestCase):
+
+    def setUp(self):
+        self.nacos = FakeNacosServer().start()
+        command, args = stdio_command()
+        self.nacos.add_stdio_server("echo-server", "echo server", command, args)
+        self.addCleanup(self.nacos.stop)
+        client = NacosHttpClient({"nacosAddr": self.nacos.address, "userName": "nacos", "password": "nacos",
+                                  "namespaceId": "", "ak": "", "sk": ""})
+        self.updater = McpUpdater(client, None, enable_vector_db=False, mode=MODE_ROUTER, enable_auto_refresh=True)
+        patches = [
+            mock.patch.object(router, "mode", MODE_ROUTER),
+            mock.patch.object(router, "nacos_http_client", client, create=True),
+            mock.patch.object(router, "mcp_updater", self.updater, create=True),
+            mock.patch.object(router, "tool_registrar", None),
+            mock.patch.object(router, "usage_stats", None),
+            mock.patch.object(router, "mcp_servers_dict", {}),
+            mock.patch.object(router, "_install_locks", {}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _client(self, token: str = _TOKEN) -> httpx.AsyncClient:
+        api = AdminApi(_TOKEN, router.mcp_servers_dict, self.updater, router.evict_mcp_server)
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=Starlette(routes=api.routes())),
+                                 base_url="http://router", headers={"Authorization": f"Bearer {token}"})
+
+    def test_rejects_missing_or_wrong_token(self):
+        async def run():
+            async with self._client(token="wrong") as client:
+                return (await client.get("/admin/servers")).status_code
+
+        self.assertEqual(401, asyncio.run(run()))
+
+    def test_refresh_lists_registry_entries(self):
+        async def run():
+            async with self._client() as client:
+                before = (await client.get("/admin/registry")).json()
+                refreshed = await client.post("/admin/registry/refresh")
+                return before, refreshed.status_code, refreshed.json()
+
+        before, status, refreshed = asyncio.run(run())
+        self.assertEqual(0, before["size"])
+        self.assertEqual(200, status)
+        self.assertEqual(["echo-server"], [entry["name"] for entry in refreshed["servers"]])
+        self.assertIsNotNone(refreshed["servers"][0]["md5"])
+        self.assertIsNotNone(refreshed["last_refresh_seconds"])
+
+    def test_lists_and_evicts_installed_servers(self):
+        async def run():
+            await router.use_tool("echo-server", "echo", {"text": "hi"})
+            async with self._client() as client:
+                installed = (await client.get("/admin/servers")).json()
+                evicted = await client.delete("/admin/servers/echo-server")
+                missing = await client.delete("/admin/servers/echo-server")
+            return installed, evicted.status_code, missing.status_code
+
+        installed, evicted, missing = asyncio.run(run())
+        self.assertEqual(1, installed["size"])
+        server = installed["servers"][0]
+        self.assertEqual(("echo-server", "stdio", "connected", 0),
+                         (server["name"], server["protocol"], server["state"], server["in_flight"]))
+        self.assertEqual(200, evicted)
+        self.assertEqual(404, missing)
+        self.assertNotIn("echo-server", router.mcp_servers_dict)
+
+    def test_profile_requires_token(self):
+        api = AdminApi(_TOKEN, {}, self.updater, router.evict_mcp_server, enable_profiling=True)
+        app = Starlette(routes=api.routes())
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://router") as client:
+                anonymous = await client.get("/debug/profile", params={"seconds": 0.1})
+                authorized = await client.get("/debug/profile", params={"seconds": 0.1, "limit": 5},
+                                              headers={"Authorization": f"Bearer {_TOKEN}"})
+            return anonymous.status_code, authorized.status_code
+
+        self.assertEqual((401, 200), asyncio.run(run()))
+
+    def test_index_stats_without_vector_db(self):
+        async def run():
+            async with self._client() as client:
+                return (await client.get("/admin/index")).json()
+
+        stats = asyncio.run(run())
+        self.assertFalse(stats["enabled"])
+        self.assertIsNone(stats["tools"])
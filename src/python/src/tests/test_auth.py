@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+from ..nacos_mcp_router.auth import AccessToken, TokenCredentialsProvider
+from ..nacos_mcp_router.fake_backends import FakeNacosServer
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenCredentialsProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.logins = 0
+
+    async def login(self):
+        self.logins += 1
+        await asyncio.sleep(0.01)
+        return AccessToken(f"token-{self.logins}", ttl=100, obtained_at=self.clock())
+
+    def test_concurrent_requests_share_one_login(self):
+        provider = TokenCredentialsProvider(self.login, clock=self.clock)
+
+        async def run():
+            return await asyncio.gather(*[provider.get_token() for _ in range(20)])
+
+        self.assertEqual(["token-1"] * 20, asyncio.run(run()))
+        self.assertEqual(1, self.logins)
+        self.assertEqual("token-1", provider.get_credentials().get_security_token())
+
+    def test_refreshes_before_expiry_and_after_invalidate(self):
+        provider = TokenCredentialsProvider(self.login, refresh_ratio=0.2, clock=self.clock)
+
+        async def run():
+            first = await provider.get_token()
+            self.clock.now += 85
+            # 进入刷新窗口：当前请求仍使用旧token，后台刷新
+            during = await provider.get_token()
+            await asyncio.sleep(0.05)
+            after = await provider.get_token()
+            provider.invalidate(after)
+            relogin = await provider.get_token()
+            return first, during, after, relogin
+
+        self.assertEqual(("token-1", "token-1", "token-2", "token-3"), asyncio.run(run()))
+
+    def test_failed_login_backs_off(self):
+        async def failing_login():
+            self.logins += 1
+            return None
+
+        provider = TokenCredentialsProvider(failing_login, retry_interval=60, clock=self.clock)
+        self.assertIsNone(asyncio.run(provider.get_token()))
+        self.assertIsNone(asyncio.run(provider.get_token()))
+        self.assertEqual(1, self.logins)
+        self.clock.now += 61
+        asyncio.run(provider.get_token())
+        self.assertEqual(2, self.logins)
+
+
+class TestNacosTokenAuth(unittest.TestCase):
+
+    def setUp(self):
+        self.nacos = FakeNacosServer(require_token=True).start()
+        self.addCleanup(self.nacos.stop)
+        self.nacos.add_stdio_server("echo-server", "echo server", "echo", [])
+        self.client = NacosHttpClient({"nacosAddr": self.nacos.address, "userName": "nacos", "password": "nacos",
+                                       "namespaceId": "", "ak": "", "sk": ""})
+
+    def test_logs_in_once_and_sends_token_only(self):
+        async def run():
+            return await asyncio.gather(*[self.client.get_mcp_server(id="", name="echo-server") for _ in range(5)])
+
+        servers = asyncio.run(run())
+        self.assertTrue(all(server.name == "echo-server" for server in servers))
+        self.assertEqual(1, self.nacos.login_count)
+        self.assertEqual("token-1", self.nacos.last_headers.get("accesstoken"))
+        self.assertNotIn("password", self.nacos.last_headers)
+
+    def test_relogin_when_token_rejected(self):
+        asyncio.run(self.client.get_mcp_servers())
+        self.nacos.tokens.clear()
+        servers = asyncio.run(self.client.get_mcp_servers())
+        self.assertEqual(["echo-server"], [server.name for server in servers])
+        self.assertEqual(2, self.nacos.login_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import base64
+import hashlib
+import os
+import tempfile
+import unittest
+
+from mcp import types
+
+from ..nacos_mcp_router.blob_store import BlobNotFound, BlobStore
+
+
+def image(data: bytes) -> types.ImageContent:
+    return types.ImageContent(type="image", data=base64.b64encode(data).decode(), mimeType="image/png")
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = os.path.join(tmp.name, "blobs")
+
+    def test_small_content_is_forwarded_as_is(self):
+        store = BlobStore(self.directory, spill_bytes=1024)
+        content = [image(b"small"), types.TextContent(type="text", text="x" * 4096)]
+        self.assertEqual(content, asyncio.run(store.spill(content)))
+        self.assertEqual([], store.list_uris())
+
+    def test_large_content_is_spilled_and_readable(self):
+        store = BlobStore(self.directory, spill_bytes=16)
+        payload = os.urandom(1000)
+        blob = types.EmbeddedResource(type="resource", resource=types.BlobResourceContents(
+            uri="file:///shot.png", blob=base64.b64encode(payload).decode(), mimeType="application/pdf"))
+
+        async def run():
+            result = await store.spill([image(payload), blob])
+            return result, [await store.read(uri) for uri in store.list_uris()]
+
+        result, blobs = asyncio.run(run())
+        self.assertTrue(all(isinstance(item, types.TextContent) for item in result))
+        self.assertIn("1000 bytes (image/png)", result[0].text)
+        self.assertEqual(2, len(blobs))
+        self.assertEqual({"image/png", "application/pdf"}, {mime for _, mime in blobs})
+        self.assertTrue(all(data == payload for data, _ in blobs))
+
+    def test_lists_only_blobs_of_the_owner(self):
+        store = BlobStore(self.directory, spill_bytes=16)
+        first, second = object.__new__(type("Session", (), {})), object.__new__(type("Session", (), {}))
+        payload = os.urandom(100)
+
+        async def run():
+            await store.spill([image(payload)], owner=first)
+            await store.spill([image(os.urandom(100))], owner=second)
+
+        asyncio.run(run())
+        self.assertEqual(1, len(store.uris_for(first)))
+        self.assertEqual(1, len(store.uris_for(second)))
+        self.assertNotEqual(store.uris_for(first), store.uris_for(second))
+        self.assertEqual([], store.uris_for(None))
+        # URI is keyed, it can't be derived from the content alone
+        self.assertNotIn(hashlib.sha256(payload).hexdigest(), store.uris_for(first)[0])
+
+    def test_evicts_least_recently_used(self):
+        store = BlobStore(self.directory, spill_bytes=16, max_bytes=2500)
+
+        async def run():
+            for i in range(3):
+                await store.spill([image(bytes([i]) * 1000)])
+
+        asyncio.run(run())
+        self.assertEqual(2, len(store.list_uris()))
+
+    def test_rejects_unknown_uri(self):
+        store = BlobStore(self.directory, spill_bytes=16)
+        for uri in ("nacos-mcp-router://blobs/../secret", "file:///etc/passwd", "nacos-mcp-router://blobs/" + "0" * 64):
+            with self.assertRaises(BlobNotFound):
+                asyncio.run(store.read(uri))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from ..nacos_mcp_router import router_types
+from ..nacos_mcp_router.fake_backends import stdio_command
+from ..nacos_mcp_router.router_exceptions import ToolCallTimeout
+from ..nacos_mcp_router.router_types import CustomServer
+
+
+def stdio_config(name: str) -> dict:
+    command, args = stdio_command()
+    return {"mcpServers": {name: {"command": command, "args": args, "env": dict(os.environ)}}}
+
+
+class TestCustomServerReconnect(unittest.TestCase):
+
+    def test_reconnects_in_background_after_transport_closed(self):
+        async def run():
+            server = CustomServer(name="fake", config=stdio_config("fake"))
+            await server.wait_for_initialization()
+            self.assertTrue(await server.healthy())
+
+            with self.assertRaises(Exception):
+                await server.execute_tool("crash", {}, retries=1)
+
+            result = await server.execute_tool("echo", {"text": "hello"})
+            self.assertEqual("hello", result.content[0].text)
+            self.assertEqual(1, server.reconnect_count)
+
+            await server.request_for_shutdown()
+            await server._server_task
+
+        with mock.patch.object(router_types, "_RECONNECT_INITIAL_DELAY", 0.1):
+            asyncio.run(run())
+
+    def test_initial_failure_does_not_reconnect(self):
+        async def run():
+            config = {"mcpServers": {"broken": {"command": "/non/existent/command", "args": []}}}
+            server = CustomServer(name="broken", config=config)
+            await server.wait_for_initialization()
+            self.assertFalse(await server.healthy())
+            self.assertIsNone(await server.wait_for_session(timeout=0.1))
+            await server._server_task
+            self.assertEqual(0, server.reconnect_count)
+
+        asyncio.run(run())
+
+
+class TestCustomServerDeadline(unittest.TestCase):
+
+    def setUp(self):
+        patch = mock.patch.object(router_types, "DOWNSTREAM_CANCELLATION", True)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def start(self) -> tuple[CustomServer, list]:
+        command, args = stdio_command()
+        server = CustomServer(name="fake", config={"mcpServers": {"fake": {"command": command, "args": args}}})
+        await server.wait_for_initialization()
+        cancelled = []
+        send_notification = server.session.send_notification
+
+        async def record(notification, *a, **kw):
+            if notification.root.method == "notifications/cancelled":
+                cancelled.append(notification.root.params.requestId)
+            return await send_notification(notification, *a, **kw)
+
+        server.session.send_notification = record
+        return server, cancelled
+
+    def test_deadline_cancels_downstream_call(self):
+        async def run():
+            server, cancelled = await self.start()
+            started = asyncio.get_running_loop().time()
+            with self.assertRaises(ToolCallTimeout):
+                await server.execute_tool("sleep", {"seconds": 5}, timeout=0.3)
+            elapsed = asyncio.get_running_loop().time() - started
+            # 取消之后仍然可以继续调用（旧版本SDK的下游收到取消通知后可能退出，由后台重连恢复）
+            result = await server.execute_tool("echo", {"text": "hi"}, timeout=5)
+            await server.request_for_shutdown()
+            await server._server_task
+            return elapsed, cancelled, result
+
+        elapsed, cancelled, result = asyncio.run(run())
+        self.assertLess(elapsed, 2)
+        # initialize的请求id为0，取消通知携带的是tools/call请求的id
+        self.assertEqual([1], cancelled)
+        self.assertEqual("hi", result.content[0].text)
+
+    def test_upstream_cancel_is_propagated(self):
+        async def run():
+            server, cancelled = await self.start()
+            task = asyncio.create_task(server.execute_tool("sleep", {"seconds": 5}))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await server.request_for_shutdown()
+            await server._server_task
+            return cancelled
+
+        self.assertEqual(1, len(asyncio.run(run())))
+
+    async def concurrent_calls(self) -> tuple[float, bool, list]:
+        """sleep 1s与另一个很快超时的调用并发，返回前者的耗时、是否成功和发送的取消通知"""
+        server, cancelled = await self.start()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def slow():
+            try:
+                result = await server.execute_tool("sleep", {"seconds": 1}, timeout=10)
+                return not result.isError
+            except Exception:
+                return False
+
+        ok, _ = await asyncio.gather(slow(), server.execute_tool("sleep", {"seconds": 5}, timeout=0.3),
+                                     return_exceptions=True)
+        elapsed = loop.time() - started
+        result = await server.execute_tool("echo", {"text": "hi"}, timeout=10)
+        self.assertEqual("hi", result.content[0].text)
+        await server.request_for_shutdown()
+        await server._server_task
+        return elapsed, ok, cancelled
+
+    def test_timeout_does_not_stall_concurrent_calls(self):
+        with mock.patch.object(router_types, "DOWNSTREAM_CANCELLATION", False):
+            elapsed, ok, cancelled = asyncio.run(self.concurrent_calls())
+        self.assertTrue(ok)
+        self.assertLess(elapsed, 3)
+        self.assertEqual([], cancelled)
+
+    def test_broken_session_after_cancel_fails_fast(self):
+        # 旧版本SDK的下游收到取消通知后不再响应，ping探测失败后关闭会话，并发的调用立即重试而不是等到截止时间
+        elapsed, _, cancelled = asyncio.run(self.concurrent_calls())
+        self.assertEqual(1, len(cancelled))
+        self.assertLess(elapsed, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
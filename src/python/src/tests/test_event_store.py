@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+from ..nacos_mcp_router.event_store import InMemoryEventStore
+
+
+def message(i: int) -> JSONRPCMessage:
+    return JSONRPCMessage(JSONRPCNotification(jsonrpc="2.0", method="notifications/progress", params={"i": i}))
+
+
+class TestInMemoryEventStore(unittest.TestCase):
+
+    def test_replays_events_after_last_event_id(self):
+        async def run():
+            store = InMemoryEventStore(max_events_per_stream=3)
+            ids = [await store.store_event("s1", message(i)) for i in range(5)]
+            await store.store_event("s2", message(100))
+
+            replayed = []
+
+            async def send(event):
+                replayed.append((event.event_id, event.message.root.params["i"]))
+
+            stream_id = await store.replay_events_after(ids[2], send)
+            evicted = await store.replay_events_after(ids[0], send)
+            return ids, stream_id, evicted, replayed
+
+        ids, stream_id, evicted, replayed = asyncio.run(run())
+        self.assertEqual("s1", stream_id)
+        self.assertIsNone(evicted)
+        self.assertEqual([(ids[3], 3), (ids[4], 4)], replayed)
+
+    def test_evicts_oldest_stream(self):
+        async def run():
+            store = InMemoryEventStore(max_streams=2)
+            first = await store.store_event("s1", message(1))
+            await store.store_event("s2", message(2))
+            await store.store_event("s3", message(3))
+            return await store.replay_events_after(first, lambda event: None)
+
+        self.assertIsNone(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    unittest.main()
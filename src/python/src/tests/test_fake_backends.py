@@ -0,0 +1,25 @@
+import asyncio
+import unittest
+
+from ..nacos_mcp_router.fake_backends import FakeNacosServer
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+
+
+class TestFakeNacosServer(unittest.TestCase):
+
+    def test_nacos_client_reads_fake_registry(self):
+        with FakeNacosServer() as nacos:
+            names = nacos.populate(150, tool_count=3)
+            client = NacosHttpClient({"nacosAddr": nacos.address, "userName": "nacos", "password": "nacos",
+                                     "namespaceId": "", "ak": "", "sk": ""})
+
+            servers = asyncio.run(client.get_mcp_servers())
+
+        self.assertEqual(sorted(names), sorted(server.name for server in servers))
+        server = next(s for s in servers if s.name == names[0])
+        self.assertEqual(3, len(server.mcp_config_detail.tool_spec.tools))
+        self.assertIn(names[0], server.agentConfig["mcpServers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import uuid
+
+import chromadb
+
+from ..nacos_mcp_router.constants import MODE_ROUTER
+from ..nacos_mcp_router.fake_backends import FakeNacosServer
+from ..nacos_mcp_router.index_service import IndexClient, IndexServer
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+from ..nacos_mcp_router.registry_snapshot import RegistrySnapshot
+from ..nacos_mcp_router.router_types import ChromaDb
+from ..nacos_mcp_router.tool_index import ToolIndex
+from .test_tool_index import BagOfWords
+
+
+class EphemeralChroma(ChromaDb):
+    def __init__(self, embedding):
+        self._collection = chromadb.EphemeralClient().get_or_create_collection(
+            name=f"test-servers-{uuid.uuid4().hex}", embedding_function=embedding)
+
+
+class TestIndexService(unittest.TestCase):
+
+    def setUp(self):
+        self.nacos = FakeNacosServer().start()
+        self.addCleanup(self.nacos.stop)
+        self.nacos.add_stdio_server("maps", "maps server", "echo", [], tool_count=3)
+        self.nacos.servers["maps"]["toolSpec"]["tools"][2]["description"] = "Plan a driving route between two places."
+
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        embedding = BagOfWords()
+        client = NacosHttpClient({"nacosAddr": self.nacos.address, "userName": "nacos", "password": "nacos",
+                                  "namespaceId": "", "ak": "", "sk": ""})
+        self.leader = McpUpdater(client, EphemeralChroma(embedding), enable_vector_db=True, mode=MODE_ROUTER,
+                                 enable_auto_refresh=False)
+        self.leader.snapshot_writer = RegistrySnapshot(os.path.join(self.dir.name, "registry.snapshot"))
+        self.leader.tool_index = ToolIndex(chromadb.EphemeralClient().get_or_create_collection(
+            name=f"test-tools-{uuid.uuid4().hex}", embedding_function=embedding))
+        self.server = IndexServer(os.path.join(self.dir.name, "index.sock"), self.leader).start()
+        self.addCleanup(self.server.close)
+
+    def test_follower_searches_servers_registered_after_start(self):
+        asyncio.run(self.leader._refresh())
+        follower = McpUpdater.create_follower(None, RegistrySnapshot(self.leader.snapshot_writer.path),
+                                              poll_interval=0.05, index_client=IndexClient(self.server.path))
+
+        async def run():
+            self.assertTrue(await follower.wait_for_first_refresh(5))
+            self.nacos.add_stdio_server("weather", "weather server", "echo", [], tool_count=3)
+            self.nacos.servers["weather"]["toolSpec"]["tools"][2]["description"] = "Get the weather forecast of a city."
+            await asyncio.to_thread(asyncio.run, self.leader._refresh())
+            for _ in range(100):
+                if await follower.get_mcp_server_by_name("weather") is not None:
+                    break
+                await asyncio.sleep(0.05)
+            servers = await follower.getMcpServer("weather forecast", 1)
+            tools = await follower.search_tools("weather forecast", 1)
+            return servers, tools
+
+        servers, tools = asyncio.run(run())
+        self.assertEqual(["weather"], [server.name for server in servers])
+        self.assertEqual([("weather", "tool_0")], [(server.name, match.tool_name) for server, match in tools])
+        stats = follower.index_stats()
+        self.assertEqual((True, 2, 6), (stats["enabled"], stats["servers"], stats["tools"]))
+
+    def test_unknown_request_is_reported(self):
+        with self.assertRaises(RuntimeError):
+            IndexClient(self.server.path).request("drop")
+
+
+if __name__ == "__main__":
+    unittest.main()
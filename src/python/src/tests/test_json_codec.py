@@ -0,0 +1,43 @@
+import json
+import unittest
+from unittest import mock
+
+from ..nacos_mcp_router import json_codec
+from ..nacos_mcp_router.json_codec import FragmentCache
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    def backends(self):
+        yield "json", mock.patch.object(json_codec, "orjson", None)
+        if json_codec.orjson is not None:
+            yield "orjson", mock.patch.object(json_codec, "orjson", json_codec.orjson)
+
+    def test_backends_produce_the_same_output(self):
+        value = {"b": [1, 2.5, None, True], "a": {"名称": "地图服务", "schema": {"type": "object"}}}
+        outputs = set()
+        for name, patch in self.backends():
+            with self.subTest(name), patch:
+                text = json_codec.dumps(value, sort_keys=True)
+                self.assertEqual(value, json_codec.loads(text.encode("utf-8")))
+                self.assertEqual(value, json_codec.loads(text))
+                outputs.add(text)
+        self.assertEqual({json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)}, outputs)
+
+    def test_falls_back_for_unsupported_values(self):
+        self.assertEqual('{"1":"x"}', json_codec.dumps({1: "x"}))
+        self.assertEqual('{"v":"{1}"}', json_codec.dumps({"v": {1}}, default=str))
+
+    def test_fragment_cache(self):
+        cache = FragmentCache(max_size=2)
+        first = cache.dumps(("a", "desc"), {"name": "a", "description": "desc"})
+        self.assertIs(first, cache.dumps(("a", "desc"), {"name": "changed"}))
+        cache.dumps(("b", "desc"), {"name": "b"})
+        cache.dumps(("c", "desc"), {"name": "c"})
+        self.assertEqual(2, len(cache))
+        joined = json_codec.join_object({"a": first, "c": cache.dumps(("c", "desc"), {})})
+        self.assertEqual({"a": {"name": "a", "description": "desc"}, "c": {"name": "c"}}, json.loads(joined))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from ..nacos_mcp_router.load_test import OperationStats, parse_mix
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_parse_mix(self):
+        self.assertEqual({"search": 2.0, "use": 8.0}, parse_mix("search=2, use=8"))
+        self.assertEqual({"add": 1.0}, parse_mix("add"))
+        with self.assertRaises(ValueError):
+            parse_mix("delete=1")
+        with self.assertRaises(ValueError):
+            parse_mix("use=0")
+
+    def test_operation_stats_summary(self):
+        stats = OperationStats()
+        for i in range(1, 101):
+            stats.record(i / 1000, "boom" if i % 10 == 0 else None)
+
+        summary = stats.summary(wall=2.0)
+        self.assertEqual(100, summary["count"])
+        self.assertEqual(10, summary["errors"])
+        self.assertEqual(0.1, summary["error_rate"])
+        self.assertEqual(50.0, summary["throughput_rps"])
+        self.assertEqual(51.0, summary["p50_ms"])
+        self.assertEqual(96.0, summary["p95_ms"])
+        self.assertEqual(["boom"] * 5, summary["error_samples"])
+
+
+if __name__ == "__main__":
+    unittest.main()
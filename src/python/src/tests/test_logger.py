@@ -0,0 +1,25 @@
+import logging
+import queue
+import unittest
+
+from ..nacos_mcp_router.logger import _AsyncQueueHandler
+
+
+class TestAsyncQueueHandler(unittest.TestCase):
+
+    def test_message_is_formatted_before_enqueue(self):
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        logger = logging.getLogger("test_async_queue_handler")
+        logger.propagate = False
+        logger.addHandler(_AsyncQueueHandler(records))
+        config = {"url": "http://a"}
+        logger.warning("config: %s", config)
+        config["url"] = "http://b"
+
+        record = records.get_nowait()
+        self.assertEqual("config: {'url': 'http://a'}", record.getMessage())
+        self.assertIsNone(record.args)
+
+
+if __name__ == "__main__":
+    unittest.main()
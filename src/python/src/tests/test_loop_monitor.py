@@ -0,0 +1,65 @@
+import asyncio
+import io
+import pstats
+import time
+import unittest
+
+from ..nacos_mcp_router.loop_monitor import LoopMonitor, Profiler
+
+
+def block_event_loop(seconds: float):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(LoopMonitor.from_env())
+
+    def test_stall_records_loop_stack(self):
+        async def run():
+            monitor = LoopMonitor(threshold=0.2, interval=0.05)
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(0.1)
+            block_event_loop(0.6)
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return list(monitor.stalls)
+
+        stalls = asyncio.run(run())
+        self.assertEqual(1, len(stalls))
+        self.assertGreaterEqual(stalls[0]["blocked_seconds"], 0.2)
+        self.assertIn("block_event_loop", stalls[0]["stack"])
+
+    def test_no_stall_when_loop_is_responsive(self):
+        async def run():
+            monitor = LoopMonitor(threshold=0.2, interval=0.05)
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(0.5)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return list(monitor.stalls)
+
+        self.assertEqual([], asyncio.run(run()))
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_profile_collects_loop_callbacks(self):
+        async def busy():
+            while True:
+                sum(range(1000))
+                await asyncio.sleep(0)
+
+        async def run():
+            task = asyncio.create_task(busy())
+            stats = await Profiler().profile(0.2)
+            task.cancel()
+            return stats
+
+        stats = asyncio.run(run())
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats()
+        self.assertIn("busy", output.getvalue())
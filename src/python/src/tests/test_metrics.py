@@ -0,0 +1,36 @@
+import unittest
+
+from ..nacos_mcp_router.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_render_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        latency = registry.register(Histogram("tool_seconds", "Tool latency.", ["tool"], buckets=(0.1, 1.0)))
+        errors = registry.register(Counter("tool_errors", "Tool errors.", ["tool"]))
+        pool = registry.register(Gauge("pool_size", "Pool size.", ["protocol"]))
+        pool.set_function(lambda: [(("stdio",), 2)])
+
+        latency.labels("use_tool").observe(0.05)
+        latency.labels("use_tool").observe(0.5)
+        latency.labels("use_tool").observe(5)
+        errors.labels('say "hi"').inc()
+
+        text = registry.render()
+        self.assertIn("# TYPE tool_seconds histogram", text)
+        self.assertIn('tool_seconds_bucket{tool="use_tool",le="0.1"} 1', text)
+        self.assertIn('tool_seconds_bucket{tool="use_tool",le="1"} 2', text)
+        self.assertIn('tool_seconds_bucket{tool="use_tool",le="+Inf"} 3', text)
+        self.assertIn('tool_seconds_count{tool="use_tool"} 3', text)
+        self.assertIn('tool_errors_total{tool="say \\"hi\\""} 1', text)
+        self.assertIn('pool_size{protocol="stdio"} 2', text)
+
+    def test_labels_must_match_label_names(self):
+        counter = Counter("requests", "Requests.", ["method", "path"])
+        with self.assertRaises(ValueError):
+            counter.labels("GET")
+
+
+if __name__ == '__main__':
+    unittest.main()
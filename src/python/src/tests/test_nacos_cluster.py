@@ -0,0 +1,66 @@
+import asyncio
+import socket
+import time
+import unittest
+
+from ..nacos_mcp_router.fake_backends import FakeNacosServer
+from ..nacos_mcp_router.nacos_cluster import NacosCluster, parse_addresses
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+
+
+def closed_address() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+def client_for(addresses: list[str]) -> NacosHttpClient:
+    return NacosHttpClient({"nacosAddr": ",".join(addresses), "userName": "nacos", "password": "nacos",
+                            "namespaceId": "", "ak": "", "sk": ""})
+
+
+class TestNacosCluster(unittest.TestCase):
+
+    def test_orders_by_latency_with_unhealthy_nodes_last(self):
+        self.assertEqual(["a:1", "b:2"], parse_addresses(" a:1, b:2,a:1,"))
+        cluster = NacosCluster(["a:1", "b:2", "c:3"])
+        a, b, c = cluster.nodes
+        cluster.record_success(a, 0.2)
+        cluster.record_success(b, 0.05)
+        cluster.record_failure(c)
+        self.assertEqual(["b:2", "a:1", "c:3"], [node.address for node in cluster.ordered()])
+        cluster.record_success(b, 1.0)
+        self.assertEqual(["a:1", "b:2", "c:3"], [node.address for node in cluster.ordered()])
+
+    def test_fails_over_from_unreachable_node(self):
+        with FakeNacosServer() as nacos:
+            nacos.add_stdio_server("echo-server", "echo server", "echo", [])
+            down = closed_address()
+            client = client_for([down, nacos.address])
+            for _ in range(3):
+                servers = asyncio.run(client.get_mcp_servers())
+                self.assertEqual(["echo-server"], [server.name for server in servers])
+            node = next(node for node in client.cluster.nodes if node.address == down)
+            self.assertGreaterEqual(node.failures, 1)
+            self.assertEqual(nacos.address, client.cluster.ordered()[0].address)
+
+    def test_hedges_slow_reads(self):
+        with FakeNacosServer(latency=2.0) as slow, FakeNacosServer() as fast:
+            for nacos in (slow, fast):
+                nacos.add_stdio_server("echo-server", "echo server", "echo", [])
+            client = client_for([slow.address, fast.address])
+            client.cluster.hedge_delay = 0.05
+            slow_node, fast_node = client.cluster.nodes
+            # 之前较快的节点突然变慢
+            client.cluster.record_success(slow_node, 0.001)
+            client.cluster.record_success(fast_node, 0.01)
+
+            start = time.perf_counter()
+            server = asyncio.run(client.get_mcp_server(id="", name="echo-server"))
+            self.assertEqual("echo-server", server.name)
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertEqual(1, fast.request_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
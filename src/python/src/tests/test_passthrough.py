@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import unittest
+import unittest.mock
+
+import mcp.types as types
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_client_server_memory_streams
+from mcp.shared.message import SessionMessage
+
+from ..nacos_mcp_router.fake_backends import stdio_command
+from ..nacos_mcp_router.passthrough import PassthroughProxy
+from ..nacos_mcp_router.shutdown import ShutdownCoordinator
+
+
+@contextlib.asynccontextmanager
+async def upstream_session(proxy: PassthroughProxy):
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        task = asyncio.create_task(proxy.run(*server_streams))
+        try:
+            async with ClientSession(*client_streams) as session:
+                yield session
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+class TestPassthroughProxy(unittest.TestCase):
+
+    def run_with_proxy(self, scenario, shutdown_coordinator=None, cancel_downstream=False, tools_filter=None):
+        async def config_loader():
+            command, args = stdio_command()
+            return {"command": command, "args": args}
+
+        async def hide_sleep(tools):
+            return [tool for tool in tools if tool.name != "sleep"]
+
+        async def run():
+            proxy = PassthroughProxy("fake", config_loader, tools_filter or hide_sleep,
+                                     shutdown_coordinator=shutdown_coordinator,
+                                     cancel_downstream=cancel_downstream)
+            try:
+                self.assertTrue(await proxy.start())
+                return await scenario(proxy)
+            finally:
+                await proxy.close()
+
+        return asyncio.run(run())
+
+    def test_relays_calls_and_filters_tools(self):
+        async def scenario(proxy):
+            async with upstream_session(proxy) as session:
+                initialized = await session.initialize()
+                tools = await session.list_tools()
+                result = await session.call_tool("echo", {"text": "hi"})
+            return initialized, tools, result, await proxy.list_tools()
+
+        initialized, tools, result, unfiltered = self.run_with_proxy(scenario)
+        self.assertEqual(initialized.serverInfo.name, "fake-mcp-server")
+        self.assertEqual(["echo"], [tool.name for tool in tools.tools])
+        self.assertIn("sleep", [tool.name for tool in unfiltered])
+        self.assertEqual("hi", result.content[0].text)
+
+    def test_negotiates_protocol_version_per_session(self):
+        async def scenario(proxy):
+            async with upstream_session(proxy) as session:
+                latest = await session.initialize()
+            with unittest.mock.patch.object(types, "LATEST_PROTOCOL_VERSION", "2024-11-05"):
+                async with upstream_session(proxy) as session:
+                    older = await session.initialize()
+                    result = await session.call_tool("echo", {"text": "hi"})
+            return latest, older, result
+
+        latest, older, result = self.run_with_proxy(scenario)
+        self.assertEqual(types.LATEST_PROTOCOL_VERSION, latest.protocolVersion)
+        self.assertEqual("2024-11-05", older.protocolVersion)
+        self.assertEqual("hi", result.content[0].text)
+
+    def test_shutdown_drains_forwarded_calls(self):
+        coordinator = ShutdownCoordinator(drain_timeout=5)
+
+        async def scenario(proxy):
+            async with upstream_session(proxy) as session:
+                await session.initialize()
+                call = asyncio.create_task(session.call_tool("sleep", {"seconds": 0.5}))
+                await asyncio.sleep(0.2)
+                in_flight = coordinator.in_flight
+                remaining = await coordinator.drain()
+                result = await call
+                with self.assertRaises(McpError) as rejected:
+                    await session.call_tool("echo", {"text": "late"})
+            return in_flight, remaining, result, rejected.exception
+
+        in_flight, remaining, result, rejected = self.run_with_proxy(scenario, coordinator)
+        self.assertEqual((1, 0), (in_flight, remaining))
+        self.assertFalse(result.isError)
+        self.assertIn("shutting down", str(rejected))
+
+    async def disconnect_during_call(self, proxy) -> tuple[float, bool, str]:
+        """一个上游会话在调用进行中断开，返回另一个会话并发调用的耗时、是否成功，以及之后一次调用的结果"""
+        loop = asyncio.get_running_loop()
+        async with upstream_session(proxy) as session:
+            await session.initialize()
+            started = loop.time()
+            slow = asyncio.create_task(session.call_tool("sleep", {"seconds": 1}))
+            async with upstream_session(proxy) as leaving:
+                await leaving.initialize()
+                call = asyncio.create_task(leaving.call_tool("sleep", {"seconds": 5}))
+                await asyncio.sleep(0.2)
+                call.cancel()
+            try:
+                ok = not (await slow).isError
+            except McpError:
+                ok = False
+            elapsed = loop.time() - started
+            echo = await session.call_tool("echo", {"text": "after"})
+            return elapsed, ok, echo.content[0].text
+
+    def test_disconnect_does_not_stall_other_sessions(self):
+        elapsed, ok, echo = self.run_with_proxy(self.disconnect_during_call)
+        self.assertTrue(ok)
+        self.assertLess(elapsed, 3)
+        self.assertEqual("after", echo)
+
+    def test_broken_connection_after_cancel_fails_fast(self):
+        # 旧版本SDK的下游收到取消通知后不再响应，ping探测失败后断开重连，其他会话的请求立即返回错误
+        elapsed, _, echo = self.run_with_proxy(self.disconnect_during_call, cancel_downstream=True)
+        self.assertLess(elapsed, 6)
+        self.assertEqual("after", echo)
+
+    def test_slow_tools_filter_does_not_stall_other_sessions(self):
+        async def slow_filter(tools):
+            await asyncio.sleep(1)
+            return tools
+
+        async def scenario(proxy):
+            loop = asyncio.get_running_loop()
+            async with upstream_session(proxy) as listing, upstream_session(proxy) as calling:
+                await listing.initialize()
+                await calling.initialize()
+                tools = asyncio.create_task(listing.list_tools())
+                await asyncio.sleep(0.1)
+                started = loop.time()
+                echo = await calling.call_tool("echo", {"text": "hi"})
+                elapsed = loop.time() - started
+                return elapsed, echo.content[0].text, len((await tools).tools)
+
+        elapsed, echo, tool_count = self.run_with_proxy(scenario, tools_filter=slow_filter)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual("hi", echo)
+        self.assertEqual(2, tool_count)
+
+    def test_stalled_upstream_does_not_stall_other_sessions(self):
+        async def scenario(proxy):
+            loop = asyncio.get_running_loop()
+            async with create_client_server_memory_streams() as (client_streams, server_streams):
+                stalled = asyncio.create_task(proxy.run(*server_streams))
+                # 该上游只发请求、从不读取响应
+                for i in range(5):
+                    request = types.JSONRPCRequest(jsonrpc="2.0", id=i, method="tools/call",
+                                                   params={"name": "echo", "arguments": {"text": str(i)}})
+                    await client_streams[1].send(SessionMessage(message=types.JSONRPCMessage(request)))
+                await asyncio.sleep(0.3)
+                try:
+                    async with upstream_session(proxy) as session:
+                        await session.initialize()
+                        started = loop.time()
+                        echo = await asyncio.wait_for(session.call_tool("echo", {"text": "hi"}), 5)
+                        return loop.time() - started, echo.content[0].text
+                finally:
+                    stalled.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await stalled
+
+        elapsed, echo = self.run_with_proxy(scenario)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual("hi", echo)
+
+    def test_concurrent_sessions_with_progress(self):
+        async def scenario(proxy):
+            progress = {0: [], 1: []}
+
+            async def client(index: int):
+                async with upstream_session(proxy) as session:
+                    await session.initialize()
+
+                    async def on_progress(value, total, message):
+                        progress[index].append(value)
+
+                    sleep = await session.call_tool("sleep", {"seconds": 0.2}, progress_callback=on_progress)
+                    echoes = await asyncio.gather(*[session.call_tool("echo", {"text": f"{index}-{i}"})
+                                                    for i in range(5)])
+                    return sleep.content[0].text, [echo.content[0].text for echo in echoes]
+
+            return await asyncio.gather(client(0), client(1)), progress
+
+        results, progress = self.run_with_proxy(scenario)
+        for index, (sleep, echoes) in enumerate(results):
+            self.assertEqual("done", sleep)
+            self.assertEqual([f"{index}-{i}" for i in range(5)], echoes)
+            self.assertEqual(4, len(progress[index]))
+
+
+if __name__ == "__main__":
+    unittest.main()
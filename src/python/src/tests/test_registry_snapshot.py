@@ -0,0 +1,81 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.registry_snapshot import RegistrySnapshot
+from ..nacos_mcp_router.router_types import McpServer
+
+
+def server(name: str) -> McpServer:
+    return McpServer(name=name, description=f"{name} description", agentConfig={"mcpServers": {}}, id=name,
+                     version="1.0.0")
+
+
+class TestRegistrySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "registry.snapshot")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_reader_only_loads_changed_snapshots(self):
+        writer = RegistrySnapshot(self.path)
+        reader = RegistrySnapshot(self.path)
+        self.assertIsNone(reader.read_if_changed())
+
+        writer.write({"a": server("a")})
+        servers = reader.read_if_changed()
+        self.assertEqual(["a"], list(servers))
+        self.assertEqual("a description", servers["a"].description)
+        self.assertEqual(1, reader.generation)
+        self.assertIsNone(reader.read_if_changed())
+
+        writer.write({"a": server("a"), "b": server("b")})
+        self.assertEqual(["a", "b"], sorted(reader.read_if_changed()))
+        self.assertEqual(2, reader.generation)
+
+    def test_follower_serves_registry_from_snapshot(self):
+        RegistrySnapshot(self.path).write({"amap": server("amap")})
+        updater = McpUpdater.create_follower(None, RegistrySnapshot(self.path), poll_interval=0.05)
+
+        async def run():
+            self.assertTrue(await updater.wait_for_first_refresh(5))
+            found = await updater.get_mcp_server_by_name("amap")
+            by_keyword = await updater.search_mcp_by_keyword("amap")
+            return found, by_keyword
+
+        found, by_keyword = asyncio.run(run())
+        self.assertEqual("amap", found.name)
+        self.assertEqual(["amap"], [s.name for s in by_keyword])
+
+    def test_follower_finds_servers_registered_after_start(self):
+        writer = RegistrySnapshot(self.path)
+        writer.write({"amap": server("amap")})
+        updater = McpUpdater.create_follower(None, RegistrySnapshot(self.path), poll_interval=0.05)
+
+        async def run():
+            self.assertTrue(await updater.wait_for_first_refresh(5))
+            self.assertEqual([], await updater.search_mcp_by_keyword("weather"))
+            writer.write({"amap": server("amap"), "weather": server("weather")})
+            for _ in range(100):
+                found = await updater.search_mcp_by_keyword("weather")
+                if found:
+                    return found, await updater.getMcpServer("weather", 5), await updater.search_tools("weather", 5)
+                await asyncio.sleep(0.05)
+            self.fail("follower did not load the new snapshot")
+
+        by_keyword, by_vector, by_tool = asyncio.run(run())
+        self.assertEqual(["weather"], [s.name for s in by_keyword])
+        # 没有主进程的检索服务时向量检索为空，由关键字检索兜底
+        self.assertEqual([], by_vector)
+        self.assertEqual([], by_tool)
+        self.assertEqual({"enabled": False, "servers": None, "tools": None},
+                         {k: v for k, v in updater.index_stats().items() if k in ("enabled", "servers", "tools")})
+
+
+if __name__ == "__main__":
+    unittest.main()
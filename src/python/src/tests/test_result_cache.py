@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+from mcp import types
+
+from ..nacos_mcp_router import result_cache
+from ..nacos_mcp_router.result_cache import ToolResultCache, parse_tool_ttls
+
+
+def text(value: str) -> list[types.TextContent]:
+    return [types.TextContent(type="text", text=value)]
+
+
+class TestToolResultCache(unittest.TestCase):
+
+    def test_key_ignores_argument_order(self):
+        self.assertEqual(ToolResultCache.key("s", "t", {"a": 1, "b": [1, 2]}),
+                         ToolResultCache.key("s", "t", {"b": [1, 2], "a": 1}))
+        self.assertNotEqual(ToolResultCache.key("s", "t", {"a": 1}), ToolResultCache.key("s", "t", {"a": "1"}))
+
+    def test_ttl_from_local_config_and_registry(self):
+        cache = ToolResultCache(default_ttl=30, tool_ttls=parse_tool_ttls("maps/geo=600, docs/*, bad", 30))
+        self.assertEqual(600, cache.ttl_for("maps", "geo", {"cacheTtl": 5}))
+        self.assertEqual(30, cache.ttl_for("docs", "search"))
+        self.assertEqual(5, cache.ttl_for("maps", "route", {"cacheTtl": 5}))
+        self.assertEqual(30, cache.ttl_for("other", "tool", {"cacheable": True}))
+        self.assertEqual(0, cache.ttl_for("other", "tool", {"timeout": 10}))
+        self.assertEqual(0, cache.ttl_for("other", "tool", None))
+
+    def test_expires_after_ttl(self):
+        cache = ToolResultCache()
+        key = cache.key("s", "t", {})
+        with mock.patch.object(result_cache.time, "monotonic", return_value=100.0):
+            cache.put(key, text("v"), ttl=10)
+            self.assertEqual(text("v"), cache.get(key))
+        with mock.patch.object(result_cache.time, "monotonic", return_value=111.0):
+            self.assertIsNone(cache.get(key))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size_bytes)
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        cache = ToolResultCache(max_entries=2, max_bytes=10)
+        keys = [cache.key("s", "t", {"i": i}) for i in range(3)]
+        cache.put(keys[0], text("a"), ttl=60)
+        cache.put(keys[1], text("b"), ttl=60)
+        cache.get(keys[0])
+        cache.put(keys[2], text("c"), ttl=60)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(text("a"), cache.get(keys[0]))
+
+        cache.put(keys[1], text("x" * 9), ttl=60)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get(keys[2]))
+        cache.put(keys[0], text("x" * 11), ttl=60)
+        self.assertIsNone(cache.get(keys[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from ..nacos_mcp_router import mcp_manager, router
+from ..nacos_mcp_router.constants import MODE_ROUTER
+from ..nacos_mcp_router.fake_backends import FakeNacosServer, stdio_command
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+from ..nacos_mcp_router.result_cache import ToolResultCache
+from ..nacos_mcp_router.router_types import CustomServer
+from ..nacos_mcp_router.shutdown import ShutdownCoordinator
+from ..nacos_mcp_router.tool_result import to_text
+
+
+class TestRouterLazyInstall(unittest.TestCase):
+
+    def setUp(self):
+        self.nacos = FakeNacosServer().start()
+        command, args = stdio_command()
+        self.nacos.add_stdio_server("echo-server", "echo server", command, args)
+        client = NacosHttpClient({"nacosAddr": self.nacos.address, "userName": "nacos", "password": "nacos",
+                                  "namespaceId": "", "ak": "", "sk": ""})
+        # 不启动自动刷新，注册表为空，只能通过按需查询Nacos找到server
+        updater = McpUpdater(client, None, enable_vector_db=False, mode=MODE_ROUTER, enable_auto_refresh=False)
+        patches = [
+            mock.patch.object(router, "mode", MODE_ROUTER),
+            mock.patch.object(router, "nacos_http_client", client, create=True),
+            mock.patch.object(router, "mcp_updater", updater, create=True),
+            mock.patch.object(router, "tool_registrar", None),
+            mock.patch.object(router, "usage_stats", None),
+            mock.patch.object(router, "mcp_servers_dict", {}),
+            mock.patch.object(router, "_install_locks", {}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.nacos.stop)
+
+    def test_use_tool_installs_on_miss_once(self):
+        created = []
+        original = router.CustomServer
+
+        def record(*args, **kwargs):
+            server = original(*args, **kwargs)
+            created.append(server)
+            return server
+
+        async def run():
+            with mock.patch.object(router, "CustomServer", side_effect=record):
+                results = await asyncio.gather(*[router.use_tool("echo-server", "echo", {"text": f"hi{i}"})
+                                                 for i in range(5)])
+            for server in created:
+                await server.request_for_shutdown()
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual(1, len(created))
+        for i, result in enumerate(results):
+            self.assertEqual(f"hi{i}", to_text(result))
+
+    def test_use_tool_reinstalls_closed_server(self):
+        async def run():
+            await router.use_tool("echo-server", "echo", {"text": "hi"})
+            closed = router.mcp_servers_dict["echo-server"]
+            # 模拟放弃重连：server已关闭但仍留在字典中
+            await closed.shutdown()
+            result = await router.use_tool("echo-server", "echo", {"text": "again"})
+            reinstalled = router.mcp_servers_dict["echo-server"]
+            await reinstalled.request_for_shutdown()
+            return closed, reinstalled, result
+
+        closed, reinstalled, result = asyncio.run(run())
+        self.assertIsNot(closed, reinstalled)
+        self.assertEqual("again", to_text(result))
+
+    def test_use_tool_caches_tools_marked_in_registry(self):
+        self.nacos.servers["echo-server"]["toolSpec"]["toolsMeta"] = {"echo": {"invokeContext": {"cacheTtl": 60}}}
+        calls = []
+        execute_tool = CustomServer.execute_tool
+
+        async def counting(server, tool_name, arguments, **kwargs):
+            calls.append(tool_name)
+            return await execute_tool(server, tool_name, arguments, **kwargs)
+
+        async def run():
+            with mock.patch.object(router, "result_cache", ToolResultCache()), \
+                    mock.patch.object(CustomServer, "execute_tool", counting):
+                results = [await router.use_tool("echo-server", "echo", {"text": "hi"}),
+                           await router.use_tool("echo-server", "echo", {"text": "hi"}),
+                           await router.use_tool("echo-server", "echo", {"text": "other"}),
+                           await router.use_tool("echo-server", "sleep", {"seconds": 0}),
+                           await router.use_tool("echo-server", "sleep", {"seconds": 0})]
+            await router.mcp_servers_dict["echo-server"].request_for_shutdown()
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual(["hi", "hi", "other", "done", "done"], [to_text(result) for result in results])
+        self.assertEqual(["echo", "echo", "sleep", "sleep"], calls)
+
+    def test_search_mcp_tools_returns_schemas_without_installing(self):
+        self.nacos.servers["echo-server"]["toolSpec"]["toolsMeta"] = {"sleep": {"enabled": False}}
+        asyncio.run(router.mcp_updater._refresh())
+
+        content = asyncio.run(router.search_mcp_tools("repeat some text", "echo", 3))
+        tools = json.loads(content.splitlines()[1])
+        self.assertEqual([("echo-server", "echo")], [(t["mcp_server_name"], t["mcp_tool_name"]) for t in tools])
+        self.assertIn("text", tools[0]["inputSchema"]["properties"])
+        self.assertEqual({}, router.mcp_servers_dict)
+
+    def test_batch_use_tool_keeps_order_and_server_limit(self):
+        active, peak = [0], [0]
+        execute_tool = CustomServer.execute_tool
+
+        async def tracking(server, tool_name, arguments, **kwargs):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            try:
+                return await execute_tool(server, tool_name, arguments, **kwargs)
+            finally:
+                active[0] -= 1
+
+        calls = [{"mcp_server_name": "echo-server", "mcp_tool_name": "sleep", "params": {"seconds": 0.1}},
+                 {"mcp_server_name": "echo-server", "mcp_tool_name": "echo", "params": '{"text": "hi"}'},
+                 {"mcp_server_name": "missing", "mcp_tool_name": "echo", "params": {}},
+                 {"mcp_server_name": "echo-server", "mcp_tool_name": "sleep", "params": {"seconds": 0.1}}]
+
+        async def run():
+            with mock.patch.object(router, "server_max_in_flight", 2), \
+                    mock.patch.object(router, "_server_semaphores", {}), \
+                    mock.patch.object(CustomServer, "execute_tool", tracking):
+                result = await router.batch_use_tool(calls)
+            await router.mcp_servers_dict["echo-server"].request_for_shutdown()
+            return result
+
+        texts = [item.text for item in asyncio.run(run())]
+        self.assertEqual(["[0] echo-server/sleep: ok", "done", "[1] echo-server/echo: ok", "hi",
+                          "[2] missing/echo: error"], texts[:5])
+        self.assertTrue(texts[5].startswith("mcp server missing not found"))
+        self.assertEqual(["[3] echo-server/sleep: ok", "done"], texts[6:])
+        self.assertEqual(2, peak[0])
+
+    def test_use_tool_honors_registry_timeout(self):
+        self.nacos.servers["echo-server"]["toolSpec"]["toolsMeta"] = {"sleep": {"invokeContext": {"timeout": 0.3}}}
+
+        async def run():
+            result = await router.use_tool("echo-server", "sleep", {"seconds": 5})
+            await router.mcp_servers_dict["echo-server"].request_for_shutdown()
+            return result
+
+        self.assertIn("timed out after 0.3s", to_text(asyncio.run(run())))
+
+    def test_use_tool_unknown_server(self):
+        result = asyncio.run(router.use_tool("missing", "echo", {}))
+        self.assertTrue(to_text(result).startswith("mcp server not found"))
+
+    def test_no_install_after_shutdown_begins(self):
+        coordinator = ShutdownCoordinator()
+        coordinator.begin()
+        with mock.patch.object(router, "shutdown_coordinator", coordinator):
+            result = asyncio.run(router.use_tool("echo-server", "echo", {"text": "hi"}))
+        self.assertTrue(to_text(result).startswith("mcp server not found"))
+        self.assertEqual({}, router.mcp_servers_dict)
+
+    def test_unknown_server_names_are_bounded(self):
+        with mock.patch.object(mcp_manager, "_MISSING_MAX", 3):
+            for i in range(10):
+                asyncio.run(router.use_tool(f"missing-{i}", "echo", {}))
+        self.assertEqual([f"missing-{i}" for i in range(7, 10)], list(router.mcp_updater._missing_until))
+
+    def test_metadata_lookups_do_not_query_nacos(self):
+        requests = self.nacos.request_count
+        self.assertIsNone(asyncio.run(router._invoke_context("echo-server", "echo")))
+        self.assertEqual(requests, self.nacos.request_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import unittest
+
+from ..nacos_mcp_router.session_quota import QuotaExceeded, SessionQuotaManager
+
+
+class FakeSession:
+    pass
+
+
+class FakeRequest:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def use_servers(manager, usage, *names):
+    async def run():
+        async with manager.admit(usage, names):
+            pass
+    asyncio.run(run())
+
+
+class TestSessionQuota(unittest.TestCase):
+
+    def test_global_slots_rotate_between_sessions(self):
+        async def run():
+            manager = SessionQuotaManager(global_in_flight=1)
+            a, b = manager.usage_for(FakeSession()), manager.usage_for(FakeSession())
+            order = []
+            gate = asyncio.Event()
+
+            async def call(usage, name):
+                async with manager.admit(usage):
+                    order.append(name)
+                    await gate.wait()
+
+            tasks = [asyncio.create_task(call(a, f"a{i}")) for i in range(4)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(call(b, "b0")))
+            await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(*tasks)
+            return order, manager.scheduler.active
+
+        order, active = asyncio.run(run())
+        # b0 runs right after the call holding the slot instead of after all of a's calls
+        self.assertEqual(["a0", "a1", "b0", "a2", "a3"], order)
+        self.assertEqual(0, active)
+
+    def test_server_quota_per_session(self):
+        manager = SessionQuotaManager(max_servers=2)
+        session = FakeSession()
+        usage = manager.usage_for(session)
+        use_servers(manager, usage, "amap")
+        use_servers(manager, usage, "github")
+        use_servers(manager, usage, "amap")
+        with self.assertRaises(QuotaExceeded):
+            use_servers(manager, usage, "slack")
+        # another session has its own quota
+        use_servers(manager, manager.usage_for(FakeSession()), "slack")
+        self.assertEqual({"amap", "github"}, manager.usage_for(session).servers)
+
+    def test_rejected_batch_does_not_use_server_quota(self):
+        manager = SessionQuotaManager(max_servers=2)
+        usage = manager.usage_for(FakeSession())
+        use_servers(manager, usage, "amap")
+        with self.assertRaises(QuotaExceeded):
+            use_servers(manager, usage, "github", "slack", "amap")
+        self.assertEqual({"amap"}, usage.servers)
+        use_servers(manager, usage, "amap", "github", "github")
+        self.assertEqual({"amap", "github"}, usage.servers)
+
+    def test_rate_limited_call_does_not_use_server_quota(self):
+        manager = SessionQuotaManager(max_servers=2, call_rate=0.5)
+        usage = manager.usage_for(FakeSession())
+        use_servers(manager, usage, "amap")
+        with self.assertRaises(QuotaExceeded):
+            use_servers(manager, usage, "github")
+        self.assertEqual({"amap"}, usage.servers)
+
+    def test_queued_calls_recheck_server_quota(self):
+        async def run():
+            manager = SessionQuotaManager(max_servers=1, max_in_flight=1)
+            usage = manager.usage_for(FakeSession())
+            gate = asyncio.Event()
+
+            async def call(name):
+                async with manager.admit(usage, [name]):
+                    await gate.wait()
+
+            first = asyncio.create_task(call("amap"))
+            second = asyncio.create_task(call("github"))
+            await asyncio.sleep(0)
+            gate.set()
+            await first
+            with self.assertRaises(QuotaExceeded):
+                await second
+            return usage.servers
+
+        self.assertEqual({"amap"}, asyncio.run(run()))
+
+    def test_rate_limit_and_client_header(self):
+        async def run():
+            manager = SessionQuotaManager(call_rate=1, key_header="X-Client-Id")
+            # stateless requests of the same client share one usage
+            usage = manager.usage_for(FakeSession(), FakeRequest({"x-client-id": "agent-1"}))
+            self.assertIs(usage, manager.usage_for(FakeSession(), FakeRequest({"x-client-id": "agent-1"})))
+            admitted = 0
+            with self.assertRaises(QuotaExceeded):
+                for _ in range(5):
+                    async with manager.admit(usage):
+                        admitted += 1
+            return admitted, usage
+
+        admitted, usage = asyncio.run(run())
+        self.assertEqual(2, admitted)
+        self.assertEqual(1, usage.rejected)
+
+    def test_in_flight_limit_queues_calls(self):
+        async def run():
+            manager = SessionQuotaManager(max_in_flight=2)
+            usage = manager.usage_for(FakeSession())
+            peak = 0
+            running = 0
+
+            async def call():
+                nonlocal peak, running
+                async with manager.admit(usage):
+                    running += 1
+                    peak = max(peak, running)
+                    await asyncio.sleep(0.01)
+                    running -= 1
+
+            await asyncio.gather(*[call() for _ in range(6)])
+            return peak, usage.calls
+
+        self.assertEqual((2, 6), asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+import unittest
+
+from ..nacos_mcp_router.fake_backends import stdio_command
+from ..nacos_mcp_router.router_types import CustomServer
+from ..nacos_mcp_router.shutdown import ShutdownCoordinator, ShuttingDown
+
+
+class TestShutdownCoordinator(unittest.TestCase):
+
+    def test_drain_waits_for_in_flight_calls_and_rejects_new_ones(self):
+        async def run():
+            coordinator = ShutdownCoordinator(drain_timeout=5)
+            finished = []
+
+            async def call(seconds: float):
+                async with coordinator.track():
+                    await asyncio.sleep(seconds)
+                    finished.append(seconds)
+
+            tasks = [asyncio.create_task(call(0.1)), asyncio.create_task(call(0.2))]
+            await asyncio.sleep(0.01)
+            remaining = await coordinator.drain()
+            with self.assertRaises(ShuttingDown):
+                await call(0)
+            await asyncio.gather(*tasks)
+            return remaining, finished
+
+        remaining, finished = asyncio.run(run())
+        self.assertEqual(0, remaining)
+        self.assertEqual([0.1, 0.2], finished)
+
+    def test_drain_is_bounded_by_deadline(self):
+        async def run():
+            coordinator = ShutdownCoordinator(drain_timeout=0.1)
+
+            async def hang():
+                async with coordinator.track():
+                    await asyncio.sleep(10)
+
+            task = asyncio.create_task(hang())
+            await asyncio.sleep(0.01)
+            start = time.monotonic()
+            remaining = await coordinator.drain()
+            elapsed = time.monotonic() - start
+            task.cancel()
+            return remaining, elapsed
+
+        remaining, elapsed = asyncio.run(run())
+        self.assertEqual(1, remaining)
+        self.assertLess(elapsed, 1)
+
+    def test_closes_servers_concurrently(self):
+        async def run():
+            command, args = stdio_command()
+            servers = [CustomServer(name=f"s{i}", config={"mcpServers": {f"s{i}": {"command": command, "args": args}}})
+                       for i in range(4)]
+            await asyncio.gather(*[server.wait_for_initialization() for server in servers])
+            start = time.monotonic()
+            await ShutdownCoordinator(close_timeout=5).close_servers(servers)
+            return servers, time.monotonic() - start
+
+        servers, elapsed = asyncio.run(run())
+        self.assertLess(elapsed, 5)
+        for server in servers:
+            self.assertTrue(server._server_task.done())
+            self.assertIsNone(server.session)
+
+    def test_closes_servers_installed_while_draining(self):
+        async def run():
+            command, args = stdio_command()
+            coordinator = ShutdownCoordinator(drain_timeout=5, close_timeout=5)
+            servers = {}
+            coordinator.acquire()
+            shutdown = asyncio.create_task(coordinator.shutdown(servers))
+            await asyncio.sleep(0.05)
+            # 等待期间进行中的调用安装了新的server
+            server = CustomServer(name="late", config={"mcpServers": {"late": {"command": command, "args": args}}})
+            await server.wait_for_initialization()
+            servers["late"] = server
+            coordinator.release()
+            await shutdown
+            return server
+
+        server = asyncio.run(run())
+        self.assertTrue(server._server_task.done())
+        self.assertIsNone(server.session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import unittest
+import uuid
+
+import chromadb
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from ..nacos_mcp_router.constants import MODE_ROUTER
+from ..nacos_mcp_router.fake_backends import FakeNacosServer
+from ..nacos_mcp_router.mcp_manager import McpUpdater
+from ..nacos_mcp_router.nacos_http_client import NacosHttpClient
+from ..nacos_mcp_router.tool_index import ToolIndex
+
+
+class BagOfWords(EmbeddingFunction):
+    """离线测试用的词袋向量，不需要下载模型"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input: Documents) -> Embeddings:
+        self.calls += len(input)
+        vectors = []
+        for document in input:
+            vector = [0.0] * 64
+            for word in document.lower().replace(".", " ").replace(":", " ").split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+class TestToolIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.nacos = FakeNacosServer().start()
+        self.addCleanup(self.nacos.stop)
+        for name in ("weather", "maps"):
+            self.nacos.add_stdio_server(name, f"{name} server", "echo", [], tool_count=3)
+        self.nacos.servers["weather"]["toolSpec"]["tools"][2]["description"] = "Get the weather forecast of a city."
+        self.nacos.servers["maps"]["toolSpec"]["tools"][2]["description"] = "Plan a driving route between two places."
+
+        self.embedding = BagOfWords()
+        collection = chromadb.EphemeralClient().get_or_create_collection(
+            name=f"test-tools-{uuid.uuid4().hex}", embedding_function=self.embedding)
+        self.index = ToolIndex(collection)
+        client = NacosHttpClient({"nacosAddr": self.nacos.address, "userName": "nacos", "password": "nacos",
+                                  "namespaceId": "", "ak": "", "sk": ""})
+        self.updater = McpUpdater(client, None, enable_vector_db=True, mode=MODE_ROUTER)
+        self.updater.tool_index = self.index
+
+    def test_incremental_sync(self):
+        asyncio.run(self.updater._refresh())
+        self.assertEqual(6, len(self.index))
+        self.assertEqual(6, self.embedding.calls)
+
+        asyncio.run(self.updater._refresh())
+        self.assertEqual(6, self.embedding.calls)
+
+        self.nacos.servers["maps"]["toolSpec"]["tools"][2]["description"] = "Plan a walking route."
+        self.nacos.servers["maps"]["toolSpec"]["toolsMeta"] = {"sleep": {"enabled": False}}
+        del self.nacos.servers["weather"]
+        asyncio.run(self.updater._refresh())
+        self.assertEqual(7, self.embedding.calls)
+        self.assertEqual(2, len(self.index))
+
+    def test_search_returns_tools_with_parent_servers(self):
+        asyncio.run(self.updater._refresh())
+        matches = asyncio.run(self.updater.search_tools("weather forecast for a city", 2))
+        server, match = matches[0]
+        self.assertEqual("weather", server.name)
+        self.assertEqual(("weather", "tool_0"), (match.server_name, match.tool_name))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from mcp import Tool
+
+from ..nacos_mcp_router.tool_registrar import ToolRegistrar
+
+
+class RecordingNacosClient:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = []
+
+    async def update_mcp_tools(self, mcp_name, tools, mcp_version, id):
+        await asyncio.sleep(self.delay)
+        self.calls.append((mcp_name, [tool.name for tool in tools], mcp_version))
+        return True
+
+
+def tool(name: str, description: str = "") -> Tool:
+    return Tool(name=name, description=description, inputSchema={})
+
+
+class TestToolRegistrar(unittest.TestCase):
+
+    def test_submit_does_not_block_and_coalesces_per_server(self):
+        async def run():
+            client = RecordingNacosClient()
+            registrar = ToolRegistrar(client)
+            registrar.submit("amap", [tool("a")], "1.0.0", "")
+            self.assertEqual([], client.calls)
+
+            # the first update is in flight, these two collapse into the last one
+            await asyncio.sleep(0)
+            registrar.submit("amap", [tool("b")], "1.0.0", "")
+            registrar.submit("amap", [tool("c")], "1.0.0", "")
+            self.assertTrue(await registrar.flush(timeout=1))
+            return client.calls
+
+        calls = asyncio.run(run())
+        self.assertEqual([("amap", ["a"], "1.0.0"), ("amap", ["c"], "1.0.0")], calls)
+
+    def test_unchanged_tools_are_not_pushed_again(self):
+        async def run():
+            client = RecordingNacosClient(delay=0)
+            registrar = ToolRegistrar(client)
+            registrar.submit("amap", [tool("a", "desc")], "1.0.0", "")
+            await registrar.flush(timeout=1)
+            registrar.submit("amap", [tool("a", "desc")], "1.0.0", "")
+            await registrar.flush(timeout=1)
+            registrar.submit("amap", [tool("a", "desc")], "1.0.1", "")
+            await registrar.flush(timeout=1)
+            return client.calls
+
+        calls = asyncio.run(run())
+        self.assertEqual(["1.0.0", "1.0.1"], [version for _, _, version in calls])
+
+
+if __name__ == '__main__':
+    unittest.main()
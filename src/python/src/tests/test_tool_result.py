@@ -0,0 +1,71 @@
+import asyncio
+import base64
+import os
+import unittest
+
+from mcp import types
+
+from ..nacos_mcp_router.fake_backends import stdio_command
+from ..nacos_mcp_router.router_types import CustomServer
+from ..nacos_mcp_router.tool_result import chunk_content, limit_content, to_text, truncate_content
+
+
+def text(value: str) -> types.TextContent:
+    return types.TextContent(type="text", text=value)
+
+
+class TestToolResult(unittest.TestCase):
+
+    def test_small_result_is_unchanged(self):
+        content = [text("hello"), types.ImageContent(type="image", data=base64.b64encode(b"png").decode(),
+                                                     mimeType="image/png")]
+        self.assertEqual(content, limit_content(content, max_bytes=1024, chunk_bytes=1024))
+
+    def test_truncate_keeps_utf8_boundary(self):
+        result = truncate_content([text("你好世界"), text("more")], max_bytes=7)
+        self.assertEqual("你好", result[0].text)
+        self.assertIn("result truncated: 16 bytes", result[-1].text)
+
+    def test_truncate_replaces_oversized_binary(self):
+        image = types.ImageContent(type="image", data=base64.b64encode(b"x" * 300).decode(), mimeType="image/png")
+        result = truncate_content([text("ok"), image], max_bytes=100)
+        self.assertEqual("ok", result[0].text)
+        self.assertEqual("[image content omitted: 300 bytes]", result[1].text)
+
+    def test_truncate_counts_audio(self):
+        audio = types.AudioContent(type="audio", data=base64.b64encode(b"x" * 300).decode(), mimeType="audio/wav")
+        result = truncate_content([text("ok"), audio], max_bytes=100)
+        self.assertEqual("ok", result[0].text)
+        self.assertEqual("[audio content omitted: 300 bytes]", result[1].text)
+
+    def test_chunk_splits_long_text(self):
+        result = chunk_content([text("a" * 10)], chunk_bytes=4)
+        self.assertEqual(["aaaa", "aaaa", "aa"], [item.text for item in result])
+        self.assertEqual("a" * 10, to_text(result))
+
+
+class TestProgressPassthrough(unittest.TestCase):
+
+    def test_execute_tool_reports_downstream_progress(self):
+        command, args = stdio_command()
+        config = {"mcpServers": {"fake": {"command": command, "args": args, "env": dict(os.environ)}}}
+        progress = []
+
+        async def on_progress(value: float, total: float | None, message: str | None) -> None:
+            progress.append((value, total))
+
+        async def run():
+            server = CustomServer(name="fake", config=config)
+            await server.wait_for_initialization()
+            try:
+                return await server.execute_tool("sleep", {"seconds": 0.2}, progress_callback=on_progress)
+            finally:
+                await server.request_for_shutdown()
+
+        result = asyncio.run(run())
+        self.assertEqual("done", to_text(result.content))
+        self.assertEqual([(1, 4), (2, 4), (3, 4), (4, 4)], progress)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import unittest
+
+import httpx
+
+from ..nacos_mcp_router import tracing
+from ..nacos_mcp_router.router_types import CustomServer
+from .test_custom_server import stdio_config
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = tracing.InMemorySpanExporter()
+        tracing.configure(tracing.SimpleSpanProcessor(self.exporter))
+
+    def tearDown(self):
+        tracing.configure(None)
+
+    def test_spans_are_nested_and_continue_remote_parent(self):
+        remote = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        with tracing.start_span("call_tool use_tool", traceparent=remote) as parent:
+            with tracing.start_span("execute_tool") as child:
+                pass
+
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        self.assertEqual("0af7651916cd43dd8448eb211c80319c", parent.trace_id)
+        self.assertEqual("b7ad6b7169203331", parent.parent_span_id)
+        self.assertEqual(parent.trace_id, child.trace_id)
+        self.assertEqual(parent.span_id, spans["execute_tool"].parent_span_id)
+
+    def test_exception_marks_span_as_error(self):
+        with self.assertRaises(ValueError):
+            with tracing.start_span("failing"):
+                raise ValueError("boom")
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(tracing.STATUS_ERROR, span.status)
+
+    def test_trace_context_is_propagated_to_downstream_server(self):
+        async def run():
+            server = CustomServer(name="fake", config=stdio_config("fake"))
+            await server.wait_for_initialization()
+            with tracing.start_span("call_tool use_tool") as span:
+                result = await server.execute_tool("traceparent", {})
+            await server.request_for_shutdown()
+            await server._server_task
+            return span, result
+
+        span, result = asyncio.run(run())
+        received = tracing.parse_traceparent(result.content[0].text)
+        self.assertIsNotNone(received)
+        self.assertEqual(span.trace_id, received[0])
+        execute_span = next(s for s in self.exporter.get_finished_spans() if s.name == "execute_tool")
+        self.assertEqual(execute_span.span_id, received[1])
+
+    def test_auth_copies_traceparent_from_meta_to_header(self):
+        traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        body = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                "params": {"name": "echo", "_meta": {"traceparent": traceparent}}}
+        request = httpx.Request("POST", "http://localhost/mcp", content=json.dumps(body))
+        flow = tracing.TraceContextAuth().sync_auth_flow(request)
+        self.assertEqual(traceparent, next(flow).headers["traceparent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from ..nacos_mcp_router.usage_stats import UsageStats
+
+
+class TestUsageStats(unittest.TestCase):
+
+    def test_top_ranks_by_usage_and_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "usage_stats.json")
+            stats = UsageStats(path=path)
+            for _ in range(3):
+                stats.record("amap")
+            stats.record("github")
+            stats.save()
+
+            reloaded = UsageStats(path=path)
+            reloaded.load()
+            self.assertEqual(["amap", "github"], reloaded.top(5))
+            self.assertEqual(["amap"], reloaded.top(1))
+            self.assertEqual([], reloaded.top(0))
+
+    def test_recent_usage_outranks_stale_usage(self):
+        stats = UsageStats(path=os.devnull, half_life=60)
+        stats.record("stale")
+        stats.record("stale")
+        stats._scores["stale"]["last_used"] = time.time() - 600
+        stats.record("recent")
+        self.assertEqual(["recent", "stale"], stats.top(2))
+
+    def test_saves_in_background(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "usage_stats.json")
+            stats = UsageStats(path=path, save_interval=0.05)
+
+            async def run():
+                task = asyncio.create_task(stats.run())
+                stats.record("amap")
+                self.assertFalse(os.path.exists(path))
+                await asyncio.sleep(0.2)
+                task.cancel()
+
+            asyncio.run(run())
+            reloaded = UsageStats(path=path)
+            reloaded.load()
+            self.assertEqual(["amap"], reloaded.top(5))
+
+    def test_workers_use_their_own_file(self):
+        with mock.patch.dict(os.environ, {"ROUTER_WORKER_ID": "2"}):
+            self.assertTrue(UsageStats().path.endswith("/usage_stats-worker-2.json"))
+        with mock.patch.dict(os.environ):
+            os.environ.pop("ROUTER_WORKER_ID", None)
+            self.assertTrue(UsageStats().path.endswith("/usage_stats.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()